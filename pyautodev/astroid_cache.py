@@ -0,0 +1,148 @@
+"""Persistent cache of the astroid trees pylint builds for imported modules.
+
+Pylint rebuilds a tree for every module the checked files import, including large
+standard library and third-party ones, on every run. While an `AstroidCache` is
+installed, modules astroid reads from disk are built from pickles of the trees parsed
+in earlier runs, and each tree it does parse is pickled. Entries are keyed by path,
+module name, Python version and astroid version, and are only used while the
+contents' SHA-256 still matches, so a changed file is just parsed again (and its entry
+replaced).
+
+What's cached is the tree as parsed, before astroid's post-build steps and brain
+plugins' transforms: those attach closures that can't be pickled, and may depend on
+other modules, so they run again on every load. So do inference results, which astroid
+ties to inference contexts and lazily evaluated generators.
+"""
+import copyreg
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+import astroid
+from astroid import MANAGER, modutils
+from astroid.builder import AstroidBuilder
+
+from pyautodev.cache import DEFAULT_CACHE_DIR
+
+# astroid trees nest deeply enough to exceed the default limit while (un)pickling
+_RECURSION_LIMIT = 20000
+
+# astroid's Load/Store/Del enum isn't importable under the name it pickles with
+_ASTROID_CONTEXT = type(astroid.Load)
+
+
+class AstroidCache:
+    """On-disk store of parsed astroid trees, one file per source file and module."""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = os.path.join(cache_dir or DEFAULT_CACHE_DIR, "astroid")
+
+    def get(self, filepath: str, modname: str, digest: str) -> Optional[astroid.Module]:
+        """The tree cached for `filepath` as `modname`, if parsed from `digest`."""
+        try:
+            with open(self._path(filepath, modname), "rb") as f:
+                if pickle.load(f) != digest:
+                    return None
+                with _recursion_limit():
+                    return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+    def put(self, filepath: str, modname: str, digest: str, module: astroid.Module):
+        path = self._path(filepath, modname)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with open(fd, "wb") as f:
+                pickler = pickle.Pickler(f, protocol=pickle.HIGHEST_PROTOCOL)
+                pickler.dispatch_table = _DISPATCH_TABLE
+                pickler.dump(digest)
+                pickler.clear_memo()  # get() loads the two separately
+                with _recursion_limit():
+                    pickler.dump(module)
+            os.replace(tmp_path, path)
+        except (
+            OSError,
+            pickle.PicklingError,
+            AttributeError,
+            TypeError,
+            RecursionError,
+        ):
+            # not worth failing the run over, the module just gets parsed every time
+            os.remove(tmp_path)
+
+    @contextmanager
+    def installed(self) -> Iterator[None]:
+        """Build astroid's trees for files read from disk via this cache."""
+        build = MANAGER.ast_from_file
+
+        # like AstroidManager.ast_from_file, but building source files with a
+        # _CachingBuilder
+        def ast_from_file(filepath, modname=None, fallback=True, source=False):
+            try:
+                source_path = modutils.get_source_file(filepath, include_no_ext=True)
+            except modutils.NoSourceFile:
+                return build(filepath, modname, fallback, source)
+            if modname is None:
+                return build(filepath, modname, fallback, source)
+
+            cached = MANAGER.astroid_cache.get(modname)
+            if cached is not None and cached.file == source_path:
+                return cached
+            return _CachingBuilder(self).file_build(source_path, modname)
+
+        MANAGER.ast_from_file = ast_from_file
+        try:
+            yield
+        finally:
+            del MANAGER.ast_from_file  # back to the class's method
+
+    def _path(self, filepath: str, modname: str) -> str:
+        key = hashlib.sha256(
+            "\0".join(
+                [sys.version, astroid.__version__, os.path.abspath(filepath), modname]
+            ).encode("utf-8")
+        ).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key)
+
+
+class _CachingBuilder(AstroidBuilder):
+    """Parses source via an `AstroidCache`, leaving the post-build steps as they are."""
+
+    def __init__(self, cache: AstroidCache):
+        super().__init__(MANAGER)
+        self._cache = cache
+
+    def _data_build(self, data: str, modname: str, path: Optional[str]):
+        digest = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        module = self._cache.get(path, modname, digest)
+        if module is None:
+            module = super()._data_build(data, modname, path)
+            self._cache.put(path, modname, digest, module)
+        return module
+
+
+@contextmanager
+def _recursion_limit() -> Iterator[None]:
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, _RECURSION_LIMIT))
+    try:
+        yield
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def _astroid_context(name: str):
+    return getattr(astroid, name)
+
+
+def _reduce_context(context):
+    return _astroid_context, (context.name,)
+
+
+_DISPATCH_TABLE = copyreg.dispatch_table.copy()
+_DISPATCH_TABLE[_ASTROID_CONTEXT] = _reduce_context
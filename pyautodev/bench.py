@@ -0,0 +1,301 @@
+"""Throughput benchmarks for each transformer and checker stage.
+
+A benchmark generates a synthetic corpus from a `CorpusSpec`, runs every stage over it
+in pipeline order (as `Processor` does), and records how long each stage took. Results
+are plain JSON, so a run can be saved as a baseline and later runs compared against it.
+`reflow_scaling` separately checks that comment reflow stays linear in block size.
+"""
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import attr
+
+from pyautodev import __version__
+from pyautodev.checkers import PyCodeStyle, PyFlakes, PyLint
+from pyautodev.modifiers import MAX_LINE_LENGTH, reflow
+from pyautodev.source import SourceUnit, as_units
+from pyautodev.transformers import Black, PyAutoDev
+
+STAGES = ("black", "pyautodev", "pylint", "pyflakes", "pycodestyle")
+
+# number of comment lines (or words on one line) the reflow benchmark grows through
+DEFAULT_REFLOW_SIZES = (2000, 4000, 8000, 16000)
+
+# how much slower than the baseline a stage may get before it counts as a regression
+DEFAULT_TOLERANCE = 0.1
+
+_WORDS = (
+    "the quick brown fox jumps over a lazy dog while lorem ipsum dolor sit amet "
+    "consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore"
+).split()
+
+
+@attr.dataclass(frozen=True)
+class CorpusSpec:
+    """Shape of a synthetic corpus: how big it is and how often each feature appears.
+
+    Densities are the chance that each generated statement gets the feature.
+    """
+
+    files: int = 20
+    lines: int = 200
+    long_comment_density: float = 0.05
+    inline_comment_density: float = 0.1
+    violation_density: float = 0.05
+    nesting_density: float = 0.2
+    max_depth: int = 4
+    seed: int = 0
+
+
+def generate_corpus(spec: CorpusSpec, dst_dir: str) -> List[str]:
+    """Write `spec.files` modules of about `spec.lines` lines each into `dst_dir`."""
+    rng = random.Random(spec.seed)
+    os.makedirs(dst_dir, exist_ok=True)
+    filepaths = []
+    for i in range(spec.files):
+        filepath = os.path.join(dst_dir, f"module_{i:05d}.py")
+        with open(filepath, "w") as f:
+            f.write(_generate_module(spec, rng))
+        filepaths.append(filepath)
+    return filepaths
+
+
+def run(spec: CorpusSpec, repeat: int = 3) -> dict:
+    """Time each stage over a fresh copy of the corpus, keeping the fastest of `repeat`.
+
+    Each repetition works on its own copy of the corpus, since the transformers rewrite
+    files and both black and pylint skip work for files they've already seen.
+    """
+    stages = _stages()
+    runs = {name: [] for name in STAGES}  # type: Dict[str, List[float]]
+    with tempfile.TemporaryDirectory(prefix="pyautodev-bench-") as tmp_dir:
+        corpus = generate_corpus(spec, os.path.join(tmp_dir, "corpus"))
+        corpus_stats = _corpus_stats(corpus)
+
+        for i in range(repeat):
+            run_dir = os.path.join(tmp_dir, f"run_{i}")
+            shutil.copytree(os.path.dirname(corpus[0]), run_dir)
+            units = as_units(
+                [os.path.join(run_dir, os.path.basename(f)) for f in corpus]
+            )
+            for name, stage in stages:
+                start = time.perf_counter()
+                stage(units)
+                runs[name].append(time.perf_counter() - start)
+
+    return {
+        "pyautodev": __version__,
+        "python": platform.python_version(),
+        "spec": attr.asdict(spec),
+        "repeat": repeat,
+        "corpus": corpus_stats,
+        "stages": {
+            name: _stage_result(stage_runs, corpus_stats)
+            for name, stage_runs in runs.items()
+        },
+    }
+
+
+def reflow_scaling(
+    sizes: Sequence[int] = DEFAULT_REFLOW_SIZES, repeat: int = 3
+) -> dict:
+    """Time comment reflow over ever larger comment blocks, keeping the fastest runs.
+
+    Blocks are either `size` overlong comment lines, or a single comment line of `size`
+    words. Each shape's exponent is the slope of its time against size on a log-log
+    scale: about 1 when reflow scales linearly, and 2 when it's quadratic.
+    """
+    rng = random.Random(0)
+    line = "# " + _sentence(rng, 20)
+    shapes = {
+        "lines": lambda size: [(line, 4)] * size,
+        "words": lambda size: [
+            ("# " + " ".join(rng.choice(_WORDS) for _ in range(size)), 4)
+        ],
+    }
+    results = {}
+    for shape, make_block in shapes.items():
+        timings = []
+        for size in sizes:
+            block = make_block(size)
+            runs = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                reflow(block, MAX_LINE_LENGTH)
+                runs.append(time.perf_counter() - start)
+            timings.append({"size": size, "seconds": min(runs)})
+        results[shape] = {
+            "timings": timings,
+            "exponent": _exponent(timings[0], timings[-1]),
+        }
+    return results
+
+
+def compare(
+    results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """Describe each stage that got more than `tolerance` slower than the baseline."""
+    if results["spec"] != baseline["spec"]:
+        raise ValueError("baseline was recorded with a different corpus spec")
+
+    regressions = []
+    for name, stage in results["stages"].items():
+        if name not in baseline["stages"]:
+            continue
+        before = baseline["stages"][name]["seconds"]
+        after = stage["seconds"]
+        if after > before * (1 + tolerance):
+            regressions.append(
+                f"{name}: {after:.3f}s vs. {before:.3f}s baseline "
+                f"({after / before - 1:+.0%})"
+            )
+    return regressions
+
+
+def load(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def dump(results: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def format_table(results: dict, baseline: Optional[dict] = None) -> str:
+    rows = [("stage", "seconds", "files/s", "lines/s", "vs. baseline")]
+    for name, stage in results["stages"].items():
+        change = ""
+        if baseline and name in baseline["stages"]:
+            before = baseline["stages"][name]["seconds"]
+            change = f"{stage['seconds'] / before - 1:+.0%}"
+        rows.append(
+            (
+                name,
+                f"{stage['seconds']:.3f}",
+                f"{stage['files_per_second']:.1f}",
+                f"{stage['lines_per_second']:.0f}",
+                change,
+            )
+        )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def format_reflow_table(results: dict) -> str:
+    rows = [("shape", "size", "seconds", "us/size", "exponent")]
+    for shape, result in results.items():
+        for i, timing in enumerate(result["timings"]):
+            rows.append(
+                (
+                    shape,
+                    str(timing["size"]),
+                    f"{timing['seconds']:.4f}",
+                    f"{timing['seconds'] / timing['size'] * 1e6:.2f}",
+                    f"{result['exponent']:.2f}" if i == 0 else "",
+                )
+            )
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return "\n".join(
+        "  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip()
+        for row in rows
+    )
+
+
+def _exponent(smallest: dict, largest: dict) -> float:
+    if not smallest["seconds"] or not largest["seconds"]:
+        return 0.0
+    return math.log(largest["seconds"] / smallest["seconds"]) / math.log(
+        largest["size"] / smallest["size"]
+    )
+
+
+def _stages() -> List[Tuple[str, Callable[[Sequence[SourceUnit]], object]]]:
+    # built once up front, so a stage's time doesn't include constructing its tool
+    return [
+        ("black", Black().transform),
+        ("pyautodev", PyAutoDev().transform),
+        ("pylint", PyLint().check),
+        ("pyflakes", PyFlakes().check),
+        ("pycodestyle", PyCodeStyle().check),
+    ]
+
+
+def _stage_result(runs: List[float], corpus_stats: dict) -> dict:
+    seconds = min(runs)
+    return {
+        "seconds": seconds,
+        "runs": runs,
+        "files_per_second": corpus_stats["files"] / seconds if seconds else 0.0,
+        "lines_per_second": corpus_stats["lines"] / seconds if seconds else 0.0,
+    }
+
+
+def _corpus_stats(filepaths: List[str]) -> dict:
+    lines = size = 0
+    for filepath in filepaths:
+        with open(filepath, "rb") as f:
+            contents = f.read()
+        lines += contents.count(b"\n")
+        size += len(contents)
+    return {"files": len(filepaths), "lines": lines, "bytes": size}
+
+
+def _generate_module(spec: CorpusSpec, rng: random.Random) -> str:
+    lines = ['"""A synthetic module for benchmarking."""', "import os"]
+    if rng.random() < spec.violation_density:
+        lines.append("import sys  # unused")
+
+    i = 0
+    while len(lines) < spec.lines:
+        lines.extend(_generate_function(spec, rng, i))
+        i += 1
+    return "\n".join(lines) + "\n"
+
+
+def _generate_function(spec: CorpusSpec, rng: random.Random, idx: int) -> List[str]:
+    lines = ["", "", f"def function_{idx}(a, b):", "    total = len(os.sep)"]
+    depth = 1
+    for i in range(rng.randint(5, 20)):
+        indent = "    " * depth
+        if rng.random() < spec.long_comment_density:
+            lines.append(f"{indent}# {_sentence(rng, rng.randint(80, 200))}")
+
+        if rng.random() < spec.violation_density:
+            # unused variable, comparison to None and a missing operator space
+            statement = rng.choice(
+                [f"unused_{i} = a", "total += a == None", f"total+={i}"]
+            )
+        else:
+            statement = f"total += a * {i} - b"
+        if rng.random() < spec.inline_comment_density:
+            statement += f"  # {_sentence(rng, rng.randint(10, 80))}"
+        lines.append(f"{indent}{statement}")
+
+        if depth < spec.max_depth and rng.random() < spec.nesting_density:
+            lines.append(f"{indent}{rng.choice(['if a > b', 'for _ in b'])}:")
+            depth += 1
+            lines.append(f"{indent}    total -= {i}")
+        elif depth > 1 and rng.random() < spec.nesting_density:
+            depth -= 1
+
+    lines.append("    return total")
+    return lines
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(_WORDS))
+    return " ".join(words)
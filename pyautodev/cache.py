@@ -0,0 +1,199 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Dict, List, Optional, Sequence
+
+import attr
+
+from pyautodev.checkers import Message
+from pyautodev.source import atomic_write
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "pyautodev"
+)
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# sqlite's default limit on the number of ? parameters in a single statement
+_MAX_SQL_VARIABLES = 999
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    messages TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+
+-- the total size of the stored messages, kept up to date as results are stored and
+-- evicted, so checking it doesn't scan every entry
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta
+    SELECT 'size', COALESCE(SUM(size), 0) FROM results
+    WHERE NOT EXISTS (SELECT 1 FROM meta WHERE name = 'size');
+CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results BEGIN
+    UPDATE meta SET value = value + NEW.size WHERE name = 'size';
+END;
+CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results BEGIN
+    UPDATE meta SET value = value - OLD.size WHERE name = 'size';
+END;
+"""
+
+
+class ResultCache:
+    """Persistent, content-addressed store of checker messages.
+
+    Entries live in a sqlite database, which serializes concurrent writers (e.g.,
+    parallel workers sharing the same cache) for us. Once the stored messages grow
+    past `max_bytes`, the least recently used entries are evicted.
+    """
+
+    def __init__(
+        self, cache_dir: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES
+    ):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes
+        self._conn = None
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[Message]]:
+        hits = {}
+        if not keys:
+            return hits
+
+        conn = self._connect()
+        for i in range(0, len(keys), _MAX_SQL_VARIABLES):
+            batch = keys[i : i + _MAX_SQL_VARIABLES]
+            rows = conn.execute(
+                f"SELECT key, messages FROM results WHERE key IN ({_params(batch)})",
+                batch,
+            )
+            hits.update({k: _loads(v) for k, v in rows})
+
+        if hits:
+            with conn:
+                conn.executemany(
+                    "UPDATE results SET accessed = ? WHERE key = ?",
+                    [(time.time(), k) for k in hits],
+                )
+        return hits
+
+    def put_many(self, entries: Dict[str, List[Message]]):
+        if not entries:
+            return
+
+        now = time.time()
+        rows = []
+        for k, msgs in entries.items():
+            value = _dumps(msgs)
+            rows.append((k, value, len(value), now))
+
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)", rows)
+        self._evict()
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM results")
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getstate__(self):
+        # sqlite connections can't cross process boundaries, so workers reconnect
+        state = dict(self.__dict__)
+        state["_conn"] = None
+        return state
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            conn = sqlite3.connect(
+                os.path.join(self.cache_dir, "results.sqlite"), timeout=60
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            # so replacing an entry fires the delete trigger for the old one
+            conn.execute("PRAGMA recursive_triggers=ON")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def _evict(self):
+        conn = self._connect()
+        with conn:
+            (total,) = conn.execute(
+                "SELECT value FROM meta WHERE name = 'size'"
+            ).fetchone()
+            if total <= self.max_bytes:
+                return
+
+            # drop least recently used entries until we're back under the limit
+            excess = total - self.max_bytes
+            rows = conn.execute("SELECT key, size FROM results ORDER BY accessed")
+            evicted = []
+            for k, size in rows:
+                evicted.append((k,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+
+class JsonStore:
+    """A JSON object kept in a file under --cache-dir, one per working directory.
+
+    The file is read on first use, and a missing or corrupt file counts as empty.
+    Subclasses set `kind`, the subdirectory their files go in.
+    """
+
+    kind = "store"
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or self.default_path()
+        self._data = None  # type: Optional[dict]
+
+    @classmethod
+    def default_path(
+        cls, cache_dir: Optional[str] = None, cwd: Optional[str] = None
+    ) -> str:
+        """File for runs from the given (by default, current) working directory."""
+        cwd = os.path.abspath(cwd or os.getcwd())
+        name = hashlib.sha256(cwd.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(cache_dir or DEFAULT_CACHE_DIR, cls.kind, f"{name}.json")
+
+    def _load(self) -> dict:
+        if self._data is None:
+            try:
+                with open(self.path, "r") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write(self.path, json.dumps(self._data))
+
+
+def _params(values: Sequence) -> str:
+    return ", ".join("?" * len(values))
+
+
+def _dumps(msgs: List[Message]) -> str:
+    return json.dumps([attr.astuple(m) for m in msgs])
+
+
+def _loads(value: str) -> List[Message]:
+    return [Message(*m) for m in json.loads(value)]
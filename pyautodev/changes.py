@@ -0,0 +1,68 @@
+import os
+import subprocess
+from typing import Iterable, List, Optional, Set, Tuple
+
+from pyautodev.cache import JsonStore
+
+FileStat = Tuple[int, int]  # (mtime in ns, size in bytes)
+
+
+def git_changed_files(ref: str, cwd: Optional[str] = None) -> Set[str]:
+    """Resolved paths of files added or modified relative to a git ref.
+
+    This includes uncommitted changes in the working tree as well as untracked (but
+    not ignored) files.
+    """
+    toplevel = _git(["rev-parse", "--show-toplevel"], cwd)[0]
+    relpaths = _git(["diff", "--name-only", "--diff-filter=ACMR", ref, "--"], cwd)
+    relpaths += _git(["ls-files", "--others", "--exclude-standard", "--full-name"], cwd)
+    return {os.path.realpath(os.path.join(toplevel, p)) for p in relpaths}
+
+
+def select_changed(filepaths: Iterable[str], changed: Set[str]) -> List[str]:
+    """The (already discovered) files in `filepaths` that are in `changed`."""
+    # git resolves symlinks in the paths it gives, so compare resolved paths
+    return [f for f in filepaths if os.path.realpath(f) in changed]
+
+
+class RunState(JsonStore):
+    """The mtime and size of each file as of the end of the last run.
+
+    Files whose current mtime and size match what was recorded are assumed to be
+    unchanged, so they don't need to be processed again.
+    """
+
+    kind = "runs"
+
+    def changed(self, filepaths: Iterable[str]) -> List[str]:
+        """The (already discovered) files in `filepaths` changed since the last run."""
+        files = self._load()
+        changed = []
+        for filepath in filepaths:
+            recorded = files.get(os.path.abspath(filepath))
+            if recorded is None or tuple(recorded) != _stat(filepath):
+                changed.append(filepath)
+        return changed
+
+    def record(self, filepaths: Iterable[str]):
+        files = self._load()
+        for filepath in filepaths:
+            if os.path.isfile(filepath):
+                files[os.path.abspath(filepath)] = _stat(filepath)
+        self._save()
+
+
+def _stat(filepath: str) -> FileStat:
+    st = os.stat(filepath)
+    return st.st_mtime_ns, st.st_size
+
+
+def _git(args: List[str], cwd: Optional[str]) -> List[str]:
+    out = subprocess.run(
+        ["git"] + args,
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+    return [line for line in out.splitlines() if line]
@@ -1,23 +1,66 @@
-from typing import List, Optional, Tuple
+import ast
+import json
+import os
+import sys
+import time
+import tokenize
+from array import array
+from collections import defaultdict
+from contextlib import nullcontext
+from types import SimpleNamespace
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
+import astroid
+from astroid import MANAGER
+from astroid.builder import AstroidBuilder
+from astroid.modutils import file_from_modpath
+import attr
 from attr import dataclass
-from pycodestyle import StyleGuide, BaseReport
-from pyflakes.api import checkPath
+import pycodestyle
+from pycodestyle import StyleGuide, BaseReport, __version__ as pycodestyle_version
+from pyflakes import __version__ as pyflakes_version
+from pyflakes.api import check as check_source
+from pyflakes.checker import Checker as FlakesChecker
 from pyflakes.reporter import Reporter
 from pylint import checkers
+from pylint import __version__ as pylint_version
 from pylint.lint import PyLinter
 from pylint.message import Message as PyLintMessage
 from pyflakes.messages import Message as PyFlakesMessage
 from pylint.reporters import CollectingReporter
 
+from pyautodev import __version__
+from pyautodev import profiling
+from pyautodev.profiling import CHECK, FILE, rss, span
+from pyautodev.source import SourceUnit, as_units, iter_units
 
-@dataclass
+Source = Union[str, SourceUnit]
+Sources = Sequence[Source]
+
+
+def _intern(s: Optional[str]) -> Optional[str]:
+    return sys.intern(s) if isinstance(s, str) else s
+
+
+@dataclass(slots=True)
 class Message:
-    code: Optional[str]
-    description: Optional[str]
-    filepath: str
-    line: Optional[int]
-    column: Optional[int]
+    # codes, descriptions (e.g., pylint's symbols) and paths repeat across messages, so
+    # share a single copy of each
+    code: Optional[str] = attr.ib(converter=_intern)
+    description: Optional[str] = attr.ib(converter=_intern)
+    filepath: str = attr.ib(converter=_intern)
+    line: Optional[int] = attr.ib()
+    column: Optional[int] = attr.ib()
 
     def __str__(self):
         return ":".join(
@@ -31,25 +74,358 @@ class Message:
         )
 
 
+class MessageBatch:
+    """Messages stored column-wise, for runs that report very many of them.
+
+    Each distinct path, code and description is stored once in a string table, and
+    lines and columns are packed into arrays, so a message costs a few dozen bytes
+    rather than an object. `Message`s are only built when read back out.
+    """
+
+    _NONE = -1  # stands in for a missing line or column
+
+    def __init__(self, msgs: Iterable[Message] = ()):
+        self._strings = [None]  # type: List[Optional[str]]
+        self._string_ids = {None: 0}  # type: Dict[Optional[str], int]
+        self._codes = array("I")
+        self._descriptions = array("I")
+        self._filepaths = array("I")
+        self._lines = array("i")
+        self._columns = array("i")
+        self.extend(msgs)
+
+    def append(
+        self,
+        code: Optional[str],
+        description: Optional[str],
+        filepath: str,
+        line: Optional[int],
+        column: Optional[int],
+    ):
+        self._codes.append(self._string_id(code))
+        self._descriptions.append(self._string_id(description))
+        self._filepaths.append(self._string_id(filepath))
+        self._lines.append(self._NONE if line is None else line)
+        self._columns.append(self._NONE if column is None else column)
+
+    def add(self, m: Message):
+        self.append(m.code, m.description, m.filepath, m.line, m.column)
+
+    def extend(self, msgs: Iterable[Message]):
+        for m in msgs:
+            self.add(m)
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def __getitem__(self, i: int) -> Message:
+        line, column = self._lines[i], self._columns[i]
+        return Message(
+            code=self._strings[self._codes[i]],
+            description=self._strings[self._descriptions[i]],
+            filepath=self._strings[self._filepaths[i]],
+            line=None if line == self._NONE else line,
+            column=None if column == self._NONE else column,
+        )
+
+    def __iter__(self) -> Iterator[Message]:
+        return (self[i] for i in range(len(self)))
+
+    def _string_id(self, s: Optional[str]) -> int:
+        i = self._string_ids.get(s)
+        if i is None:
+            i = self._string_ids[s] = len(self._strings)
+            self._strings.append(s)
+        return i
+
+
 class Checker:
-    def check(self, filepaths: List[str]) -> List[Message]:
+    """Reports `Message`s about source files.
+
+    Subclasses implement `_check`. When given a `ResultCache`, only files whose
+    messages aren't already cached for the same path, contents, tool version and
+    options are passed to `_check`.
+    """
+
+    _tool_version = ""
+
+    def __init__(self, options: Optional[dict] = None, cache=None):
+        self._options = options or {}
+        self._cache = cache
+
+    def check(self, sources: Sources) -> List[Message]:
+        units = as_units(sources)
+        msgs = self._check_cached(units)
+        msgs.extend(self.check_cross_file(units))
+        return msgs
+
+    def check_batch(
+        self, sources: Iterable[Source], batch: Optional[MessageBatch] = None
+    ) -> MessageBatch:
+        """Like `check`, but appends the messages to a (by default, new) batch.
+
+        Only one file's messages exist as `Message`s at a time.
+        """
+        batch = MessageBatch() if batch is None else batch
+        batch.extend(self.iter_check(sources))
+        return batch
+
+    def iter_check(self, sources: Iterable[Source]) -> Iterator[Message]:
+        """Like `check`, but yields each file's messages as soon as it's checked."""
+        checked = []
+        for unit in iter_units(sources):
+            yield from self.check_file(unit)
+            checked.append(unit.path)
+        yield from self.check_cross_file(checked)
+
+    def check_file(self, source: Source) -> List[Message]:
+        """Messages about a single file that don't depend on any other files."""
+        return self._check_cached(as_units([source]))
+
+    def check_cross_file(self, sources: Sources) -> List[Message]:
+        """Messages that depend on more than one file, which `check_file` skips."""
+        return []
+
+    def _check_cached(self, units: List[SourceUnit]) -> List[Message]:
+        if self._cache is None:
+            return self._check(units)
+
+        token = self._cache_token()
+        keys = [self._cache_key(token, u) for u in units]
+        cached = self._cache.get_many(keys)
+        uncached_msgs = []
+        misses = [u for u, k in zip(units, keys) if k not in cached]
+        if misses:
+            miss_msgs = {u.abspath: [] for u in misses}
+            for m in self._check(misses):
+                path_msgs = miss_msgs.get(os.path.abspath(m.filepath))
+                if path_msgs is None:
+                    uncached_msgs.append(m)
+                else:
+                    path_msgs.append(m)
+
+            new_entries = {
+                k: miss_msgs[u.abspath] for u, k in zip(units, keys) if k not in cached
+            }
+            self._cache.put_many(new_entries)
+            cached.update(new_entries)
+
+        msgs = [m for k in keys for m in cached[k]]
+        msgs.extend(uncached_msgs)
+        return msgs
+
+    def _check(self, units: List[SourceUnit]) -> List[Message]:
         raise NotImplementedError
 
+    def _cache_key(self, token: str, unit: SourceUnit) -> str:
+        return self._cache.key(token, unit.abspath, unit.digest)
+
+    def _cache_token(self) -> str:
+        return ":".join(
+            [
+                self.__class__.__name__,
+                __version__,
+                self._tool_version,
+                json.dumps(self._options, sort_keys=True, default=str),
+            ]
+        )
+
 
 class PyLint(Checker):
-    def __init__(self, options: Optional[dict] = None):
-        options = options or {}
-        checker = PyLinter(reporter=CollectingReporter())
+
+    # messages that compare files against each other, so only make sense when every
+    # file is checked by the same linter
+    CROSS_FILE_MESSAGES = ("duplicate-code", "cyclic-import")
+
+    _tool_version = pylint_version
+
+    def __init__(
+        self,
+        options: Optional[dict] = None,
+        cache=None,
+        astroid_cache=None,
+        memory_limit: Optional[int] = None,
+    ):
+        super().__init__(options, cache)
+        # trees for imported modules, persisted across runs
+        self._astroid_cache = astroid_cache
+        # resident bytes above which `release_memory` drops astroid's trees
+        self._memory_limit = memory_limit
+        # resident bytes just after the trees were last dropped
+        self._released_rss = 0
+        # (module path, directory imported from) -> the module's file
+        self._module_files = {}  # type: Dict[Tuple[Tuple[str, ...], str], str]
+        # file -> (mtime, size, digest) of the contents it was last read with
+        self._file_digests = {}  # type: Dict[str, Tuple[int, int, str]]
+        self._init_linters()
+
+    def _init_linters(self):
+        self._inner = self._init_linter(self._options)
+
+        # cross-file messages are checked by a separate linter, so this one can check
+        # (and cache the results for) each file independently
+        self._cross_file = None
+        cross_file_msgs = [
+            m for m in self.CROSS_FILE_MESSAGES if self._inner.is_message_enabled(m)
+        ]
+        if cross_file_msgs:
+            for m in cross_file_msgs:
+                self._inner.disable(m)
+            self._cross_file = self._init_linter(
+                self.cross_file_options(self._options, cross_file_msgs)
+            )
+            self._cross_file.span_name = "pylint.cross_file"
+
+    @classmethod
+    def cross_file_options(
+        cls, options: Optional[dict] = None, msgs: Sequence[str] = CROSS_FILE_MESSAGES
+    ) -> dict:
+        """Options that only report the given (by default, all) cross-file messages."""
+        options = dict(options or {})
+        options.update({"disable": "all", "enable": ",".join(msgs)})
+        return options
+
+    @classmethod
+    def per_file_options(cls, options: Optional[dict] = None) -> dict:
+        """Options that report everything except cross-file messages."""
+        return cls.without_messages(options, cls.CROSS_FILE_MESSAGES)
+
+    @classmethod
+    def without_messages(cls, options: Optional[dict], msgs: Sequence[str]) -> dict:
+        """Options that also disable the given messages."""
+        options = dict(options or {})
+        disabled = [options["disable"]] if options.get("disable") else []
+        options["disable"] = ",".join(disabled + list(msgs))
+        return options
+
+    @property
+    def checks_cross_file(self) -> bool:
+        """Whether any cross-file messages are enabled."""
+        return self._cross_file is not None
+
+    def check_cross_file(self, sources: Sources) -> List[Message]:
+        if self._cross_file is None:
+            return []
+        units = as_units(sources)
+        if self._cache is None:
+            return self._run_linter(self._cross_file, units)
+
+        # the messages depend on every file, so are only cached for the whole set
+        key = self._cache.key(
+            self._cache_token(),
+            "cross_file",
+            *[f"{u.abspath}:{u.digest}" for u in units],
+        )
+        cached = self._cache.get_many([key])
+        if key not in cached:
+            cached[key] = self._run_linter(self._cross_file, units)
+            self._cache.put_many(cached)
+        return list(cached[key])
+
+    def _cache_key(self, token: str, unit: SourceUnit) -> str:
+        # messages like import-error and no-member also depend on the modules a file
+        # imports. Only direct imports are keyed, though, so a change further down an
+        # import chain can still leave a file's cached messages stale.
+        return self._cache.key(
+            token, unit.abspath, unit.digest, *self._import_digests(unit)
+        )
+
+    def _import_digests(self, unit: SourceUnit) -> List[str]:
+        """Each module `unit` imports, with its file and digest ("" if it has none)."""
+        try:
+            tree = unit.ast
+        except (SyntaxError, ValueError):
+            return []
+        digests = {}  # type: Dict[str, str]
+
+        def add(modpath: Tuple[str, ...], context: str) -> str:
+            filepath = self._module_file(modpath, context)
+            digest = self._file_digest(filepath) if filepath else ""
+            digests[f"{'.'.join(modpath)}:{filepath}"] = digest
+            return filepath
+
+        for modpath, names, context in _imports(tree, unit.abspath):
+            # names imported from a package (or with `from . import`) may be modules
+            if not modpath or add(modpath, context).endswith("__init__.py"):
+                for name in names:
+                    add(modpath + (name,), context)
+        return [f"{k}:{v}" for k, v in digests.items()]
+
+    def _module_file(self, modpath: Tuple[str, ...], context: str) -> str:
+        # missing modules aren't remembered, since they may be added later
+        key = (modpath, os.path.dirname(context))
+        filepath = self._module_files.get(key)
+        if filepath is None:
+            try:
+                filepath = file_from_modpath(list(modpath), context_file=context)
+            except ImportError:
+                return ""
+            if filepath is not None and os.path.isdir(filepath):
+                filepath = os.path.join(filepath, "__init__.py")
+            # builtin modules and namespace packages have no file
+            filepath = os.path.abspath(filepath) if filepath else ""
+            filepath = filepath if os.path.isfile(filepath) else ""
+            self._module_files[key] = filepath
+        return filepath
+
+    def _file_digest(self, filepath: str) -> str:
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            self._module_files = {
+                k: v for k, v in self._module_files.items() if v != filepath
+            }
+            return ""
+        mtime, size, digest = self._file_digests.get(filepath, (None, None, ""))
+        if (mtime, size) != (st.st_mtime_ns, st.st_size):
+            digest = SourceUnit(filepath).digest
+            self._file_digests[filepath] = (st.st_mtime_ns, st.st_size, digest)
+        return digest
+
+    def _check(self, units: List[SourceUnit]) -> List[Message]:
+        return self._run_linter(self._inner, units)
+
+    @staticmethod
+    def _init_linter(options: dict) -> "_SourceLinter":
+        checker = _SourceLinter(reporter=CollectingReporter())
         checkers.initialize(checker)
         checker.disable("I")  # suppress info messages
         for k, v in options.items():
             checker.global_set_option(k, v)
+        return checker
+
+    def _run_linter(
+        self, linter: "_SourceLinter", units: List[SourceUnit]
+    ) -> List[Message]:
+        # the reporter is shared across calls, so drop any earlier call's messages
+        linter.reporter.messages = []
+        linter.sources = {u.abspath: u for u in units}
+        installed = self._astroid_cache.installed() if self._astroid_cache else None
+        try:
+            with installed or nullcontext():
+                linter.check([u.path for u in units])
+            msgs = [self._to_msg(m) for m in linter.reporter.messages]
+        finally:
+            linter.sources = {}
+            linter.reporter.messages = []
+        return msgs
 
-        self._inner = checker
+    def release_memory(self):
+        """Drop astroid's trees if the process is past the memory limit, e.g., between
+        chunks of files.
 
-    def check(self, filepaths: List[str]) -> List[Message]:
-        self._inner.check(filepaths)
-        return [self._to_msg(m) for m in self._inner.reporter.messages]
+        Freed memory mostly stays with the process, to be reused, so the trees are only
+        dropped again once it has grown past what it was after they were last dropped.
+        """
+        if self._memory_limit is None:
+            return
+        if (rss() or 0) <= max(self._memory_limit, self._released_rss):
+            return
+        with span("astroid.evict"):
+            # pylint's checkers hold on to nodes from earlier runs too
+            self._init_linters()
+            evict_astroid_modules()
+        self._released_rss = rss() or 0
 
     @staticmethod
     def _to_msg(m: PyLintMessage) -> Message:
@@ -62,16 +438,218 @@ class PyLint(Checker):
         )
 
 
+def _imports(
+    tree: ast.Module, filepath: str
+) -> Iterator[Tuple[Tuple[str, ...], Tuple[str, ...], str]]:
+    """The module each import in `filepath`'s `tree` is from, the names it imports
+    from the module (if any), and the file to resolve the module relative to.
+    """
+    for node in _import_nodes(tree.body):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield tuple(alias.name.split(".")), (), filepath
+        elif isinstance(node, ast.ImportFrom):
+            context = filepath
+            for _ in range(node.level - 1):
+                # relative to the parent package's directory
+                context = os.path.dirname(context)
+            modpath = tuple(node.module.split(".")) if node.module else ()
+            names = tuple(a.name for a in node.names if a.name != "*")
+            yield modpath, names, context
+
+
+def _import_nodes(stmts: List[ast.stmt]) -> Iterator[ast.stmt]:
+    # imports are statements, so there's no need to walk every expression too
+    for node in stmts:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            yield node
+        for field in ("body", "orelse", "handlers", "finalbody", "cases"):
+            yield from _import_nodes(getattr(node, field, []))
+
+
+# digests of the contents each module's tree in astroid's cache was built from
+_built_digests = {}  # type: Dict[str, str]
+
+
+def evict_astroid_modules():
+    """Drop every module tree astroid has built, along with what was inferred from them.
+
+    Like `MANAGER.clear_cache` in later astroid versions, whereas astroid 2.3's only
+    empties the module cache, leaving trees reachable from `_NODE_CACHES` and astroid's
+    inference tip cache.
+    """
+    MANAGER.clear_cache()
+    for cache_clear in _node_cache_clears():
+        cache_clear()
+    _built_digests.clear()
+
+
+# memoized lookups, transforms and inferences of nodes in astroid 2.3 and pylint 2.4, by
+# module and qualified name. Those missing from the installed versions are skipped.
+_NODE_CACHES = [
+    ("astroid.interpreter.objectmodel", "ObjectModel.attributes"),
+    ("astroid.node_classes", "LookupMixIn.lookup"),
+    ("astroid.transforms", "TransformVisitor._transform"),
+    ("pylint.checkers.utils", "is_overload_stub"),
+    ("pylint.checkers.utils", "safe_infer"),
+    ("pylint.checkers.utils", "unimplemented_abstract_methods"),
+    ("pylint.checkers.variables", "overridden_method"),
+]
+
+
+def _node_cache_clears() -> Iterator[Callable[[], None]]:
+    for module_name, qualname in _NODE_CACHES:
+        # a module that was never imported hasn't cached anything
+        obj = sys.modules.get(module_name)
+        for name in qualname.split("."):
+            obj = getattr(obj, name, None)
+        if callable(getattr(obj, "cache_clear", None)):
+            yield obj.cache_clear
+
+    try:
+        from astroid.inference_tip import clear_inference_tip_cache
+
+        yield clear_inference_tip_cache
+    except ImportError:
+        # before astroid had an inference_tip module, its cache was the default of an
+        # argument to the (wrapt-decorated) caching function
+        cached = getattr(astroid, "_inference_tip_cached", None)
+        defaults = getattr(getattr(cached, "__wrapped__", None), "__defaults__", None)
+        if defaults and isinstance(defaults[0], dict):
+            yield defaults[0].clear
+
+
+class _CheckTimes:
+    """Time spent in each of a tool's checks on a file, recorded as one span per check.
+
+    Checks run for every node or line, so their times are summed rather than each call
+    getting its own span.
+    """
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.ns = defaultdict(int)  # type: Dict[str, int]
+
+    def timed(self, fn, name: str):
+        """`fn`, adding the time each call takes to check `name`'s."""
+        ns = self.ns
+
+        def timed_fn(*args):
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args)
+            finally:
+                ns[name] += time.perf_counter_ns() - start
+
+        return timed_fn
+
+    def record(self, start_ns: int, filepath: str):
+        for name, duration_ns in self.ns.items():
+            profiling.record(
+                f"{self.prefix}.{name}", CHECK, start_ns, duration_ns, file=filepath
+            )
+        self.ns.clear()
+
+
+class _SourceLinter(PyLinter):
+    """PyLinter that builds module trees from already-loaded `SourceUnit`s.
+
+    Files without a registered unit (e.g., modules found while expanding a package
+    directory) fall back to being read from disk as usual.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sources = {}
+        self.span_name = "pylint"
+        self._check_times = _CheckTimes("pylint")
+
+    def check_astroid_module(self, ast_node, walker, rawcheckers, tokencheckers):
+        with span(self.span_name, FILE, file=self.current_file):
+            if not profiling.timing_checks():
+                return super().check_astroid_module(
+                    ast_node, walker, rawcheckers, tokencheckers
+                )
+
+            times = self._check_times
+            # every file of a run shares the walker, so only wrap its callbacks once
+            if not getattr(walker, "timed", False):
+                for events in (walker.visit_events, walker.leave_events):
+                    for cid, callbacks in events.items():
+                        events[cid] = [
+                            times.timed(c, c.__self__.name) for c in callbacks
+                        ]
+                walker.timed = True
+            rawcheckers = [
+                SimpleNamespace(process_module=times.timed(c.process_module, c.name))
+                for c in rawcheckers
+            ]
+            tokencheckers = [
+                SimpleNamespace(process_tokens=times.timed(c.process_tokens, c.name))
+                for c in tokencheckers
+            ]
+            start = time.perf_counter_ns()
+            try:
+                return super().check_astroid_module(
+                    ast_node, walker, rawcheckers, tokencheckers
+                )
+            finally:
+                times.record(start, self.current_file)
+
+    def get_ast(self, filepath, modname):
+        unit = self.sources.get(os.path.abspath(filepath))
+        if unit is None:
+            return super().get_ast(filepath, modname)
+
+        # reuse the tree built for the same contents by an earlier check (e.g., the
+        # per-file pass before the cross-file one)
+        cached = MANAGER.astroid_cache.get(modname)
+        if (
+            cached is not None
+            and cached.file == filepath
+            and _built_digests.get(modname) == unit.digest
+        ):
+            return cached
+
+        # astroid only caches the first tree built for a module name, so drop any stale
+        # one to keep the cache consistent with the contents being checked
+        MANAGER.astroid_cache.pop(modname, None)
+        try:
+            builder = AstroidBuilder(MANAGER)
+            with span("astroid.build", file=filepath):
+                ast_node = builder.string_build(unit.text, modname, filepath)
+            _built_digests[modname] = unit.digest
+            return ast_node
+        except astroid.AstroidSyntaxError as ex:
+            self.add_message(
+                "syntax-error",
+                line=getattr(ex.error, "lineno", 0),
+                col_offset=getattr(ex.error, "offset", None),
+                args=str(ex.error),
+            )
+        except astroid.AstroidBuildingException as ex:
+            self.add_message("parse-error", args=ex)
+
+
 class PyCodeStyle(Checker):
-    def __init__(self, options: Optional[dict] = None):
-        options = options or {}
+
+    _tool_version = pycodestyle_version
+
+    def __init__(self, options: Optional[dict] = None, cache=None):
+        super().__init__(options, cache)
         self._style = StyleGuide(
-            select="E,W", reporter=PyCodeStyle.ErrorReport, **options
+            select="E,W", reporter=PyCodeStyle.ErrorReport, **self._options
         )
         self._style.options.max_line_length = 88
 
-    def check(self, filepaths: List[str]) -> List[Message]:
-        report = self._style.check_files(filepaths)
+    def _check(self, units: List[SourceUnit]) -> List[Message]:
+        report = self._style.options.report
+        report.start()
+        for unit in units:
+            if not self._style.excluded(unit.path):
+                with span("pycodestyle", FILE, file=unit.path):
+                    _UnitStyleChecker(unit, self._style.options).check_all()
+        report.stop()
         return [self._to_msg(e) for e in report.errors]
 
     @staticmethod
@@ -85,6 +663,10 @@ class PyCodeStyle(Checker):
             super().__init__(options)
             self.errors = []
 
+        def start(self):
+            super().start()
+            self.errors = []
+
         def error(self, line_number, offset, text, check):
             code = super().error(line_number, offset, text, check)
             if code:
@@ -93,16 +675,83 @@ class PyCodeStyle(Checker):
                 )
 
 
+class _UnitStyleChecker(pycodestyle.Checker):
+    """pycodestyle's checker, reading a `SourceUnit`'s lines and tokens.
+
+    Tokens are replayed rather than generated from the lines again, advancing the line
+    counter the physical line checks use as the tokenizer would have. While profiling,
+    the time spent in each check is recorded too.
+    """
+
+    def __init__(self, unit: SourceUnit, options):
+        super().__init__(unit.path, lines=unit.lines, options=options)
+        self._unit = unit
+        self._times = _CheckTimes("pycodestyle") if profiling.timing_checks() else None
+
+    def check_all(self, expected=None, line_offset=0):
+        if self._times is None:
+            return super().check_all(expected, line_offset)
+        start = time.perf_counter_ns()
+        try:
+            return super().check_all(expected, line_offset)
+        finally:
+            self._times.record(start, self._unit.path)
+
+    def run_check(self, check, argument_names):
+        if self._times is None:
+            return super().run_check(check, argument_names)
+        start = time.perf_counter_ns()
+        try:
+            return super().run_check(check, argument_names)
+        finally:
+            self._times.ns[check.__name__] += time.perf_counter_ns() - start
+
+    def generate_tokens(self):
+        try:
+            tokens = self._unit.tokens
+        except (SyntaxError, tokenize.TokenError):
+            # pycodestyle reports where tokenizing stopped
+            yield from super().generate_tokens()
+            return
+        for token in tokens:
+            if token[2][0] > self.total_lines:
+                return
+            # the tokenizer reads up to the token's last line before yielding it
+            while self.line_number < token[3][0] and self.readline():
+                pass
+            self.noqa = token[4] and pycodestyle.noqa(token[4])
+            self.maybe_check_physical(token)
+            yield token
+
+
 class PyFlakes(Checker):
-    def check(self, filepaths: List[str]) -> List[Message]:
-        reporter = PyFlakes.CollectingReporter()
-        for filepath in filepaths:
-            checkPath(filepath, reporter=reporter)
 
-        msgs = [self._error_to_msg(e) for e in reporter.errors]
-        msgs.extend([self._flake_to_msg(f) for f in reporter.flakes])
+    _tool_version = pyflakes_version
+
+    def _check(self, units: List[SourceUnit]) -> List[Message]:
+        msgs = []
+        for unit in units:
+            reporter = PyFlakes.CollectingReporter()
+            with span("pyflakes", FILE, file=unit.path):
+                self._check_unit(unit, reporter)
+            msgs.extend([self._error_to_msg(e) for e in reporter.errors])
+            msgs.extend([self._flake_to_msg(f) for f in reporter.flakes])
         return msgs
 
+    @staticmethod
+    def _check_unit(unit: SourceUnit, reporter: "PyFlakes.CollectingReporter"):
+        """Like `pyflakes.api.check`, but with the unit's tree and tokens."""
+        try:
+            tree, tokens = unit.ast, unit.tokens
+        except (SyntaxError, tokenize.TokenError, ValueError):
+            # let pyflakes describe the error
+            check_source(unit.text, unit.path, reporter=reporter)
+            return
+        w = FlakesChecker(tree, file_tokens=tokens, filename=unit.path)
+        w.messages.sort(key=lambda m: m.lineno)
+        for warning in w.messages:
+            reporter.flake(warning)
+
     @staticmethod
     def _error_to_msg(err: Tuple) -> Message:
         m = Message(
@@ -0,0 +1,67 @@
+"""Command line entry point that forwards to a running `pyautodev serve` daemon.
+
+This module only imports the standard library, so forwarding a request to a warm
+daemon doesn't pay for importing pylint, black and libcst. Without a daemon, it falls
+back to running the command in this process.
+"""
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import List, Optional
+
+# subcommands that always run in this process rather than on the daemon
+_LOCAL_COMMANDS = {"bench", "serve", "watch"}
+
+
+def default_socket_path() -> str:
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(runtime_dir, f"pyautodev-{os.getuid()}.sock")
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not os.environ.get("PYAUTODEV_NO_DAEMON") and not (
+        argv and argv[0] in _LOCAL_COMMANDS
+    ):
+        exit_code = forward(argv)
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+    from pyautodev.main import cli
+
+    cli(args=argv, prog_name="pyautodev")
+
+
+def forward(argv: List[str], socket_path: Optional[str] = None) -> Optional[int]:
+    """Run `argv` on the daemon, streaming back its output, and return its exit code.
+
+    Returns None if no daemon is listening on the socket.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path or default_socket_path())
+    except OSError:
+        sock.close()
+        return None
+
+    with sock, sock.makefile("rwb") as f:
+        request = {"argv": argv, "cwd": os.getcwd()}
+        f.write(json.dumps(request).encode("utf-8") + b"\n")
+        f.flush()
+
+        for line in f:
+            event = json.loads(line.decode("utf-8"))
+            if "out" in event:
+                sys.stdout.write(event["out"])
+                sys.stdout.flush()
+            elif "err" in event:
+                sys.stderr.write(event["err"])
+                sys.stderr.flush()
+            elif "exit" in event:
+                return event["exit"]
+
+    # the daemon went away mid-request
+    print("pyautodev daemon closed the connection unexpectedly", file=sys.stderr)
+    return 1
@@ -0,0 +1,189 @@
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+import click
+from astroid import MANAGER
+
+from pyautodev.astroid_cache import AstroidCache
+from pyautodev.cache import ResultCache
+from pyautodev.client import default_socket_path
+from pyautodev.history import CostHistory
+from pyautodev.processor import DEFAULT_CHUNK_SIZE, DEFAULT_LINT_PROFILE, Processor
+
+
+class Daemon:
+    """Runs `pyautodev` commands for clients connecting over a Unix domain socket.
+
+    The daemon keeps one `Processor` per distinct configuration and reuses it across
+    requests, so clients don't pay for importing the underlying tools, initializing
+    pylint or rebuilding astroid trees for unchanged modules. Requests are handled one
+    at a time.
+    """
+
+    def __init__(self, command: click.Command, socket_path: Optional[str] = None):
+        self.command = command
+        self.socket_path = socket_path or default_socket_path()
+        self._processors = {}  # type: Dict[Tuple, Processor]
+        self._last_request_time = time.time()
+
+    def processor(
+        self,
+        jobs: int = 1,
+        cache: Optional[ResultCache] = None,
+        dedup: bool = False,
+        checker_executor: Optional[str] = None,
+        astroid_cache: Optional[AstroidCache] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        memory_limit: Optional[int] = None,
+        lint_profile: str = DEFAULT_LINT_PROFILE,
+        history: Optional[CostHistory] = None,
+    ):
+        """Warm `Processor` for the given configuration, creating it if needed."""
+        key = (
+            jobs,
+            cache.cache_dir if cache else None,
+            dedup,
+            checker_executor,
+            astroid_cache.cache_dir if astroid_cache else None,
+            chunk_size,
+            memory_limit,
+            lint_profile,
+            history.path if history else None,
+        )
+        if key not in self._processors:
+            self._processors[key] = Processor(
+                jobs=jobs,
+                cache=cache,
+                dedup=dedup,
+                checker_executor=checker_executor,
+                astroid_cache=astroid_cache,
+                chunk_size=chunk_size,
+                memory_limit=memory_limit,
+                lint_profile=lint_profile,
+                history=history,
+            )
+        return self._processors[key]
+
+    def serve_forever(self):
+        sock = self._bind()
+        # exit via SystemExit on SIGTERM so the socket file gets cleaned up below
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+        try:
+            while True:
+                conn, _ = sock.accept()
+                with conn, conn.makefile("rwb") as f:
+                    try:
+                        self._handle(f)
+                    except Exception:
+                        # one bad request (or client disconnecting) shouldn't take
+                        # down the daemon
+                        traceback.print_exc()
+        finally:
+            sock.close()
+            os.remove(self.socket_path)
+
+    def _bind(self) -> socket.socket:
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                # left behind by a daemon that didn't shut down cleanly
+                os.remove(self.socket_path)
+            else:
+                raise click.ClickException(
+                    f"a daemon is already listening on {self.socket_path}"
+                )
+            finally:
+                probe.close()
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        sock.listen()
+        return sock
+
+    def _handle(self, f: BinaryIO):
+        request_time = time.time()
+        request = json.loads(f.readline().decode("utf-8"))
+        _evict_stale_modules(self._last_request_time)
+        self._last_request_time = request_time
+
+        orig_cwd = os.getcwd()
+        try:
+            os.chdir(request["cwd"])
+            with redirect_stdout(_EventWriter(f, "out")), redirect_stderr(
+                _EventWriter(f, "err")
+            ):
+                exit_code = self._run(request["argv"])
+        finally:
+            os.chdir(orig_cwd)
+
+        _send(f, {"exit": exit_code})
+
+    def _run(self, argv: List[str]) -> int:
+        try:
+            # without standalone mode, click returns (rather than raises) the code of
+            # an `Exit`, e.g., from --check
+            exit_code = self.command.main(
+                args=argv,
+                prog_name="pyautodev",
+                standalone_mode=False,
+                obj={"processor_factory": self.processor},
+            )
+        except click.ClickException as e:
+            e.show()
+            return e.exit_code
+        except click.Abort:
+            return 1
+        except Exception:
+            traceback.print_exc()
+            return 1
+        return exit_code if isinstance(exit_code, int) else 0
+
+
+class _EventWriter(io.TextIOBase):
+    """Text stream that forwards each write to the client as a JSON event."""
+
+    def __init__(self, f: BinaryIO, stream: str):
+        super().__init__()
+        self._f = f
+        self._stream = stream
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, s: str) -> int:
+        if not isinstance(s, str):
+            raise TypeError(f"expected str, got {type(s).__name__}")
+        if s:
+            _send(self._f, {self._stream: s})
+        return len(s)
+
+    def flush(self):
+        self._f.flush()
+
+
+def _send(f: BinaryIO, event: dict):
+    f.write(json.dumps(event).encode("utf-8") + b"\n")
+    f.flush()
+
+
+def _evict_stale_modules(since: float):
+    """Drop cached astroid modules whose files may have changed after `since`."""
+    for modname, module in list(MANAGER.astroid_cache.items()):
+        if not module.file:
+            continue
+        try:
+            if os.stat(module.file).st_mtime >= since:
+                del MANAGER.astroid_cache[modname]
+        except OSError:
+            del MANAGER.astroid_cache[modname]
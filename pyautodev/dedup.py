@@ -0,0 +1,88 @@
+"""Collapsing messages that several checkers report about the same problem.
+
+Pylint, pyflakes and pycodestyle overlap: an unused import is both pylint's W0611 and
+pyflakes' UnusedImport, and a long line both pylint's C0301 and pycodestyle's E501.
+`EQUIVALENT_CODES` maps each shared problem to every tool's codes for it, so messages
+can be fingerprinted by (path, line, problem) and only the first tool's kept.
+"""
+import os
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from pyautodev.checkers import Message
+
+# problem: (pylint codes, pyflakes codes, pycodestyle codes)
+EQUIVALENT_CODES = {
+    "unused-import": (("W0611",), ("UnusedImport",), ()),
+    "unused-variable": (("W0612",), ("UnusedVariable",), ()),
+    "undefined-name": (("E0602",), ("UndefinedName",), ()),
+    "undefined-all-variable": (("E0603",), ("UndefinedExport",), ()),
+    "wildcard-import": (("W0401",), ("ImportStarUsed",), ()),
+    "duplicate-key": (("W0109",), ("MultiValueRepeatedKeyLiteral",), ()),
+    "duplicate-argument-name": (("E0108",), ("DuplicateArgument",), ()),
+    "return-outside-function": (("E0104",), ("ReturnOutsideFunction",), ()),
+    "yield-outside-function": (("E0105",), ("YieldOutsideFunction",), ()),
+    "not-in-loop": (("E0103",), ("BreakOutsideLoop", "ContinueOutsideLoop"), ()),
+    "literal-comparison": (("R0123",), ("IsLiteral",), ()),
+    "line-too-long": (("C0301",), (), ("E501",)),
+    "trailing-whitespace": (("C0303",), (), ("W291", "W293")),
+    "missing-final-newline": (("C0304",), (), ("W292",)),
+    "trailing-newlines": (("C0305",), (), ("W391",)),
+    "multiple-statements": (("C0321",), (), ("E701", "E702")),
+    "unnecessary-semicolon": (("W0301",), (), ("E703",)),
+    "singleton-comparison": (("C0121",), (), ("E711", "E712")),
+    "bare-except": (("W0702",), (), ("E722",)),
+    "mixed-indentation": (("W0312",), (), ("W191",)),
+    "anomalous-backslash-in-string": (("W1401",), (), ("W605",)),
+}
+
+_TOOLS = ("pylint", "pyflakes", "pycodestyle")
+
+# each tool's code -> the problem it's equivalent to, and the tool
+_PROBLEMS = {
+    code: (problem, tool)
+    for problem, tool_codes in EQUIVALENT_CODES.items()
+    for tool, codes in zip(_TOOLS, tool_codes)
+    for code in codes
+}  # type: Dict[str, Tuple[str, str]]
+
+Fingerprint = Tuple[str, Optional[int], str]
+
+
+def pylint_overlaps() -> Tuple[str, ...]:
+    """Pylint codes for problems that pyflakes or pycodestyle also report.
+
+    Pylint is by far the slowest checker, so these are the ones worth disabling when
+    messages are deduplicated anyway.
+    """
+    return tuple(
+        code
+        for pylint_codes, pyflakes_codes, pycodestyle_codes in EQUIVALENT_CODES.values()
+        if pyflakes_codes or pycodestyle_codes
+        for code in pylint_codes
+    )
+
+
+def fingerprint(m: Message) -> Optional[Fingerprint]:
+    """(path, line, problem) for messages about a problem other tools also report."""
+    problem = _PROBLEMS.get(m.code)
+    if problem is None:
+        return None
+    # tools disagree on columns (and on whether paths are absolute), so ignore columns
+    return os.path.abspath(m.filepath), m.line, problem[0]
+
+
+def dedup(msgs: Iterable[Message]) -> Iterator[Message]:
+    """Drop messages whose fingerprint matches an earlier one from another tool.
+
+    Whichever tool's message comes first is kept, so order `msgs` by priority. A tool's
+    own messages are never collapsed, since one line can have several problems of the
+    same kind (e.g., two unused imports), which each tool reports separately.
+    """
+    tools = {}  # type: Dict[Fingerprint, str]
+    for m in msgs:
+        fp = fingerprint(m)
+        if fp is not None:
+            tool = _PROBLEMS[m.code][1]
+            if tools.setdefault(fp, tool) != tool:
+                continue
+        yield m
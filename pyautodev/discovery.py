@@ -0,0 +1,314 @@
+"""Finding the Python files beneath the paths given on the command line.
+
+Directories are scanned with `os.scandir` across a pool of threads, one directory per
+task, and the results are put back together in the same order a sorted `os.walk`
+would give. Directories that are never worth checking (VCS metadata, virtualenvs,
+build output, vendored code) are skipped, as is anything matched by a `.gitignore`
+or an `exclude` glob.
+"""
+import os
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from fnmatch import fnmatchcase
+from typing import Dict, Iterable, List, Optional, Pattern, Sequence, Tuple
+
+# names of directories that hold VCS metadata, environments, caches, build output or
+# vendored third-party code
+DEFAULT_EXCLUDES = (
+    ".git",
+    ".hg",
+    ".svn",
+    ".eggs",
+    "*.egg-info",
+    ".mypy_cache",
+    ".nox",
+    ".pytest_cache",
+    ".tox",
+    ".venv",
+    "__pycache__",
+    "_build",
+    "_vendor",
+    "buck-out",
+    "build",
+    "dist",
+    "node_modules",
+    "site-packages",
+    "third_party",
+    "vendor",
+    "venv",
+)
+
+_DEFAULT_THREADS = min(32, (os.cpu_count() or 1) + 4)
+
+
+def discover(
+    srcs: Iterable[str],
+    exclude: Sequence[str] = (),
+    gitignore: bool = True,
+    default_excludes: Sequence[str] = DEFAULT_EXCLUDES,
+    threads: int = _DEFAULT_THREADS,
+) -> List[str]:
+    """Expand any directories in `srcs` into the Python files beneath them.
+
+    Files named directly in `srcs` are always kept. Beneath directories, files and
+    directories are skipped when their name matches `default_excludes`, their name or
+    path relative to the directory given matches an `exclude` glob, or (if `gitignore`)
+    a `.gitignore` ignores them. Each file appears once, in the order it's first found.
+    """
+    filepaths = []
+    for src in srcs:
+        if os.path.isdir(src):
+            walker = Walker(src, exclude, default_excludes, gitignore, threads)
+            filepaths.extend(walker.walk())
+        else:
+            filepaths.append(src)
+    return list(dict.fromkeys(filepaths))
+
+
+class GitIgnore:
+    """The patterns in a single .gitignore (or info/exclude) file.
+
+    Patterns are matched against paths relative to `base_dir`, following gitignore(5):
+    later patterns override earlier ones, a leading "!" re-includes, a trailing "/"
+    only matches directories, and patterns without an inner "/" match at any depth.
+    """
+
+    def __init__(self, base_dir: str, lines: Iterable[str]):
+        self.base_dir = os.path.abspath(base_dir)
+        self._prefix_len = len(os.path.join(self.base_dir, ""))
+        self._patterns = [
+            p for p in (self._parse(line) for line in lines) if p is not None
+        ]  # type: List[Tuple[Pattern, bool, bool]]
+
+    @classmethod
+    def load(cls, base_dir: str, path: str) -> Optional["GitIgnore"]:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                ignore = cls(base_dir, f.read().splitlines())
+        except OSError:
+            return None
+        return ignore if ignore._patterns else None
+
+    def match(self, path: str, is_dir: bool) -> Optional[bool]:
+        """True if `path` is ignored, False if re-included, or None if nothing matches.
+
+        `path` must be an absolute path beneath `base_dir`.
+        """
+        relpath = path[self._prefix_len :].replace(os.sep, "/")
+        result = None
+        for regex, negated, dir_only in self._patterns:
+            if (is_dir or not dir_only) and regex.match(relpath):
+                result = not negated
+        return result
+
+    @staticmethod
+    def _parse(line: str) -> Optional[Tuple[Pattern, bool, bool]]:
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        elif line.startswith("\\"):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+
+        # patterns with a "/" other than at the end are relative to the file's directory
+        anchored = "/" in line
+        regex = _translate(line.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        return re.compile(regex + r"\Z"), negated, dir_only
+
+
+# the ignore files that apply in a directory, outermost first
+_Ignores = Tuple[GitIgnore, ...]
+
+
+class Walker:
+    """Finds the Python files beneath `root` that `discover` keeps.
+
+    The directories walked are remembered in `dirs`, along with the .gitignore files
+    that apply in each, so paths that show up in them later can be filtered the same
+    way (see `includes`).
+    """
+
+    def __init__(
+        self,
+        root: str,
+        exclude: Sequence[str] = (),
+        default_excludes: Sequence[str] = DEFAULT_EXCLUDES,
+        gitignore: bool = True,
+        threads: int = _DEFAULT_THREADS,
+    ):
+        self.root = root
+        self._absroot = os.path.abspath(root)
+        self._prefix_len = len(os.path.join(self._absroot, ""))
+        self.exclude = exclude
+        self.default_excludes = default_excludes
+        self.gitignore = gitignore
+        self.threads = threads
+        # absolute path of each directory walked -> its ignore files
+        self.dirs = {}  # type: Dict[str, _Ignores]
+
+    def walk(self, subdir: Optional[str] = None) -> List[str]:
+        """The files beneath the root, or only beneath `subdir`, a directory the walk
+        would find in a directory it already walked.
+        """
+        start = os.path.abspath(subdir) if subdir else self._absroot
+        if start == self._absroot:
+            ignores = self._parent_ignores() if self.gitignore else ()
+        else:
+            ignores = self.dirs[os.path.dirname(start)]
+        scanned = {}  # type: Dict[str, Tuple[List[str], List[str]]]
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            pending = {executor.submit(self._scan, start, ignores)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dirpath, dir_ignores, filepaths, subdirs = future.result()
+                    self.dirs[dirpath] = dir_ignores
+                    scanned[dirpath] = filepaths, [d for d, _ in subdirs]
+                    pending.update(
+                        executor.submit(self._scan, d, i) for d, i in subdirs
+                    )
+
+        # each directory's files, then its subdirectories', as in a sorted os.walk
+        filepaths = []
+        stack = [start]
+        while stack:
+            dir_filepaths, subdirs = scanned[stack.pop()]
+            filepaths.extend(dir_filepaths)
+            stack.extend(reversed(subdirs))
+
+        # scanned as absolute paths, but returned beneath the root as given
+        return [os.path.join(self.root, f[self._prefix_len :]) for f in filepaths]
+
+    def includes(self, path: str, is_dir: bool) -> bool:
+        """Whether a walk would find `path`, an absolute path in a walked directory."""
+        ignores = self.dirs.get(os.path.dirname(path))
+        if ignores is None or (not is_dir and not path.endswith(".py")):
+            return False
+        return not self._excluded(path, os.path.basename(path), is_dir, ignores)
+
+    def _scan(
+        self, dirpath: str, ignores: _Ignores
+    ) -> Tuple[str, _Ignores, List[str], List[Tuple[str, _Ignores]]]:
+        try:
+            with os.scandir(dirpath) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            # like os.walk, skip directories we can't list
+            return dirpath, ignores, [], []
+
+        if self.gitignore and any(e.name == ".gitignore" for e in entries):
+            ignore = GitIgnore.load(dirpath, os.path.join(dirpath, ".gitignore"))
+            if ignore is not None:
+                ignores = ignores + (ignore,)
+
+        filepaths = []
+        subdirs = []
+        for entry in entries:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                continue
+            if not is_dir and not entry.name.endswith(".py"):
+                continue
+            if self._excluded(entry.path, entry.name, is_dir, ignores):
+                continue
+            if is_dir:
+                subdirs.append((entry.path, ignores))
+            else:
+                filepaths.append(entry.path)
+        return dirpath, ignores, filepaths, subdirs
+
+    def _excluded(self, path: str, name: str, is_dir: bool, ignores: _Ignores) -> bool:
+        if is_dir and any(fnmatchcase(name, p) for p in self.default_excludes):
+            return True
+
+        if self.exclude:
+            relpath = path[self._prefix_len :].replace(os.sep, "/")
+            if any(
+                fnmatchcase(name, p) or fnmatchcase(relpath, p) for p in self.exclude
+            ):
+                return True
+
+        # deeper .gitignore files take precedence over shallower ones
+        for ignore in reversed(ignores):
+            ignored = ignore.match(path, is_dir)
+            if ignored is not None:
+                return ignored
+        return False
+
+    def _parent_ignores(self) -> _Ignores:
+        """Ignore files from the root's repo that apply to it from above the root.
+
+        The root's own .gitignore is loaded when it's scanned, like any other directory.
+        """
+        ignores = []
+        dirpath = self._absroot
+        while True:
+            if dirpath != self._absroot:
+                ignore = GitIgnore.load(dirpath, os.path.join(dirpath, ".gitignore"))
+                if ignore is not None:
+                    ignores.append(ignore)
+            if os.path.exists(os.path.join(dirpath, ".git")):
+                info_exclude = os.path.join(dirpath, ".git", "info", "exclude")
+                ignore = GitIgnore.load(dirpath, info_exclude)
+                if ignore is not None:
+                    ignores.append(ignore)
+                # outermost first, so deeper files take precedence
+                return tuple(reversed(ignores))
+
+            parent = os.path.dirname(dirpath)
+            if parent == dirpath:
+                # not in a git repo, so only the root's own .gitignore files apply
+                return ()
+            dirpath = parent
+
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regex, where "*" doesn't match "/"."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+
+        if c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                regex += re.escape(c)
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(c)
+        i += 1
+    return regex
@@ -0,0 +1,63 @@
+"""How long each file took in each stage, for scheduling the slowest work first."""
+import os
+from typing import Callable, Dict
+
+from pyautodev.cache import JsonStore
+from pyautodev.profiling import FILE, Profiler
+
+
+class CostHistory(JsonStore):
+    """The seconds each file spent in each stage (black, pyautodev, each checker) on
+    its latest run, along with its size then.
+
+    Files without a history are estimated from their size, at the average seconds per
+    byte of the files with one.
+    """
+
+    kind = "history"
+
+    def record(self, profiler: Profiler):
+        """Replace the history of each stage the profiler timed with the latest run's.
+
+        Stages a file skipped this time (e.g., checkers whose results were cached) keep
+        their earlier time, which is what they'll take once the file changes.
+        """
+        latest = {}  # type: Dict[str, Dict[str, float]]
+        for (filepath, name), seconds in profiler.file_totals(FILE):
+            stages = latest.setdefault(os.path.abspath(filepath), {})
+            stages[name] = stages.get(name, 0.0) + seconds
+        if not latest:
+            return
+
+        files = self._load()
+        for filepath, stages in latest.items():
+            if os.path.isfile(filepath):
+                entry = files.get(filepath)
+                if entry is not None:
+                    stages = dict(entry["stages"], **stages)
+                files[filepath] = {"size": os.path.getsize(filepath), "stages": stages}
+        self._save()
+
+    def stages(self, filepath: str) -> Dict[str, float]:
+        """The seconds `filepath` spent in each stage on its latest run, if any."""
+        entry = self._load().get(os.path.abspath(filepath))
+        return dict(entry["stages"]) if entry else {}
+
+    def estimator(self) -> Callable[[str], float]:
+        """A function estimating the seconds processing a file will take."""
+        files = self._load()
+        seconds = sum(sum(e["stages"].values()) for e in files.values())
+        size = sum(e["size"] for e in files.values())
+        # without any history, sizes alone still rank the files
+        seconds_per_byte = seconds / size if seconds and size else 1.0
+
+        def estimate(filepath: str) -> float:
+            entry = files.get(os.path.abspath(filepath))
+            if entry is not None:
+                return sum(entry["stages"].values())
+            try:
+                return os.path.getsize(filepath) * seconds_per_byte
+            except OSError:
+                return 0.0
+
+        return estimate
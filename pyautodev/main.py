@@ -1,10 +1,155 @@
+import os
+import subprocess
+import sys
+import time
+from contextlib import nullcontext
+
 import click
-from typing import Tuple
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from pyautodev import bench
+from pyautodev.astroid_cache import AstroidCache
+from pyautodev.cache import DEFAULT_CACHE_DIR, ResultCache
+from pyautodev.changes import RunState, git_changed_files, select_changed
+from pyautodev.client import default_socket_path
+from pyautodev.daemon import Daemon
+from pyautodev.discovery import discover
+from pyautodev.history import CostHistory
+from pyautodev.output import WRITERS, timing_metadata
+from pyautodev.processor import (
+    CHECKER_EXECUTORS,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_LINT_PROFILE,
+    LINT_PROFILES,
+    Processor,
+)
+from pyautodev.profiling import Profiler, Timings
+from pyautodev.shard import ShardResult, merge, merge_timing, parse_shard, partition
+from pyautodev.watch import DEFAULT_DEBOUNCE, Watch
+
+CONTEXT_SETTINGS = dict(help_option_names=["-h", "--help"])
+
+
+def _parse_shard(ctx, param, value: Optional[str]) -> Optional[Tuple[int, int]]:
+    if value is None:
+        return None
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+class _DefaultGroup(click.Group):
+    """Group that runs `check` unless the first argument names another subcommand.
+
+    This keeps the original `pyautodev <src>...` invocation working.
+    """
+
+    def parse_args(self, ctx, args):
+        known = set(self.commands) | set(ctx.help_option_names)
+        if not args or args[0] not in known:
+            args = ["check"] + list(args)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_DefaultGroup, context_settings=CONTEXT_SETTINGS)
+def cli():
+    pass
+
+
+# the options `check` and `watch` build their `Processor` from
+_PROCESSOR_OPTIONS = [
+    click.option(
+        "-j",
+        "--jobs",
+        type=click.IntRange(min=0),
+        default=1,
+        show_default=True,
+        help="Number of worker processes to shard files across (0 for one per CPU).",
+    ),
+    click.option(
+        "--cache/--no-cache",
+        default=True,
+        show_default=True,
+        help="Reuse checker results for files whose contents haven't changed.",
+    ),
+    click.option(
+        "--cache-dir",
+        type=click.Path(file_okay=False, dir_okay=True, writable=True),
+        default=DEFAULT_CACHE_DIR,
+        show_default=True,
+        help="Directory to store cached checker results in.",
+    ),
+    click.option(
+        "--astroid-cache/--no-astroid-cache",
+        default=False,
+        show_default=True,
+        help="Keep the trees pylint parses for imported modules in --cache-dir, and "
+        "reuse them in later runs while the modules are unchanged.",
+    ),
+    click.option(
+        "--cost-history/--no-cost-history",
+        default=True,
+        show_default=True,
+        help="Record how long each file takes in each stage in --cache-dir, and give "
+        "workers the slowest files first (and on their own) with more than one job.",
+    ),
+    click.option(
+        "--dedup",
+        is_flag=True,
+        help="Report each problem that several checkers find only once, and skip "
+        "pylint's checks for problems pyflakes or pycodestyle also find.",
+    ),
+    click.option(
+        "--checker-executor",
+        type=click.Choice(CHECKER_EXECUTORS),
+        help="Run pylint, pyflakes and pycodestyle alongside each other on threads or "
+        "processes, instead of one after another. Only processes run them in parallel, "
+        "taking about as long as pylint alone; threads take turns holding the GIL, "
+        "which saves little. Ignored with more than one job.",
+    ),
+    click.option(
+        "--lint-profile",
+        type=click.Choice(sorted(LINT_PROFILES)),
+        default=DEFAULT_LINT_PROFILE,
+        show_default=True,
+        help="Checks to run: fast leaves out pylint's checks that infer across modules "
+        "or compare files (e.g., for pre-commit), full runs everything.",
+    ),
+    click.option(
+        "--chunk-size",
+        type=click.IntRange(min=1),
+        default=DEFAULT_CHUNK_SIZE,
+        show_default=True,
+        help="Maximum number of files transformed and checked together.",
+    ),
+    click.option(
+        "--memory-limit",
+        metavar="MB",
+        type=click.IntRange(min=1),
+        help="Once a process's resident memory exceeds this, drop pylint's astroid "
+        "trees after each chunk of files (if it has grown since they were last "
+        "dropped), so memory stays flat over many files.",
+    ),
+]
 
-from processor import Processor
 
+def _processor_options(fn):
+    for option in reversed(_PROCESSOR_OPTIONS):
+        fn = option(fn)
+    return fn
+
+
+_exclude_option = click.option(
+    "--exclude",
+    metavar="GLOB",
+    multiple=True,
+    help="Skip files and directories whose name or path relative to SRC matches "
+    "this glob (repeatable). Anything in a .gitignore is always skipped.",
+)
 
-@click.command(context_settings=dict(help_option_names=["-h", "--help"]))
+
+@cli.command("check", context_settings=CONTEXT_SETTINGS)
 @click.argument(
     "src",
     nargs=-1,
@@ -13,12 +158,436 @@ from processor import Processor
     ),
     is_eager=True,
 )
-def main(src: Tuple[str]):
-    p = Processor()
-    msgs = p.process([str(s) for s in src])
-    for m in msgs:
-        print(m)
+@_processor_options
+@_exclude_option
+@click.option(
+    "--changed-since",
+    metavar="REF",
+    help="Only process files added or modified relative to this git ref.",
+)
+@click.option(
+    "--changed-since-last-run",
+    is_flag=True,
+    help="Only process files modified since the last run from this directory, as "
+    "recorded in --cache-dir.",
+)
+@click.option(
+    "--shard",
+    metavar="I/N",
+    callback=_parse_shard,
+    help="Only process the I-th of N shards of the files, and write their messages "
+    "to --shard-file for `pyautodev merge` to combine. Pylint's cross-file messages "
+    "are left to the merge.",
+)
+@click.option(
+    "--shard-by",
+    type=click.Choice(["size", "history"]),
+    default="size",
+    show_default=True,
+    help="Balance --shard by file size, or by --cost-history, which every runner "
+    "then needs the same copy of (e.g., restored from a shared CI cache).",
+)
+@click.option(
+    "--shard-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Result file for --shard.  [default: pyautodev-shard-I-of-N.json]",
+)
+@click.option(
+    "--diff",
+    "show_diff",
+    is_flag=True,
+    help="Print a unified diff of what the transformers would change instead of "
+    "writing it, and skip the checkers. Nothing on disk is modified.",
+)
+@click.option(
+    "--check",
+    is_flag=True,
+    help="Like --diff, but exit with status 1 if any file would change, only "
+    "printing the diffs when --diff is also given.",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(sorted(WRITERS)),
+    default="text",
+    show_default=True,
+    help="Output format. jsonl and sarif end with per-tool and per-file timings.",
+)
+@click.option(
+    "--profile",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write per-stage and per-file timings to this file as a Chrome trace, and "
+    "print a summary of them.",
+)
+@click.option(
+    "--profile-memory",
+    is_flag=True,
+    help="Also trace Python memory allocations in --profile (slower).",
+)
+@click.pass_context
+def main(
+    ctx: click.Context,
+    src: Tuple[str],
+    jobs: int,
+    cache: bool,
+    cache_dir: str,
+    astroid_cache: bool,
+    cost_history: bool,
+    exclude: Tuple[str],
+    changed_since: Optional[str],
+    changed_since_last_run: bool,
+    shard: Optional[Tuple[int, int]],
+    shard_file: Optional[str],
+    shard_by: str,
+    dedup: bool,
+    checker_executor: Optional[str],
+    lint_profile: str,
+    chunk_size: int,
+    memory_limit: Optional[int],
+    show_diff: bool,
+    check: bool,
+    output_format: str,
+    profile: Optional[str],
+    profile_memory: bool,
+):
+    if changed_since and changed_since_last_run:
+        raise click.UsageError(
+            "--changed-since and --changed-since-last-run are mutually exclusive"
+        )
+    if profile_memory and not profile:
+        raise click.UsageError("--profile-memory requires --profile")
+
+    # discover files once, so every stage below sees the same ordered list
+    filepaths = discover([str(s) for s in src], exclude=exclude)
+    run_state = RunState(RunState.default_path(cache_dir))
+    if changed_since:
+        try:
+            changed = git_changed_files(changed_since, cwd=_src_dir(src))
+            filepaths = select_changed(filepaths, changed)
+        except subprocess.CalledProcessError as e:
+            raise click.ClickException(f"could not diff against {changed_since}: {e}")
+    elif changed_since_last_run:
+        filepaths = run_state.changed(filepaths)
+    history = CostHistory(CostHistory.default_path(cache_dir)) if cost_history else None
+    if shard_by == "history" and history is None:
+        raise click.UsageError("--shard-by history requires --cost-history")
+
+    all_filepaths = filepaths
+    if shard:
+        # every runner computes the same shards from the same files
+        cost = history.estimator() if shard_by == "history" else None
+        filepaths = partition(all_filepaths, shard[1], cost)[shard[0] - 1]
+
+    # the daemon passes in a factory that reuses warm processors across requests
+    processor_factory = (ctx.obj or {}).get("processor_factory", Processor)
+    p = _new_processor(
+        processor_factory,
+        jobs=jobs,
+        cache=cache,
+        cache_dir=cache_dir,
+        astroid_cache=astroid_cache,
+        history=history,
+        dedup=dedup,
+        checker_executor=checker_executor,
+        lint_profile=lint_profile,
+        chunk_size=chunk_size,
+        memory_limit=memory_limit,
+    )
+    profiler = None
+    if profile:
+        profiler = Profiler(trace_memory=profile_memory)
+    elif output_format != "text":
+        profiler = Timings()
+
+    if show_diff or check:
+        with profiler or nullcontext():
+            changed = _transform_read_only(p, filepaths, show_diff)
+        if profile:
+            profiler.dump(profile)
+            click.echo(profiler.summary(), err=True)
+        if processor_factory is Processor:
+            p.close()
+        if check and changed:
+            click.echo(f"{changed} file(s) would be changed", err=True)
+            raise click.exceptions.Exit(1)
+        return
+
+    result = None
+    if shard:
+        result = ShardResult.start(*shard, all_filepaths, filepaths, p)
+        # the result file carries timings to merge, whatever the output format
+        profiler = profiler or Timings()
+    if history:
+        profiler = profiler or Timings(checks=False)
+
+    writer = WRITERS[output_format](sys.stdout)
+    start = time.perf_counter()
+    with profiler or nullcontext():
+        for m in p.iter_process(filepaths, cross_file=result is None):
+            writer.write(m)
+            if result:
+                result.record(m)
+    elapsed = time.perf_counter() - start
+    timing = timing_metadata(profiler, elapsed) if profiler else None
+    writer.close(timing)
+    if p.history:
+        # the daemon's processors keep their history, so it stays up to date
+        p.history.record(profiler)
+    if result:
+        result.finish(p, timing)
+        result.dump(shard_file or f"pyautodev-shard-{shard[0]}-of-{shard[1]}.json")
+    if processor_factory is Processor:
+        # unlike the daemon's, this processor won't be reused
+        p.close()
+
+    if profile:
+        profiler.dump(profile)
+        click.echo(profiler.summary(), err=True)
+
+    # record stats after processing, since the transformers may have rewritten files
+    run_state.record(filepaths)
+
+
+def _src_dir(srcs: Sequence[str]) -> Optional[str]:
+    """The directory the paths in `srcs` have in common, to run git in."""
+    dirs = [
+        os.path.abspath(s if os.path.isdir(s) else os.path.dirname(s) or ".")
+        for s in srcs
+        if s != "-"
+    ]
+    return os.path.commonpath(dirs) if dirs else None
+
+
+def _new_processor(
+    factory: Callable[..., Processor],
+    cache: bool,
+    cache_dir: str,
+    astroid_cache: bool,
+    memory_limit: Optional[int],
+    **options,
+) -> Processor:
+    """A processor built from the options `_processor_options` adds."""
+    return factory(
+        cache=ResultCache(cache_dir) if cache else None,
+        astroid_cache=AstroidCache(cache_dir) if astroid_cache else None,
+        memory_limit=memory_limit * 2 ** 20 if memory_limit else None,
+        **options,
+    )
+
+
+def _transform_read_only(p: Processor, filepaths: List[str], show_diff: bool) -> int:
+    """Count (and maybe print) the files the transformers would change."""
+    changed = 0
+    for diff in p.iter_diffs(filepaths):
+        changed += 1
+        if show_diff:
+            sys.stdout.write(diff)
+    return changed
+
+
+@cli.command("merge", context_settings=CONTEXT_SETTINGS)
+@click.argument(
+    "result_files",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, readable=True),
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(sorted(WRITERS)),
+    default="text",
+    show_default=True,
+    help="Output format. jsonl and sarif end with the shards' combined timings.",
+)
+def merge_shards(result_files: Tuple[str], output_format: str):
+    """Print the messages of every --shard of a run, as a single run would have.
+
+    Pylint's cross-file checks run here, so this needs the same checkout as the shards.
+    """
+    try:
+        results = [ShardResult.load(f) for f in result_files]
+        msgs = merge(results)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    writer = WRITERS[output_format](sys.stdout)
+    profiler = Timings()
+    start = time.perf_counter()
+    with profiler:
+        for m in msgs:
+            writer.write(m)
+    elapsed = time.perf_counter() - start
+    writer.close(merge_timing(results, timing_metadata(profiler, elapsed)))
+
+
+@cli.command("serve", context_settings=CONTEXT_SETTINGS)
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(dir_okay=False),
+    default=default_socket_path(),
+    show_default=True,
+    help="Unix domain socket to listen on.",
+)
+def serve(socket_path: str):
+    """Keep a warm processor in memory and run commands from pyautodev clients."""
+    click.echo(f"listening on {socket_path}", err=True)
+    Daemon(cli, socket_path).serve_forever()
+
+
+@cli.command("watch", context_settings=CONTEXT_SETTINGS)
+@click.argument(
+    "src",
+    nargs=-1,
+    required=True,
+    type=click.Path(exists=True, file_okay=True, dir_okay=True, readable=True),
+)
+@click.option("--poll", is_flag=True, help="Poll for changes instead of using inotify.")
+@click.option(
+    "--debounce",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_DEBOUNCE,
+    show_default=True,
+    help="Seconds to wait for a burst of saves to settle before processing.",
+)
+@_exclude_option
+@_processor_options
+def watch(
+    src: Tuple[str],
+    poll: bool,
+    debounce: float,
+    exclude: Tuple[str],
+    cache_dir: str,
+    cost_history: bool,
+    **options,
+):
+    """Re-process files under SRC whenever they're saved."""
+    history = CostHistory(CostHistory.default_path(cache_dir)) if cost_history else None
+    p = _new_processor(Processor, cache_dir=cache_dir, history=history, **options)
+    w = Watch([str(s) for s in src], p, poll=poll, debounce=debounce, exclude=exclude)
+    click.echo(f"watching {', '.join(src)}", err=True)
+    try:
+        w.run(emit=lambda m: print(m, flush=True))
+    finally:
+        p.close()
+
+
+@cli.command("bench", context_settings=CONTEXT_SETTINGS)
+@click.option("--files", type=click.IntRange(min=1), default=20, show_default=True)
+@click.option(
+    "--lines",
+    type=click.IntRange(min=1),
+    default=200,
+    show_default=True,
+    help="Approximate number of lines in each generated file.",
+)
+@click.option(
+    "--long-comments",
+    type=click.FloatRange(0, 1),
+    default=0.05,
+    show_default=True,
+    help="Chance of a long comment line before each statement.",
+)
+@click.option(
+    "--inline-comments",
+    type=click.FloatRange(0, 1),
+    default=0.1,
+    show_default=True,
+    help="Chance of an inline comment after each statement.",
+)
+@click.option(
+    "--violations",
+    type=click.FloatRange(0, 1),
+    default=0.05,
+    show_default=True,
+    help="Chance of each statement being a lint violation.",
+)
+@click.option(
+    "--nesting",
+    type=click.FloatRange(0, 1),
+    default=0.2,
+    show_default=True,
+    help="Chance of each statement opening (or closing) a nested block.",
+)
+@click.option("--max-depth", type=click.IntRange(min=1), default=4, show_default=True)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="Number of runs, keeping each stage's fastest.",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write the results as JSON to this file.",
+)
+@click.option(
+    "--baseline",
+    type=click.Path(exists=True, dir_okay=False, readable=True),
+    help="Compare against results previously written with --output.",
+)
+@click.option(
+    "--tolerance",
+    type=click.FloatRange(min=0),
+    default=bench.DEFAULT_TOLERANCE,
+    show_default=True,
+    help="Fraction slower than the baseline a stage may get before failing.",
+)
+@click.option(
+    "--reflow",
+    is_flag=True,
+    help="Instead, time comment reflow over growing comment blocks, to show how it "
+    "scales.",
+)
+def benchmark(
+    files: int,
+    lines: int,
+    long_comments: float,
+    inline_comments: float,
+    violations: float,
+    nesting: float,
+    max_depth: int,
+    seed: int,
+    repeat: int,
+    output: Optional[str],
+    baseline: Optional[str],
+    tolerance: float,
+    reflow: bool,
+):
+    """Time each stage over a synthetic corpus, optionally comparing to a baseline."""
+    if reflow:
+        click.echo(bench.format_reflow_table(bench.reflow_scaling(repeat=repeat)))
+        return
+
+    spec = bench.CorpusSpec(
+        files=files,
+        lines=lines,
+        long_comment_density=long_comments,
+        inline_comment_density=inline_comments,
+        violation_density=violations,
+        nesting_density=nesting,
+        max_depth=max_depth,
+        seed=seed,
+    )
+    baseline_results = bench.load(baseline) if baseline else None
+    results = bench.run(spec, repeat=repeat)
+    if output:
+        bench.dump(results, output)
+    click.echo(bench.format_table(results, baseline_results))
+
+    if baseline_results:
+        try:
+            regressions = bench.compare(results, baseline_results, tolerance)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        if regressions:
+            click.echo("\nregressions:\n" + "\n".join(regressions), err=True)
+            raise click.exceptions.Exit(1)
 
 
 if __name__ == "__main__":
-    main()
+    cli()
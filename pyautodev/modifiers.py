@@ -1,5 +1,7 @@
 import re
-from typing import List, Sequence, Tuple, Union
+import tokenize
+from collections import deque
+from typing import Deque, List, Optional, Sequence, Tuple, Union
 
 import black
 import libcst as cst
@@ -25,9 +27,12 @@ from libcst import (
 )
 from libcst.metadata import PositionProvider
 
+from pyautodev.source import SourceUnit
+
 MAX_LINE_LENGTH = black.DEFAULT_LINE_LENGTH
 
 _COMMENT_PREFIX = re.compile("^# ?")
+_LIST_ITEM = re.compile(r"([-*+]|\d+[.)])\s")
 
 
 class CommentWrap(cst.CSTTransformer):
@@ -54,6 +59,10 @@ class CommentWrap(cst.CSTTransformer):
         self._init_leave_methods()
         self._max_line_length = max_line_length
 
+    def prefilter(self, unit: SourceUnit) -> bool:
+        """Whether `unit` might have a comment to wrap, checked without parsing it."""
+        return comments_past(unit, self._max_line_length)
+
     @classmethod
     def _init_leave_methods(cls):
         for node_type in cls.LEAVE_NODE_TYPES:
@@ -69,7 +78,9 @@ class CommentWrap(cst.CSTTransformer):
             leading_lines = updated_node.header
         trailing_whitespace = getattr(updated_node, "trailing_whitespace", None)
 
-        if not leading_lines and not (trailing_whitespace and trailing_whitespace.comment):
+        if not leading_lines and not (
+            trailing_whitespace and trailing_whitespace.comment
+        ):
             # nodes with no leading lines and no whitespace after are unchanged
             return updated_node
 
@@ -131,50 +142,27 @@ class CommentWrap(cst.CSTTransformer):
         self, leading_lines: List[EmptyLine], original_node: CSTNodeT
     ) -> List[EmptyLine]:
 
-        new_ll = []
-        wrapped_from_prev_line = ""
         node_pos = self.get_metadata(PositionProvider, original_node)
         start_col = node_pos.start.column
 
-        cur_line_idx = -1
-        next_comment_idx = 0
-        while len(leading_lines) > 0:
-            line = leading_lines.pop(0)
-            cur_line_idx += 1
-            comment = line.comment
-
-            if not comment:
-                # empty line has no comment, so nothing to
-                new_ll.append(line)
-                continue
-
-            next_comment_idx = cur_line_idx + 1
-            start_col = self._get_start_column(comment, start_col)
-            end_col = start_col + len(comment.value)
-
-            if not wrapped_from_prev_line and end_col < self._max_line_length:
-                # existing comment with no previous wrapped content can stay as-is
-                # b/c within max line length
-                new_ll.append(line)
+        comments = []  # type: List[Optional[Tuple[str, int]]]
+        for line in leading_lines:
+            if not line.comment:
+                comments.append(None)
                 continue
+            start_col = self._get_start_column(line.comment, start_col)
+            comments.append((line.comment.value, start_col))
 
-            updated_comment, wrapped_from_prev_line = self._get_next_comment(
-                value=comment.value,
-                wrapped_from_prev_line=wrapped_from_prev_line,
-                start_col=start_col,
-            )
-            new_ll.append(line.with_changes(comment=updated_comment))
-
-        # add additional comment lines for remainder, if needed
-        while len(wrapped_from_prev_line) > 0:
-            updated_comment, wrapped_from_prev_line = self._get_next_comment(
-                value="",  # no existing comment
-                wrapped_from_prev_line=wrapped_from_prev_line,
-                start_col=start_col,
-            )
-            new_ll.insert(next_comment_idx, EmptyLine(comment=updated_comment))
-            next_comment_idx += 1
-
+        new_ll = []
+        for idx, value in reflow(comments, self._max_line_length):
+            if idx is None:
+                # overflow from the paragraph above
+                new_ll.append(EmptyLine(comment=Comment(value=value)))
+            elif value is None:
+                new_ll.append(leading_lines[idx])
+            else:
+                line = leading_lines[idx]
+                new_ll.append(line.with_changes(comment=Comment(value=value)))
         return new_ll
 
     def _get_start_column(self, comment: Comment, fallback_start_col: int) -> int:
@@ -197,30 +185,6 @@ class CommentWrap(cst.CSTTransformer):
 
         return comment_start_col
 
-    def _get_next_comment(
-        self, value: str, wrapped_from_prev_line: str, start_col: int
-    ) -> Tuple[Comment, str]:
-
-        wrapped_value = value
-        if wrapped_from_prev_line:
-            wrapped_value = self._join_comment_values(
-                wrapped_from_prev_line, wrapped_value
-            )
-
-        if start_col + len(wrapped_value) <= self._max_line_length:
-            return Comment(value=wrapped_value), ""
-
-        # get the last space before max line length
-        last_idx = 0
-        for idx, char in enumerate(wrapped_value):
-            if char == " ":
-                last_idx = idx
-            if start_col + idx >= self._max_line_length:
-                break
-
-        wrapped_for_next_line = wrapped_value[last_idx:].lstrip()
-        return Comment(value=wrapped_value[:last_idx]), wrapped_for_next_line
-
     @staticmethod
     def _join_comment_values(value_1: str, value_2: str, sep: str = "") -> str:
         stripped_1 = re.sub(_COMMENT_PREFIX, "", value_1)
@@ -231,3 +195,96 @@ class CommentWrap(cst.CSTTransformer):
 
         return joined
 
+
+def reflow(
+    comments: Sequence[Optional[Tuple[str, int]]], max_line_length: int
+) -> List[Tuple[Optional[int], Optional[str]]]:
+    """Wrap a block of comment lines so they fit within `max_line_length`, in one pass.
+
+    `comments` has the value and start column of each comment line, or None for lines
+    without a comment. Returns the new lines in order, as (index, value) pairs: the
+    index of the line replaced, or None for a new line, and its new value, or None to
+    keep the line as-is.
+
+    Words that overflow a line are carried to the start of the next line, until the
+    end of the paragraph, where any left over get lines of their own. Paragraphs end
+    at lines without a comment, empty comments, list items, comments indented beyond
+    their "#" and changes of start column. Lines that fit and have nothing carried to
+    them stay as they are. A word longer than a whole line gets a line to itself,
+    without any hanging indent.
+    """
+    new_lines = []  # type: List[Tuple[Optional[int], Optional[str]]]
+    carried = deque()  # type: Deque[str]
+    # where the current paragraph's lines start, and the prefix of its continuation
+    # lines, which hang under the text of a list item
+    start_col = 0
+    prefix = "# "
+
+    def fill(line_prefix: str) -> str:
+        width = max_line_length - start_col - len(line_prefix)
+        if len(carried[0]) > width:
+            # a word too long to hang under a list item doesn't, since the next run
+            # would take its (still too long) indented line for a new paragraph
+            line_prefix = "# "
+        words = [carried.popleft()]
+        length = len(words[0])
+        while carried and length + 1 + len(carried[0]) <= width:
+            word = carried.popleft()
+            words.append(word)
+            length += 1 + len(word)
+        return line_prefix + " ".join(words)
+
+    def end_paragraph():
+        while carried:
+            new_lines.append((None, fill(prefix)))
+
+    prev_col = None
+    for idx, comment in enumerate(comments):
+        if comment is None:
+            end_paragraph()
+            new_lines.append((idx, None))
+            prev_col = None
+            continue
+
+        value, col = comment
+        text = _COMMENT_PREFIX.sub("", value, count=1)
+        if carried and (col != prev_col or _starts_paragraph(text)):
+            end_paragraph()
+        prev_col = col
+
+        if carried:
+            # the words carried from above come first
+            carried.extend(text.split())
+            new_lines.append((idx, fill(prefix)))
+        elif col + len(value) <= max_line_length or not text.strip():
+            new_lines.append((idx, None))
+        else:
+            start_col = col
+            list_item = _LIST_ITEM.match(text)
+            prefix = "# " + " " * (list_item.end() if list_item else 0)
+            carried.extend(text.split())
+            new_lines.append((idx, fill("# ")))
+
+    end_paragraph()
+    return new_lines
+
+
+def _starts_paragraph(text: str) -> bool:
+    return not text or text[0].isspace() or _LIST_ITEM.match(text) is not None
+
+
+def comments_past(unit: SourceUnit, column: int) -> bool:
+    """Whether any comment in `unit` ends past `column`.
+
+    Only files with a line longer than `column` are tokenized, since shorter lines
+    can't hold such a comment.
+    """
+    if not any(len(line.rstrip("\r\n")) > column for line in unit.lines):
+        return False
+    try:
+        return any(
+            t.type == tokenize.COMMENT and t.end[1] > column for t in unit.tokens
+        )
+    except (tokenize.TokenError, SyntaxError):
+        # let the CST parse report the problem
+        return True
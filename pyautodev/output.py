@@ -0,0 +1,204 @@
+"""Writers that serialize messages as they're produced.
+
+Each writer buffers serialized messages and writes them in batches, flushing at least
+once per file so output still streams, and never holds more than a batch in memory.
+Structured formats end with timing metadata: the seconds spent in each tool overall and
+on each file.
+"""
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO
+
+from pyautodev import __version__
+from pyautodev.checkers import Message
+from pyautodev.profiling import FILE, Profiler
+
+# number of messages serialized before they're written out together
+DEFAULT_BATCH_SIZE = 256
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+_PYLINT_CODE = re.compile(r"[A-Z]\d{4}\Z")
+_PYCODESTYLE_CODE = re.compile(r"[EW]\d{3}\Z")
+
+
+def tool_name(code: Optional[str]) -> str:
+    """Which checker reports messages with `code`."""
+    if code is None:
+        return "pyflakes"  # syntax and decoding errors
+    if _PYLINT_CODE.match(code):
+        return "pylint"
+    if _PYCODESTYLE_CODE.match(code):
+        return "pycodestyle"
+    return "pyflakes"
+
+
+def timing_metadata(profiler: Profiler, elapsed: float) -> dict:
+    """Seconds spent in each stage and check, and in each stage on each file (by
+    absolute path).
+    """
+    files = {}  # type: Dict[str, Dict[str, float]]
+    for (filepath, name), seconds in profiler.file_totals(FILE):
+        # tools disagree on whether paths are absolute
+        file_seconds = files.setdefault(os.path.abspath(filepath), {})
+        file_seconds[name] = file_seconds.get(name, 0.0) + seconds
+    return {
+        "elapsed_seconds": elapsed,
+        "tools": {
+            name: total["seconds"] for name, total in profiler.stage_totals().items()
+        },
+        "checks": profiler.check_totals(),
+        "files": files,
+    }
+
+
+class Writer:
+    """Serializes messages to `stream` in batches."""
+
+    def __init__(self, stream: TextIO, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.stream = stream
+        self.batch_size = batch_size
+        self._buffer = []  # type: List[str]
+        self._filepath = None  # type: Optional[str]
+        self._started = False
+
+    def write(self, m: Message):
+        if not self._started:
+            self._start()
+        elif m.filepath != self._filepath:
+            # the previous file is done, so let its messages through
+            self.flush()
+        self._filepath = m.filepath
+
+        self._buffer.append(self._format(m))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def close(self, timing: Optional[dict] = None):
+        """Finish the output, with timing metadata if the format supports it."""
+        if not self._started:
+            self._start()
+        self._buffer.append(self._footer(timing))
+        self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer = []
+        self.stream.flush()
+
+    def _start(self):
+        self._started = True
+        header = self._header()
+        if header:
+            self._buffer.append(header)
+
+    def _header(self) -> str:
+        return ""
+
+    def _format(self, m: Message) -> str:
+        raise NotImplementedError
+
+    def _footer(self, timing: Optional[dict]) -> str:
+        return ""
+
+
+class TextWriter(Writer):
+    """The colon-joined `Message.__str__` lines, without any metadata."""
+
+    def _format(self, m: Message) -> str:
+        return f"{m}\n"
+
+
+class JsonLinesWriter(Writer):
+    """A JSON object per message, then one with the timing metadata."""
+
+    def _format(self, m: Message) -> str:
+        record = {
+            "type": "message",
+            "tool": tool_name(m.code),
+            "code": m.code,
+            "description": m.description,
+            "path": m.filepath,
+            "line": m.line,
+            "column": m.column,
+        }
+        return json.dumps(record) + "\n"
+
+    def _footer(self, timing: Optional[dict]) -> str:
+        if timing is None:
+            return ""
+        return json.dumps({"type": "timing", **timing}) + "\n"
+
+
+class SarifWriter(Writer):
+    """A SARIF 2.1.0 log with a single run, written out one result at a time."""
+
+    def __init__(self, stream: TextIO, batch_size: int = DEFAULT_BATCH_SIZE):
+        super().__init__(stream, batch_size)
+        self._results = 0
+
+    def _header(self) -> str:
+        # everything up to the results array, whose closing bracket the footer writes
+        log = json.dumps(
+            {
+                "$schema": SARIF_SCHEMA,
+                "version": "2.1.0",
+                "runs": [
+                    {
+                        "tool": {
+                            "driver": {"name": "pyautodev", "version": __version__}
+                        },
+                        "results": [],
+                    }
+                ],
+            }
+        )
+        return log[: -len("]}]}")] + "\n"
+
+    def _format(self, m: Message) -> str:
+        result = {
+            "ruleId": m.code or "error",
+            "level": self._level(m.code),
+            "message": {"text": m.description or ""},
+            "locations": [{"physicalLocation": self._location(m)}],
+            "properties": {"tool": tool_name(m.code)},
+        }
+        separator = "," if self._results else ""
+        self._results += 1
+        return separator + json.dumps(result) + "\n"
+
+    def _footer(self, timing: Optional[dict]) -> str:
+        invocation = {"executionSuccessful": True}  # type: dict
+        if timing is not None:
+            invocation["properties"] = {"timing": timing}
+        invocations = json.dumps({"invocations": [invocation]})[1:-1]
+        # close the results array, then the run, the runs array and the log
+        return f"], {invocations}}}]}}\n"
+
+    @staticmethod
+    def _level(code: Optional[str]) -> str:
+        if code is None:
+            return "error"
+        if tool_name(code) == "pylint":
+            return {"E": "error", "F": "error", "W": "warning"}.get(code[0], "note")
+        return "warning"
+
+    @staticmethod
+    def _location(m: Message) -> dict:
+        if os.path.isabs(m.filepath):
+            uri = Path(m.filepath).as_uri()
+        else:
+            uri = Path(m.filepath).as_posix()
+        location = {"artifactLocation": {"uri": uri}}  # type: dict
+        if m.line:
+            region = {"startLine": m.line}
+            if m.column is not None:
+                region["startColumn"] = m.column + 1  # 1-based in SARIF
+            location["region"] = region
+        return location
+
+
+WRITERS = {"text": TextWriter, "jsonl": JsonLinesWriter, "sarif": SarifWriter}
@@ -1,35 +1,589 @@
-from typing import List
+import copy
+import os
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+)
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
-from checkers import PyLint, PyCodeStyle, PyFlakes
-from transformers import Black, PyAutoDev
+from pyautodev import profiling
+from pyautodev.astroid_cache import AstroidCache
+from pyautodev.cache import ResultCache
+from pyautodev.checkers import (
+    Checker,
+    Message,
+    MessageBatch,
+    PyLint,
+    PyCodeStyle,
+    PyFlakes,
+)
+from pyautodev.dedup import dedup, pylint_overlaps
+from pyautodev.history import CostHistory
+from pyautodev.profiling import STAGE, span
+from pyautodev.source import SourceUnit, as_units, write_changed
+from pyautodev.transformers import Black, PyAutoDev
+
+# number of chunks handed to each worker, so a few slow files don't leave the other
+# workers idle at the end of a run
+_CHUNKS_PER_JOB = 4
+
+# upper bound on the files transformed together before they're checked, which bounds
+# both the memory held for in-flight files and the time to the first message
+DEFAULT_CHUNK_SIZE = 32
+
+# each pool worker process builds its own Processor once and reuses it for every chunk
+_worker_processor = None  # type: Optional[Processor]
+
+# when the parent is profiling, each worker records spans to send back with its chunks
+_worker_profiler = None  # type: Optional[profiling.Profiler]
+
+# checkers, in the order their messages are merged
+CHECKERS = ("pylint", "pyflakes", "pycodestyle")
+
+# executors that can run the checkers alongside each other
+CHECKER_EXECUTORS = ("thread", "process")
+
+# pylint checkers each lint profile leaves out: `fast` (e.g., for pre-commit) skips the
+# ones that mostly infer across modules or compare files, while `full` runs everything
+LINT_PROFILES = {
+    "fast": ("typecheck", "imports", "classes", "logging", "stdlib", "similarities"),
+    "full": (),
+}
+DEFAULT_LINT_PROFILE = "full"
+
+# each process lane builds its checker once and reuses it for every call
+_lane_checker = None  # type: Optional[Checker]
+
+CheckerMessages = Tuple[List[Message], List[Message], List[Message]]
 
 
 class Processor:
 
-    def __init__(self):
+    def __init__(
+        self,
+        jobs: int = 1,
+        pylint_options: Optional[dict] = None,
+        cache: Optional[ResultCache] = None,
+        dedup: bool = False,
+        checker_executor: Optional[str] = None,
+        astroid_cache: Optional[AstroidCache] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        memory_limit: Optional[int] = None,
+        lint_profile: str = DEFAULT_LINT_PROFILE,
+        history: Optional[CostHistory] = None,
+    ):
+
+        if checker_executor not in (None,) + CHECKER_EXECUTORS:
+            raise ValueError(f"unknown checker executor: {checker_executor!r}")
+        if lint_profile not in LINT_PROFILES:
+            raise ValueError(f"unknown lint profile: {lint_profile!r}")
+
+        if LINT_PROFILES[lint_profile]:
+            pylint_options = PyLint.without_messages(
+                pylint_options, LINT_PROFILES[lint_profile]
+            )
+
+        if dedup:
+            # pyflakes and pycodestyle report these much more cheaply than pylint
+            pylint_options = PyLint.without_messages(pylint_options, pylint_overlaps())
 
         # checkers
-        self.pylint = PyLint()
-        self.pycodestyle = PyCodeStyle()
-        self.pyflakes = PyFlakes()
+        self.pylint = PyLint(
+            options=pylint_options,
+            cache=cache,
+            astroid_cache=astroid_cache,
+            memory_limit=memory_limit,
+        )
+        self.pycodestyle = PyCodeStyle(cache=cache)
+        self.pyflakes = PyFlakes(cache=cache)
 
         # transformers
         self.black = Black()
         self.pyautodev = PyAutoDev()
 
-    def process(self, filepaths: List[str]):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.dedup = dedup
+        self.checker_executor = checker_executor
+        self.chunk_size = chunk_size
+        # resident bytes per process above which pylint drops its astroid trees
+        self.memory_limit = memory_limit
+        self.lint_profile = lint_profile
+        # recorded costs to schedule the slowest files first across workers
+        self.history = history
+        self._pylint_options = pylint_options
+        self._cache = cache
+        self._astroid_cache = astroid_cache
+        self._lanes = None  # type: Optional[_CheckerLanes]
+
+    def process(self, filepaths: List[str]) -> List[Message]:
+        if self._parallel(filepaths) or len(filepaths) > self.chunk_size:
+            pylint_msgs, pyflakes_msgs, pycodestyle_msgs = self._process_chunked(
+                filepaths
+            )
+        else:
+            pylint_msgs, pyflakes_msgs, pycodestyle_msgs = self._process_serial(
+                filepaths
+            )
+
+        all_msgs = pylint_msgs + pyflakes_msgs + pycodestyle_msgs
+        if self.dedup:
+            all_msgs = list(dedup(all_msgs))
+        return all_msgs
+
+    def iter_process(
+        self, filepaths: List[str], cross_file: bool = True
+    ) -> Iterator[Message]:
+        """Like `process`, but yields each file's messages as soon as it's checked.
+
+        Messages are grouped by file rather than by checker, followed by pylint's
+        cross-file messages once every file has been checked. Those are left out
+        without `cross_file`, e.g., for a shard of a run's files.
+        """
+        msgs = self._iter_process(filepaths, cross_file)
+        return dedup(msgs) if self.dedup else msgs
+
+    def close(self):
+        """Shut down the executors the checkers run on concurrently, if any."""
+        if self._lanes is not None:
+            self._lanes.shutdown()
+            self._lanes = None
+
+    def _iter_process(
+        self, filepaths: List[str], cross_file: bool = True
+    ) -> Iterator[Message]:
+        for pylint_msgs, pyflakes_msgs, pycodestyle_msgs in self._iter_files(filepaths):
+            yield from pylint_msgs
+            yield from pyflakes_msgs
+            yield from pycodestyle_msgs
+        if cross_file:
+            yield from self._check_cross_file(filepaths)
+
+    def _iter_files(self, filepaths: List[str]) -> Iterator[CheckerMessages]:
+        """Each file's per-file messages, checking a chunk of files at a time."""
+        if self._parallel(filepaths):
+            yield from self._map_chunks(filepaths)
+        else:
+            for chunk in _chunks(filepaths, self.chunk_size):
+                yield from self._iter_chunk(chunk)
+
+    def _check_cross_file(self, filepaths: List[str]) -> List[Message]:
+        if self.checker_executor and not self._parallel(filepaths):
+            # the pylint lane's linter has the astroid trees for these files already
+            lanes = self._get_lanes()
+            msgs = self._lane_results(
+                [lanes.submit("pylint", "check_cross_file", filepaths)]
+            )[0]
+            lanes.release_memory()
+            return msgs
+        with span("pylint.cross_file", STAGE):
+            msgs = self.pylint.check_cross_file(filepaths)
+        self.pylint.release_memory()
+        return msgs
+
+    def iter_diffs(self, filepaths: List[str]) -> Iterator[str]:
+        """Unified diffs of what the transformers would change, without writing it."""
+        if self._parallel(filepaths):
+            diffs = self._map_chunks(filepaths, _diff_chunk)
+        else:
+            diffs = (
+                diff
+                for chunk in _chunks(filepaths, self.chunk_size)
+                for diff in self._diff_chunk(chunk)
+            )
+        for diff in diffs:
+            if diff:
+                yield diff
+
+    def process_batch(self, filepaths: List[str]) -> MessageBatch:
+        """Like `iter_process`, but collects the messages into a compact batch."""
+        return MessageBatch(self.iter_process(filepaths))
+
+    def _parallel(self, filepaths: List[str]) -> bool:
+        return self.jobs > 1 and len(filepaths) > 1
+
+    def _process_serial(self, filepaths: List[str]) -> CheckerMessages:
+
+        # read & parse each file once, sharing the results across every stage below
+        units = as_units(filepaths)
 
         # fix some things automatically without any case-by-case decision making
-        self.black.transform(filepaths)
-        self.pyautodev.transform(filepaths)
+        self._transform(units)
+
+        if self.checker_executor:
+            lanes = self._get_lanes()
+            futures = [lanes.submit(name, "check", units) for name in CHECKERS]
+            pylint_msgs, pyflakes_msgs, pycodestyle_msgs = self._lane_results(futures)
+            lanes.release_memory()
+            return pylint_msgs, pyflakes_msgs, pycodestyle_msgs
 
-        pylint_msgs = self.pylint.check(filepaths)
-        pyflakes_msgs = self.pyflakes.check(filepaths)
+        with span("pylint", STAGE):
+            pylint_msgs = self.pylint.check(units)
+        self.pylint.release_memory()
+        with span("pyflakes", STAGE):
+            pyflakes_msgs = self.pyflakes.check(units)
 
         # black should (??) mean that we get few if any pycodestyle messages, but run
         # just to be sure
-        pycodestyle_msgs = self.pycodestyle.check(filepaths)
+        with span("pycodestyle", STAGE):
+            pycodestyle_msgs = self.pycodestyle.check(units)
+
+        return pylint_msgs, pyflakes_msgs, pycodestyle_msgs
+
+    def _process_chunked(self, filepaths: List[str]) -> CheckerMessages:
+        """Process chunks of files, across a pool of worker processes if there's one.
+
+        Chunks are merged back in their original order, so the messages are the same as
+        checking every file at once. Pylint's cross-file checks can't see across
+        chunks, so they're skipped per chunk and run once over every file at the end.
+        """
+        pylint_msgs, pyflakes_msgs, pycodestyle_msgs = [], [], []
+        for file_msgs in self._iter_files(filepaths):
+            pylint_msgs.extend(file_msgs[0])
+            pyflakes_msgs.extend(file_msgs[1])
+            pycodestyle_msgs.extend(file_msgs[2])
+
+        # like in a serial run, cross-file messages come after all per-file messages
+        pylint_msgs.extend(self._check_cross_file(filepaths))
+
+        return pylint_msgs, pyflakes_msgs, pycodestyle_msgs
+
+    def _map_chunks(
+        self, filepaths: List[str], fn: Optional[Callable] = None
+    ) -> Iterator:
+        """Each file's per-file messages from the worker pool, in order.
+
+        Or whatever else `fn` returns for each file of a chunk on a worker, alongside
+        the chunk's spans. Given a cost history, the costliest chunks go first, so a few
+        slow files don't hold up the end of the run, and results are put back in order.
+        """
+        fn = fn or _process_chunk
+        count = self.jobs * _CHUNKS_PER_JOB
+        if self.history is None:
+            size = -(-len(filepaths) // count)  # ceiling
+            chunks = _chunks(list(range(len(filepaths))), min(size, self.chunk_size))
+        else:
+            chunks = _costliest_chunks(
+                filepaths, self.history.estimator(), count, self.chunk_size
+            )
+        profiler = profiling.active()
+        with ProcessPoolExecutor(
+            max_workers=self.jobs,
+            initializer=_init_worker,
+            initargs=(
+                self._pylint_options,
+                self._cache,
+                self._astroid_cache,
+                self.memory_limit,
+                profiler.for_worker() if profiler else None,
+            ),
+        ) as executor:
+            futures = {
+                executor.submit(fn, [filepaths[i] for i in chunk]): chunk
+                for chunk in chunks
+            }
+            done = {}  # type: Dict[int, object]
+            next_index = 0
+            for future in as_completed(futures):
+                chunk_results, spans = future.result()
+                if profiler:
+                    profiler.add(spans)
+                done.update(zip(futures[future], chunk_results))
+                while next_index in done:
+                    yield done.pop(next_index)
+                    next_index += 1
+
+    def _transform(self, units: List[SourceUnit], write: bool = True):
+        """Run every transformer in memory, then write each changed file just once."""
+        with span("black", STAGE):
+            self.black.transform(units, write=False)
+        with span("pyautodev", STAGE):
+            self.pyautodev.transform(units, write=False)
+        if write:
+            with span("write", STAGE):
+                write_changed(units)
+
+    def _diff_chunk(self, filepaths: List[str]) -> List[str]:
+        """Each file's diff, empty if it wouldn't change."""
+        units = as_units(filepaths)
+        self._transform(units, write=False)
+        return [u.diff() for u in units]
+
+    def _iter_chunk(self, filepaths: List[str]) -> Iterator[CheckerMessages]:
+        """Transform a chunk of files together, then check and yield them one by one."""
+        units = as_units(filepaths)
+        self._transform(units)
+
+        if self.checker_executor:
+            yield from self._iter_lanes(units)
+            self._get_lanes().release_memory()
+            return
+
+        for unit in units:
+            with span("pylint", STAGE):
+                pylint_msgs = self.pylint.check_file(unit)
+            with span("pyflakes", STAGE):
+                pyflakes_msgs = self.pyflakes.check_file(unit)
+            with span("pycodestyle", STAGE):
+                pycodestyle_msgs = self.pycodestyle.check_file(unit)
+            yield pylint_msgs, pyflakes_msgs, pycodestyle_msgs
+        # at most once per chunk, since rebuilding the trees takes a while
+        self.pylint.release_memory()
+
+    def _iter_lanes(self, units: List[SourceUnit]) -> Iterator[CheckerMessages]:
+        """Check every file on every checker's lane at once, yielding them in order.
+
+        Each file's messages are yielded as soon as its slowest checker is done with
+        it, while the faster checkers carry on with the files after it.
+        """
+        lanes = self._get_lanes()
+        futures = [
+            [lanes.submit(name, "check_file", unit) for name in CHECKERS]
+            for unit in units
+        ]
+        try:
+            for file_futures in futures:
+                pylint_msgs, pyflakes_msgs, pycodestyle_msgs = self._lane_results(
+                    file_futures
+                )
+                yield pylint_msgs, pyflakes_msgs, pycodestyle_msgs
+        finally:
+            # e.g., if the caller stopped early, drop the files not yet started
+            for file_futures in futures:
+                for future in file_futures:
+                    future.cancel()
+
+    def _get_lanes(self) -> "_CheckerLanes":
+        if self._lanes is None:
+            self._lanes = _CheckerLanes(
+                self.checker_executor,
+                self._pylint_options,
+                self._cache,
+                self._astroid_cache,
+                self.memory_limit,
+            )
+        return self._lanes
+
+    def _lane_results(self, futures: List[Future]) -> List[List[Message]]:
+        """Wait for the lanes to finish `futures`, returning their messages in order."""
+        return self._get_lanes().results(futures)
+
+
+class _CheckerLanes:
+    """An executor with a single worker for each checker, i.e., a lane for it to run in.
+
+    A checker handles its calls one at a time and in order, since none of them are
+    safe to share between threads, but the checkers run alongside each other, so the
+    faster ones don't wait for pylint. Merging their results in a fixed order keeps the
+    messages the same as running the checkers one after another.
+
+    Lanes build their own checkers: thread lanes share the source units already in
+    memory, while process lanes check the files on disk, which the transformers have
+    already written, and can use another CPU each.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        pylint_options: Optional[dict],
+        cache: Optional[ResultCache],
+        astroid_cache: Optional[AstroidCache] = None,
+        memory_limit: Optional[int] = None,
+    ):
+        self.kind = kind
+        self._executors = {}  # type: Dict[str, Executor]
+        self._checkers = {}  # type: Dict[str, Checker]
+        for name in CHECKERS:
+            # sqlite connections can't be shared across threads either
+            lane_cache = copy.copy(cache)
+            if kind == "thread":
+                self._executors[name] = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix=f"pyautodev-{name}"
+                )
+                self._checkers[name] = _new_checker(
+                    name, pylint_options, lane_cache, astroid_cache, memory_limit
+                )
+            else:
+                self._executors[name] = ProcessPoolExecutor(
+                    max_workers=1,
+                    initializer=_init_lane,
+                    initargs=(
+                        name,
+                        pylint_options,
+                        lane_cache,
+                        astroid_cache,
+                        memory_limit,
+                    ),
+                )
+
+    def submit(self, name: str, method: str, sources) -> Future:
+        """Queue a call to a `Checker` method on `name`'s lane."""
+        executor = self._executors[name]
+        stage = "pylint.cross_file" if method == "check_cross_file" else name
+        if self.kind == "thread":
+            return executor.submit(
+                _run_checker, self._checkers[name], stage, method, sources
+            )
+
+        profiler = profiling.active()
+        if isinstance(sources, list):
+            filepaths = [_path(s) for s in sources]  # type: Union[str, List[str]]
+        else:
+            filepaths = _path(sources)
+        return executor.submit(
+            _run_lane,
+            stage,
+            method,
+            filepaths,
+            profiler.for_worker() if profiler else None,
+        )
+
+    def results(self, futures: List[Future]) -> List[List[Message]]:
+        """The messages from each of `futures`, in order, once they're all done."""
+        profiler = profiling.active()
+        msgs = []
+        for future in futures:
+            future_msgs, spans = future.result()
+            if profiler and spans:
+                profiler.add(spans)
+            msgs.append(future_msgs)
+        return msgs
+
+    def release_memory(self):
+        """Have the pylint lane release memory after the calls queued so far."""
+        executor = self._executors["pylint"]
+        if self.kind == "thread":
+            executor.submit(self._checkers["pylint"].release_memory)
+        else:
+            executor.submit(_release_lane_memory)
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown()
+
+
+def _new_checker(
+    name: str,
+    pylint_options: Optional[dict],
+    cache: Optional[ResultCache],
+    astroid_cache: Optional[AstroidCache] = None,
+    memory_limit: Optional[int] = None,
+) -> Checker:
+    if name == "pylint":
+        return PyLint(
+            options=pylint_options,
+            cache=cache,
+            astroid_cache=astroid_cache,
+            memory_limit=memory_limit,
+        )
+    if name == "pyflakes":
+        return PyFlakes(cache=cache)
+    return PyCodeStyle(cache=cache)
+
+
+def _path(source: Union[str, SourceUnit]) -> str:
+    return source.path if isinstance(source, SourceUnit) else source
+
+
+def _run_checker(
+    checker: Checker, stage: str, method: str, sources
+) -> Tuple[List[Message], List[profiling.Span]]:
+    # thread lanes record spans on the parent's profiler directly
+    with span(stage, STAGE):
+        return getattr(checker, method)(sources), []
+
+
+def _init_lane(
+    name: str,
+    pylint_options: Optional[dict],
+    cache: Optional[ResultCache],
+    astroid_cache: Optional[AstroidCache],
+    memory_limit: Optional[int],
+):
+    global _lane_checker
+    _lane_checker = _new_checker(
+        name, pylint_options, cache, astroid_cache, memory_limit
+    )
+
+
+def _run_lane(
+    stage: str,
+    method: str,
+    filepaths: Union[str, List[str]],
+    profiler: Optional[profiling.Profiler],
+) -> Tuple[List[Message], List[profiling.Span]]:
+    """Run a call on this lane's checker, recording it on `profiler`, if any."""
+    if profiler is None:
+        return getattr(_lane_checker, method)(filepaths), []
+    with profiler:
+        msgs, _ = _run_checker(_lane_checker, stage, method, filepaths)
+    return msgs, profiler.take()
+
+
+def _release_lane_memory():
+    _lane_checker.release_memory()
+
+
+def _chunks(items: list, size: int) -> list:
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def _costliest_chunks(
+    filepaths: Sequence[str], cost: Callable[[str], float], count: int, max_size: int
+) -> List[List[int]]:
+    """About `count` chunks of about the same cost, of the files' indices.
+
+    Files are taken costliest first, so the chunks come in order of decreasing cost,
+    with files costing a chunk's share or more each in a chunk of their own. Handing
+    them out in this order (longest processing time first) keeps every worker busy
+    until close to the end.
+    """
+    costs = [cost(f) for f in filepaths]
+    target = sum(costs) / count
+    chunks = []  # type: List[List[int]]
+    chunk, chunk_cost = [], 0.0  # type: List[int], float
+    for i in sorted(range(len(filepaths)), key=lambda i: -costs[i]):
+        chunk.append(i)
+        chunk_cost += costs[i]
+        if chunk_cost >= target or len(chunk) >= max_size:
+            chunks.append(sorted(chunk))
+            chunk, chunk_cost = [], 0.0
+    if chunk:
+        chunks.append(sorted(chunk))
+    return chunks
+
+
+def _init_worker(
+    pylint_options: Optional[dict],
+    cache: Optional[ResultCache],
+    astroid_cache: Optional[AstroidCache] = None,
+    memory_limit: Optional[int] = None,
+    profiler: Optional[profiling.Profiler] = None,
+):
+    """Build this worker's Processor, and activate its `profiler`, if any."""
+    global _worker_processor, _worker_profiler
+    _worker_processor = Processor(
+        pylint_options=PyLint.per_file_options(pylint_options),
+        cache=cache,
+        astroid_cache=astroid_cache,
+        memory_limit=memory_limit,
+    )
+    if profiler is not None:
+        # stays active for the life of the worker
+        _worker_profiler = profiler.__enter__()
+
+
+def _process_chunk(
+    filepaths: List[str]
+) -> Tuple[List[CheckerMessages], List[profiling.Span]]:
+    msgs = list(_worker_processor._iter_chunk(filepaths))
+    spans = _worker_profiler.take() if _worker_profiler else []
+    return msgs, spans
 
-        all_msgs = pylint_msgs + pyflakes_msgs + pycodestyle_msgs
-        return all_msgs
 
+def _diff_chunk(filepaths: List[str]) -> Tuple[List[str], List[profiling.Span]]:
+    diffs = _worker_processor._diff_chunk(filepaths)
+    spans = _worker_profiler.take() if _worker_profiler else []
+    return diffs, spans
@@ -0,0 +1,350 @@
+"""Timing and memory spans for finding the stage and file a slow run spends its time on.
+
+Stages, files and their expensive steps are wrapped in `span`, which does nothing
+unless a `Profiler` is active. An active profiler records each span's wall time and
+the process's resident memory around it, plus the change in memory allocated by Python
+when tracing memory with tracemalloc. Individual checks run too often to each get a
+span, so the checkers time them and `record` one span per check and file. The spans
+can be exported in Chrome's trace event format (viewable in chrome://tracing or
+Perfetto) and summarized per stage, check and file.
+"""
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import ContextManager, Dict, Iterator, List, Optional, Tuple
+
+import attr
+
+from pyautodev import __version__
+
+STAGE = "stage"
+FILE = "file"
+DETAIL = "detail"
+CHECK = "check"
+
+# the profiler spans are recorded on, if any
+_active = None  # type: Optional[Profiler]
+
+_NULL_SPAN = nullcontext()
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@attr.dataclass
+class Span:
+    name: str
+    cat: str
+    start_ns: int
+    duration_ns: int
+    pid: int
+    tid: int
+    args: dict = attr.Factory(dict)
+
+
+def span(name: str, cat: str = DETAIL, **args) -> ContextManager:
+    """Record the enclosed block as a span on the active profiler, if there is one."""
+    if _active is None:
+        return _NULL_SPAN
+    return _active.span(name, cat, **args)
+
+
+def active() -> Optional["Profiler"]:
+    return _active
+
+
+def timing_checks() -> bool:
+    """Whether the active profiler, if any, has the checkers time each check."""
+    return _active is not None and _active.checks
+
+
+def record(name: str, cat: str, start_ns: int, duration_ns: int, **args):
+    """Record a span timed some other way (e.g., summed over many calls), if active."""
+    if _active is not None:
+        _active.add(
+            [
+                Span(
+                    name=name,
+                    cat=cat,
+                    start_ns=start_ns,
+                    duration_ns=duration_ns,
+                    pid=os.getpid(),
+                    tid=threading.get_ident(),
+                    args=args,
+                )
+            ]
+        )
+
+
+class Profiler:
+    """Records spans while active, i.e., inside a `with profiler:` block."""
+
+    def __init__(self, trace_memory: bool = False, checks: bool = True):
+        self.trace_memory = trace_memory
+        self.checks = checks
+        self.spans = []  # type: List[Span]
+        self._previous = None  # type: Optional[Profiler]
+        self._started_tracemalloc = False
+
+    def __enter__(self) -> "Profiler":
+        global _active
+        self._previous, _active = _active, self
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        _active = self._previous
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    @contextmanager
+    def span(self, name: str, cat: str = DETAIL, **args) -> Iterator[None]:
+        rss_before = rss()
+        traced_before = (
+            tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        )
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            rss_after = rss()
+            if rss_after is not None:
+                args["rss_kb"] = rss_after // 1024
+                args["rss_delta_kb"] = (rss_after - rss_before) // 1024
+            if traced_before is not None and tracemalloc.is_tracing():
+                traced_after = tracemalloc.get_traced_memory()[0]
+                args["malloc_delta_kb"] = (traced_after - traced_before) // 1024
+            self.spans.append(
+                Span(
+                    name=name,
+                    cat=cat,
+                    start_ns=start,
+                    duration_ns=duration,
+                    pid=os.getpid(),
+                    tid=threading.get_ident(),
+                    args=args,
+                )
+            )
+
+    def add(self, spans: List[Span]):
+        """Record spans, e.g., ones a worker process sent back."""
+        self.spans.extend(spans)
+
+    def take(self) -> List[Span]:
+        """Remove and return the spans recorded so far, e.g., to send to a parent."""
+        spans, self.spans = self.spans, []
+        return spans
+
+    def for_worker(self) -> "Profiler":
+        """A new, inactive profiler recording what this one does, for a worker process
+        to send its spans back from.
+        """
+        return Profiler(trace_memory=self.trace_memory, checks=self.checks)
+
+    def chrome_trace(self) -> dict:
+        """The spans as "complete" events in Chrome's trace event format."""
+        # perf_counter is system-wide on Linux, so worker processes' spans line up
+        origin = min((s.start_ns for s in self.spans), default=0)
+        events = [
+            {
+                "name": s.name,
+                "cat": s.cat,
+                "ph": "X",
+                "ts": (s.start_ns - origin) / 1000,
+                "dur": s.duration_ns / 1000,
+                "pid": s.pid,
+                "tid": s.tid,
+                "args": s.args,
+            }
+            for s in sorted(self.spans, key=lambda s: s.start_ns)
+        ]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"pyautodev": __version__},
+        }
+
+    def dump(self, path: str):
+        trace = self.chrome_trace()
+        trace["summary"] = {
+            "stages": self.stage_totals(),
+            "checks": self.check_totals(),
+            "files": [
+                {"file": f, "name": n, "seconds": t} for (f, n), t in self.file_totals()
+            ],
+        }
+        with open(path, "w") as f:
+            json.dump(trace, f)
+
+    def stage_totals(self) -> Dict[str, dict]:
+        """Count, total seconds and peak RSS of each stage, across every process."""
+        totals = {}  # type: Dict[str, dict]
+        for s in self.spans:
+            if s.cat != STAGE:
+                continue
+            total = totals.setdefault(
+                s.name, {"count": 0, "seconds": 0.0, "max_rss_kb": 0}
+            )
+            total["count"] += 1
+            total["seconds"] += s.duration_ns / 1e9
+            total["max_rss_kb"] = max(total["max_rss_kb"], s.args.get("rss_kb", 0))
+        return totals
+
+    def check_totals(self) -> Dict[str, float]:
+        """Seconds spent in each check, slowest first."""
+        totals = defaultdict(float)  # type: Dict[str, float]
+        for s in self.spans:
+            if s.cat == CHECK:
+                totals[s.name] += s.duration_ns / 1e9
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+    def file_totals(
+        self, cat: Optional[str] = None
+    ) -> List[Tuple[Tuple[str, str], float]]:
+        """Seconds spent on each (file, span name), slowest first.
+
+        By default, this includes both per-file spans and the detail spans within them,
+        but not the time per check (see `check_totals`).
+        """
+        totals = defaultdict(float)  # type: Dict[Tuple[str, str], float]
+        for s in self.spans:
+            if "file" in s.args and (s.cat == cat or cat is None and s.cat != CHECK):
+                totals[(s.args["file"], s.name)] += s.duration_ns / 1e9
+        return sorted(totals.items(), key=lambda item: -item[1])
+
+    def summary(self, top: int = 10) -> str:
+        """A table of time per stage, then the slowest checks, files and steps."""
+        rows = [("stage", "count", "seconds", "max rss MB")]
+        for name, total in self.stage_totals().items():
+            rows.append(
+                (
+                    name,
+                    str(total["count"]),
+                    f"{total['seconds']:.3f}",
+                    f"{total['max_rss_kb'] / 1024:.1f}",
+                )
+            )
+        lines = _format_rows(rows)
+
+        check_rows = [("check", "seconds")]
+        for name, seconds in list(self.check_totals().items())[:top]:
+            check_rows.append((name, f"{seconds:.3f}"))
+        if len(check_rows) > 1:
+            lines += [""] + _format_rows(check_rows)
+
+        file_rows = [("file", "step", "seconds")]
+        for (filepath, name), seconds in self.file_totals()[:top]:
+            file_rows.append((filepath, name, f"{seconds:.3f}"))
+        if len(file_rows) > 1:
+            lines += [""] + _format_rows(file_rows)
+        return "\n".join(lines)
+
+
+class Timings(Profiler):
+    """A profiler that only keeps the wall time of each stage and each file's stages.
+
+    Its memory stays proportional to the number of files rather than spans, so it can
+    stay on for every run, e.g., to report timings alongside the messages.
+    """
+
+    def __init__(self, checks: bool = True):
+        super().__init__(checks=checks)
+        self._stages = {}  # type: Dict[str, dict]
+        self._checks = defaultdict(float)  # type: Dict[str, float]
+        self._files = defaultdict(float)  # type: Dict[Tuple[str, str], float]
+
+    @contextmanager
+    def span(self, name: str, cat: str = DETAIL, **args) -> Iterator[None]:
+        if cat == DETAIL:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self._add_time(name, cat, time.perf_counter_ns() - start, args)
+
+    def add(self, spans: List[Span]):
+        for s in spans:
+            self._add_time(s.name, s.cat, s.duration_ns, s.args)
+
+    def take(self) -> List[Span]:
+        """Remove and return the times recorded so far, as one span per stage, check
+        and file's stage.
+        """
+        pid, tid = os.getpid(), threading.get_ident()
+        spans = [
+            Span(name, STAGE, 0, _ns(t["seconds"]), pid, tid, {"count": t["count"]})
+            for name, t in self._stages.items()
+        ]
+        spans.extend(
+            Span(name, CHECK, 0, _ns(seconds), pid, tid)
+            for name, seconds in self._checks.items()
+        )
+        spans.extend(
+            Span(name, FILE, 0, _ns(seconds), pid, tid, {"file": filepath})
+            for (filepath, name), seconds in self._files.items()
+        )
+        self._stages.clear()
+        self._checks.clear()
+        self._files.clear()
+        return spans
+
+    def for_worker(self) -> "Timings":
+        return Timings(checks=self.checks)
+
+    def stage_totals(self) -> Dict[str, dict]:
+        return {name: dict(total) for name, total in self._stages.items()}
+
+    def check_totals(self) -> Dict[str, float]:
+        return dict(sorted(self._checks.items(), key=lambda item: -item[1]))
+
+    def file_totals(
+        self, cat: Optional[str] = FILE
+    ) -> List[Tuple[Tuple[str, str], float]]:
+        """Seconds spent on each (file, stage), slowest first, without detail spans."""
+        if cat not in (None, FILE):
+            return []
+        return sorted(self._files.items(), key=lambda item: -item[1])
+
+    def _add_time(self, name: str, cat: str, duration_ns: int, args: dict):
+        if cat == STAGE:
+            total = self._stages.setdefault(
+                name, {"count": 0, "seconds": 0.0, "max_rss_kb": 0}
+            )
+            # a worker's `take` sends every span of a stage as one
+            total["count"] += args.get("count", 1)
+            total["seconds"] += duration_ns / 1e9
+        elif cat == CHECK:
+            self._checks[name] += duration_ns / 1e9
+        elif cat == FILE and "file" in args:
+            self._files[(args["file"], name)] += duration_ns / 1e9
+
+
+def _ns(seconds: float) -> int:
+    return round(seconds * 1e9)
+
+
+def _format_rows(rows: List[tuple]) -> List[str]:
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return [
+        "  ".join(cell.ljust(w) for cell, w in zip(row, widths)).rstrip()
+        for row in rows
+    ]
+
+
+def rss() -> Optional[int]:
+    """Resident memory of this process in bytes, where /proc makes that cheap."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
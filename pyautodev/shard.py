@@ -0,0 +1,250 @@
+"""Splitting a run's files across CI runners, and merging their results back together.
+
+Every runner discovers the same files and partitions them the same way, then processes
+its own shard and writes a `ShardResult`. Merging the results interleaves each file's
+messages back into discovery order, then runs pylint's cross-file checks over every
+file, so the merged messages are the same as a single run's.
+"""
+import base64
+import heapq
+import json
+import os
+import zlib
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import attr
+from attr import dataclass
+
+from pyautodev import __version__
+from pyautodev.checkers import Message
+from pyautodev.dedup import dedup
+from pyautodev.processor import Processor
+from pyautodev.profiling import STAGE, span
+from pyautodev.source import SourceUnit, atomic_write
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """(index, count) from a 1-based "i/N" shard spec."""
+    index, sep, count = value.partition("/")
+    try:
+        shard = int(index), int(count)
+    except ValueError:
+        shard = None
+    if not sep or shard is None or not 1 <= shard[0] <= shard[1]:
+        raise ValueError(f"expected a shard like 1/4, not {value!r}")
+    return shard
+
+
+def partition(
+    filepaths: Sequence[str], count: int, cost: Optional[Callable[[str], float]] = None
+) -> List[List[str]]:
+    """Split `filepaths` into `count` shards with about the same total cost each.
+
+    Files go to the least loaded shard, most costly (by default, largest) first, with
+    ties broken by path, so every runner given the same files gets the same shards.
+    Each shard keeps its files in their original order.
+    """
+    cost = cost or os.path.getsize
+    costs = [cost(f) for f in filepaths]
+    order = sorted(range(len(filepaths)), key=lambda i: (-costs[i], filepaths[i]))
+    loads = [(0.0, shard) for shard in range(count)]
+    indices = [[] for _ in range(count)]  # type: List[List[int]]
+    for i in order:
+        load, shard = heapq.heappop(loads)
+        indices[shard].append(i)
+        heapq.heappush(loads, (load + costs[i], shard))
+    return [[filepaths[i] for i in sorted(shard)] for shard in indices]
+
+
+@dataclass
+class ShardFile:
+    # the file's position among every shard's files
+    index: int
+    path: str
+    messages: List[Message] = attr.ib(factory=list)
+    # the file's (transformed) contents, for the merge's cross-file checks
+    raw: Optional[bytes] = None
+
+
+class ShardResult:
+    """The per-file messages of one shard of a run, along with what merging needs."""
+
+    def __init__(
+        self,
+        index: int,
+        count: int,
+        total: int,
+        options: dict,
+        files: List[ShardFile],
+        timing: Optional[dict] = None,
+    ):
+        self.index = index
+        self.count = count
+        # the number of files across every shard
+        self.total = total
+        # the `Processor` settings the messages depend on
+        self.options = options
+        self.files = files
+        self.timing = timing
+        self._files_by_path = {os.path.abspath(f.path): f for f in files}
+        self._current = None  # type: Optional[ShardFile]
+
+    @classmethod
+    def start(
+        cls,
+        index: int,
+        count: int,
+        all_filepaths: Sequence[str],
+        filepaths: Sequence[str],
+        p: Processor,
+    ) -> "ShardResult":
+        """An empty result for the shard of `all_filepaths` made up of `filepaths`."""
+        indices = {os.path.abspath(f): i for i, f in enumerate(all_filepaths)}
+        return cls(
+            index=index,
+            count=count,
+            total=len(all_filepaths),
+            options={"dedup": p.dedup, "lint_profile": p.lint_profile},
+            files=[ShardFile(indices[os.path.abspath(f)], f) for f in filepaths],
+        )
+
+    def record(self, m: Message):
+        """Add the next message from processing the shard's files."""
+        # a message about some other file stays with the file being checked
+        self._current = self._files_by_path.get(
+            os.path.abspath(m.filepath), self._current or self.files[0]
+        )
+        self._current.messages.append(m)
+
+    def finish(self, p: Processor, timing: Optional[dict] = None):
+        """Record what merging needs once the shard's files are processed."""
+        self.timing = timing
+        if p.pylint.checks_cross_file:
+            for f in self.files:
+                f.raw = SourceUnit(f.path).raw
+
+    def dump(self, path: str):
+        result = {
+            "version": __version__,
+            "shard": [self.index, self.count],
+            "total": self.total,
+            "options": self.options,
+            "files": [
+                {
+                    "index": f.index,
+                    "path": f.path,
+                    "messages": [attr.astuple(m) for m in f.messages],
+                    "raw": _encode(f.raw) if f.raw is not None else None,
+                }
+                for f in self.files
+            ],
+            "timing": self.timing,
+        }
+        atomic_write(path, json.dumps(result))
+
+    @classmethod
+    def load(cls, path: str) -> "ShardResult":
+        with open(path, "r") as f:
+            result = json.load(f)
+        if result.get("version") != __version__:
+            raise ValueError(
+                f"{path} was written by pyautodev {result.get('version')}, "
+                f"not {__version__}"
+            )
+        index, count = result["shard"]
+        return cls(
+            index=index,
+            count=count,
+            total=result["total"],
+            options=result["options"],
+            files=[
+                ShardFile(
+                    index=f["index"],
+                    path=f["path"],
+                    messages=[Message(*m) for m in f["messages"]],
+                    raw=_decode(f["raw"]) if f["raw"] is not None else None,
+                )
+                for f in result["files"]
+            ],
+            timing=result["timing"],
+        )
+
+
+def merge(results: List[ShardResult]) -> Iterator[Message]:
+    """Every shard's messages, in the order a single run would have produced them.
+
+    Pylint's cross-file messages are checked here, over the contents each shard
+    recorded. The files' paths still need to exist, e.g., in the same checkout.
+    """
+    _validate(results)
+    files = sorted((f for r in results for f in r.files), key=lambda f: f.index)
+    options = results[0].options
+
+    def iter_msgs():
+        for f in files:
+            yield from f.messages
+        if any(f.raw is not None for f in files):
+            p = Processor(dedup=options["dedup"], lint_profile=options["lint_profile"])
+            units = [SourceUnit(f.path, raw=f.raw) for f in files]
+            with span("pylint.cross_file", STAGE):
+                cross_file_msgs = p.pylint.check_cross_file(units)
+            yield from cross_file_msgs
+
+    # shards already dropped duplicates within each file, and doing so again is a no-op
+    return dedup(iter_msgs()) if options["dedup"] else iter_msgs()
+
+
+def merge_timing(results: List[ShardResult], timing: dict) -> dict:
+    """The shards' timing metadata combined with the merge's own `timing`.
+
+    Time per stage, check and file is summed, while the elapsed time is the slowest
+    shard's (since they run alongside each other) plus the merge's.
+    """
+    timings = [r.timing for r in results if r.timing is not None]
+    merged = {
+        "elapsed_seconds": max([t["elapsed_seconds"] for t in timings], default=0.0)
+        + timing["elapsed_seconds"],
+        "tools": {},
+        "checks": {},
+        "files": {},
+    }  # type: Dict[str, dict]
+    for t in timings + [timing]:
+        for key in ("tools", "checks"):
+            for name, seconds in t[key].items():
+                merged[key][name] = merged[key].get(name, 0.0) + seconds
+        for filepath, file_seconds in t["files"].items():
+            merged_seconds = merged["files"].setdefault(filepath, {})
+            for name, seconds in file_seconds.items():
+                merged_seconds[name] = merged_seconds.get(name, 0.0) + seconds
+    merged["checks"] = dict(sorted(merged["checks"].items(), key=lambda kv: -kv[1]))
+    return merged
+
+
+def _validate(results: List[ShardResult]):
+    if not results:
+        raise ValueError("no shard results to merge")
+    first = results[0]
+    for r in results:
+        if (r.count, r.total, r.options) != (first.count, first.total, first.options):
+            raise ValueError(
+                f"shard {r.index}/{r.count} is from a different run than shard "
+                f"{first.index}/{first.count}"
+            )
+    indices = sorted(r.index for r in results)
+    if indices != list(range(1, first.count + 1)):
+        missing = sorted(set(range(1, first.count + 1)) - set(indices))
+        if missing:
+            raise ValueError(
+                "missing shard(s) " + ", ".join(f"{i}/{first.count}" for i in missing)
+            )
+        raise ValueError("some shards were given more than once")
+    if sorted(f.index for r in results for f in r.files) != list(range(first.total)):
+        raise ValueError("the shards' files don't add up to the whole run's")
+
+
+def _encode(raw: bytes) -> str:
+    return base64.b64encode(zlib.compress(raw)).decode("ascii")
+
+
+def _decode(value: str) -> bytes:
+    return zlib.decompress(base64.b64decode(value))
@@ -0,0 +1,202 @@
+from ast import Module as AstModule, PyCF_ONLY_AST
+import difflib
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import tokenize
+from typing import Iterable, Iterator, List, Optional, Sequence, Union
+
+import libcst
+
+
+class SourceUnit:
+    """A single source file shared by every transformer and checker.
+
+    The file is read from disk at most once, and each derived representation (text,
+    lines, tokens, AST, CST) is computed lazily the first time it is requested.
+    Transformers call `update` with their output, which invalidates the derived
+    representations so later stages see the new contents without re-reading the file.
+    Updates stay in memory until `write`, so a chain of transformers writes (or diffs)
+    each file once.
+    """
+
+    def __init__(self, path: str, raw: Optional[bytes] = None):
+        self.path = path
+        self._raw = raw
+        self._digest = None
+        self._text = None
+        self._encoding = None
+        self._newline = None
+        self._lines = None
+        self._tokens = None
+        self._ast = None
+        self._cst = None
+        # the text last read from (or written to) disk, once it's been updated
+        self._saved_text = None  # type: Optional[str]
+
+    def __repr__(self):
+        return f"SourceUnit({self.path!r})"
+
+    @property
+    def abspath(self) -> str:
+        return os.path.abspath(self.path)
+
+    @property
+    def raw(self) -> bytes:
+        if self._raw is None:
+            with open(self.path, "rb") as f:
+                self._raw = f.read()
+        return self._raw
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 of the current contents."""
+        if self._digest is None:
+            self._digest = hashlib.sha256(self.raw).hexdigest()
+        return self._digest
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._decode()
+        return self._text
+
+    @property
+    def encoding(self) -> str:
+        if self._encoding is None:
+            self._decode()
+        return self._encoding
+
+    @property
+    def newline(self) -> str:
+        if self._newline is None:
+            self._decode()
+        return self._newline
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.text.splitlines(keepends=True)
+        return self._lines
+
+    @property
+    def tokens(self) -> List[tokenize.TokenInfo]:
+        if self._tokens is None:
+            self._tokens = list(tokenize.generate_tokens(iter(self.lines).__next__))
+        return self._tokens
+
+    @property
+    def ast(self) -> AstModule:
+        if self._ast is None:
+            self._ast = compile(self.text, self.path, "exec", PyCF_ONLY_AST)
+        return self._ast
+
+    @property
+    def cst(self) -> libcst.Module:
+        if self._cst is None:
+            self._cst = libcst.parse_module(self.text)
+        return self._cst
+
+    @property
+    def changed(self) -> bool:
+        """Whether the in-memory contents differ from the file's."""
+        return self._saved_text is not None and self._saved_text != self.text
+
+    def update(self, text: str, module: Optional[libcst.Module] = None):
+        """Replace the in-memory contents, dropping any stale derived representations.
+
+        A transformer that already holds the CST for `text` may pass it as `module` so
+        the next stage doesn't need to parse it again.
+        """
+        encoding, newline = self.encoding, self.newline
+        if self._saved_text is None:
+            self._saved_text = self.text
+        self._text = text
+        self._raw = text.replace("\n", newline).encode(encoding)
+        self._digest = None
+        self._lines = None
+        self._tokens = None
+        self._ast = None
+        self._cst = module
+
+    def write(self):
+        """Write the in-memory contents back to disk."""
+        atomic_write(self.path, self.text, encoding=self.encoding, newline=self.newline)
+        self._saved_text = None
+
+    def diff(self) -> str:
+        """A unified diff from the file's contents to the in-memory contents."""
+        if not self.changed:
+            return ""
+        # like black's diffs, so a missing final newline doesn't garble the output
+        a_lines = [line + "\n" for line in self._saved_text.split("\n")]
+        b_lines = [line + "\n" for line in self.text.split("\n")]
+        return "".join(
+            difflib.unified_diff(
+                a_lines,
+                b_lines,
+                fromfile=f"{self.path}\t(original)",
+                tofile=f"{self.path}\t(transformed)",
+            )
+        )
+
+    def _decode(self):
+        # mirrors black.decode_bytes: universal newlines in memory, but remember the
+        # original newline so writing back preserves it
+        buf = io.BytesIO(self.raw)
+        encoding, first_lines = tokenize.detect_encoding(buf.readline)
+        self._encoding = encoding
+        self._newline = "\n"
+        if not first_lines:
+            self._text = ""
+            return
+
+        if first_lines[0][-2:] == b"\r\n":
+            self._newline = "\r\n"
+        buf.seek(0)
+        with io.TextIOWrapper(buf, encoding) as f:
+            self._text = f.read()
+
+
+def atomic_write(path: str, text: str, encoding: str = "utf-8", newline: str = "\n"):
+    """Replace the file at `path` via a temporary file and rename.
+
+    Readers (and file watchers) never see a partially written file, and an existing
+    file's permissions are preserved.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=dirname, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with open(fd, "w", encoding=encoding, newline=newline) as f:
+            f.write(text)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def write_changed(units: Iterable[SourceUnit]) -> List[SourceUnit]:
+    """Write each unit whose in-memory contents changed, returning the ones written."""
+    written = []
+    for unit in units:
+        if unit.changed:
+            unit.write()
+            written.append(unit)
+    return written
+
+
+def as_units(sources: Sequence[Union[str, SourceUnit]]) -> List[SourceUnit]:
+    """Wrap any bare file paths in `SourceUnit`s, leaving existing units as-is."""
+    return [s if isinstance(s, SourceUnit) else SourceUnit(str(s)) for s in sources]
+
+
+def iter_units(sources: Iterable[Union[str, SourceUnit]]) -> Iterator[SourceUnit]:
+    """Like `as_units`, but lazily, so callers can drop each unit once it's handled."""
+    for s in sources:
+        yield s if isinstance(s, SourceUnit) else SourceUnit(str(s))
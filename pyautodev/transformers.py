@@ -1,15 +1,35 @@
-import inspect
-from functools import partial
 from pathlib import Path
-from typing import List, Union, Callable
+from typing import (
+    Callable,
+    Collection,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import libcst as cst
 import black
-from black import reformat_one, FileMode, Report, WriteBack, Changed
+from black import (
+    assert_equivalent,
+    assert_stable,
+    format_str,
+    get_cache_info,
+    read_cache,
+    write_cache,
+    FileMode,
+    Report,
+    Changed,
+)
 from libcst import CSTNodeT, RemovalSentinel, MetadataWrapper
-from libcst.metadata import PositionProvider
+from libcst.metadata import ProviderT
 
 from pyautodev.modifiers import CommentWrap
+from pyautodev.profiling import FILE, span
+from pyautodev.source import SourceUnit, as_units, write_changed
 
 MAX_LINE_LENGTH = black.DEFAULT_LINE_LENGTH
 
@@ -22,20 +42,66 @@ class Black:
             skip_string_normalization=False,
             skip_numeric_underscore_normalization=False,
         )
+        self._cache = None
 
-    def transform(self, filepaths: List[str]):
+    def transform(self, sources: Sequence[Union[str, SourceUnit]], write: bool = True):
+        """Format each file in memory, then write the changed ones if `write` is set.
+
+        Pass `write=False` to leave writing to the caller, e.g., after later transforms.
+        """
         report = Black.CollectingReport()
-        for filepath in filepaths:
-            reformat_one(
-                src=Path(filepath),
-                line_length=MAX_LINE_LENGTH,
-                fast=False,
-                write_back=WriteBack.YES,
-                mode=self._mode,
-                report=report,
+        # read black's cache once rather than once per file (or per call)
+        if self._cache is None:
+            self._cache = read_cache(MAX_LINE_LENGTH, self._mode)
+        units = as_units(sources)
+        formatted = []
+        for unit in units:
+            src = Path(unit.path)
+            try:
+                with span("black", FILE, file=unit.path):
+                    changed = self._transform_one(unit, src, self._cache)
+                # only what's on disk can be cached as formatted
+                if changed is Changed.NO or (changed is Changed.YES and write):
+                    formatted.append(src)
+                report.done(src, changed)
+            except Exception as exc:
+                report.failed(src, str(exc))
+
+        if write:
+            write_changed(units)
+
+        if formatted:
+            write_cache(self._cache, formatted, MAX_LINE_LENGTH, self._mode)
+            self._cache.update(
+                {src.resolve(): get_cache_info(src) for src in formatted}
             )
         return report
 
+    def _transform_one(self, unit: SourceUnit, src: Path, cache: dict) -> Changed:
+        res_src = src.resolve()
+        if res_src in cache and cache[res_src] == get_cache_info(res_src):
+            return Changed.CACHED
+
+        mode = self._mode
+        if src.suffix == ".pyi":
+            mode |= FileMode.PYI
+        # what format_file_contents(..., fast=False) does, but with the formatting and
+        # its safety checks profiled separately
+        if not unit.text.strip():
+            return Changed.NO
+        with span("black.format", file=unit.path):
+            dst_contents = format_str(unit.text, line_length=MAX_LINE_LENGTH, mode=mode)
+        if dst_contents == unit.text:
+            return Changed.NO
+        with span("black.safety_check", file=unit.path):
+            assert_equivalent(unit.text, dst_contents)
+            assert_stable(
+                unit.text, dst_contents, line_length=MAX_LINE_LENGTH, mode=mode
+            )
+
+        unit.update(dst_contents)
+        return Changed.YES
+
     class CollectingReport(Report):
         def __init__(self):
             self.done_paths_changed = {}
@@ -49,48 +115,147 @@ class Black:
 
 
 class PyAutoDev(cst.CSTTransformer):
+    """Applies every modifier to each module in a single traversal.
+
+    The modifiers' `visit_*` and `leave_*` methods are compiled once into tables from
+    node type to the handlers for it, in modifier order, so node types no modifier
+    handles cost one dictionary lookup. Each `leave_*` handler gets the node the
+    previous modifier returned. The metadata every modifier depends on is resolved
+    once per module and shared between them.
+
+    A modifier whose `visit_*` returns False doesn't see that node's children, but
+    the others still do; libcst only skips the children if every modifier does.
+    """
 
-    METADATA_DEPENDENCIES = (PositionProvider,)
     _DEFAULT_MODIFIERS = [CommentWrap()]
 
-    def __init__(self, modifiers=None):
+    def __init__(self, modifiers: Optional[Sequence[cst.CSTTransformer]] = None):
         super().__init__()
         self._modifiers = modifiers or self._DEFAULT_MODIFIERS
-        self._init_leave_methods()
-
-    def transform(self, filepaths: List[str]):
-        for filepath in filepaths:
-
-            with open(filepath, "r") as f:
-                orig_contents = MetadataWrapper(cst.parse_module(f.read()))
-
-            updated_contents = orig_contents.visit(self)
-
-            with open(filepath, "w") as f:
-                f.write(updated_contents.code)
-
-    def _init_leave_methods(self):
-        modifier_leave_methods = {}
-        for m in self._modifiers:
-            setattr(m, 'get_metadata', self.get_metadata)
-            for name, value in vars(m.__class__).items():
-                if inspect.isroutine(value) and name.startswith("leave_"):
-                    if name not in modifier_leave_methods:
-                        modifier_leave_methods[name] = []
-                    modifier_leave_methods[name].append(partial(value, m))
-
-        for fn_name, modifier_leave_fns in modifier_leave_methods.items():
-            leave_fn = partial(self._leave_node, modifier_leave_fns=modifier_leave_fns)
-            setattr(self, fn_name, leave_fn)
-
-    def _leave_node(
-        self,
-        original_node: CSTNodeT,
-        updated_node: CSTNodeT,
-        modifier_leave_fns: List[Callable],
+        self._dependencies = frozenset(
+            provider
+            for m in self._modifiers
+            for provider in m.get_inherited_dependencies()
+        )
+        self._visit_fns = _dispatch_table(self._modifiers, "visit_")
+        self._leave_fns = _dispatch_table(self._modifiers, "leave_")
+        # modifier index: the node whose children that modifier asked to skip
+        self._skipping = {}  # type: Dict[int, cst.CSTNode]
+
+    def transform(self, sources: Sequence[Union[str, SourceUnit]], write: bool = True):
+        """Modify each file in memory, then write the changed ones if `write` is set."""
+        report = Black.CollectingReport()
+        units = as_units(sources)
+        for unit in units:
+            with span("pyautodev", FILE, file=unit.path):
+                changed = self._transform_one(unit)
+            report.done(Path(unit.path), changed)
+
+        if write:
+            write_changed(units)
+        return report
+
+    def _transform_one(self, unit: SourceUnit) -> Changed:
+        with span("pyautodev.prefilter", file=unit.path):
+            matched = any(self._prefilter(m, unit) for m in self._modifiers)
+        if not matched:
+            # no modifier has anything to do, so skip parsing the file entirely
+            return Changed.NO
+
+        with span("libcst.parse", file=unit.path):
+            module = unit.cst
+        with span("libcst.metadata", file=unit.path):
+            wrapper = MetadataWrapper(module)
+            metadata = wrapper.resolve_many(self.get_inherited_dependencies())
+        with span("libcst.visit", file=unit.path):
+            updated_contents = self._visit(wrapper.module, metadata)
+
+        if updated_contents.code == unit.text:
+            # leave unchanged files (and their mtimes) alone
+            return Changed.NO
+
+        unit.update(updated_contents.code, module=updated_contents)
+        return Changed.YES
+
+    @staticmethod
+    def _prefilter(modifier, unit: SourceUnit) -> bool:
+        """Whether `modifier` might change `unit`, per its (optional) cheap text check.
+
+        Modifiers without a `prefilter` method always need the parsed CST.
+        """
+        prefilter = getattr(modifier, "prefilter", None)
+        return prefilter is None or prefilter(unit)
+
+    def get_inherited_dependencies(self) -> Collection[ProviderT]:
+        """Every modifier's metadata dependencies."""
+        return self._dependencies
+
+    def _visit(self, module: cst.Module, metadata: Mapping) -> cst.Module:
+        # each modifier still only gets the metadata it declared via `get_metadata`
+        visitors = [self, *self._modifiers]
+        for v in visitors:
+            v.metadata = metadata
+        self._skipping = {}
+        try:
+            return module.visit(self)
+        finally:
+            for v in visitors:
+                v.metadata = {}
+
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        skipping = self._skipping
+        for i, visit_fn in self._visit_fns.get(type(node).__name__, ()):
+            if i not in skipping and visit_fn(node) is False:
+                skipping[i] = node
+        return len(skipping) < len(self._modifiers)
+
+    def on_leave(
+        self, original_node: CSTNodeT, updated_node: CSTNodeT
     ) -> Union[CSTNodeT, RemovalSentinel]:
-        for modifier_leave_fn in modifier_leave_fns:
-            updated_node = modifier_leave_fn(original_node, updated_node)
-            if updated_node == RemovalSentinel:
-                return updated_node
+        skipping = self._skipping
+        for i, leave_fn in self._leave_fns.get(type(original_node).__name__, ()):
+            if skipping.get(i, original_node) is not original_node:
+                continue  # inside a node whose children this modifier skipped
+            updated_node = leave_fn(original_node, updated_node)
+            if not isinstance(updated_node, cst.CSTNode):
+                # removed (or flattened), so there's nothing left to modify
+                break
+
+        if skipping:
+            for i in [i for i, n in skipping.items() if n is original_node]:
+                del skipping[i]
         return updated_node
+
+    def on_visit_attribute(self, node: cst.CSTNode, attribute: str) -> None:
+        skipping = self._skipping
+        name = f"{type(node).__name__}_{attribute}"
+        for i, visit_fn in self._visit_fns.get(name, ()):
+            if i not in skipping:
+                visit_fn(node)
+
+    def on_leave_attribute(self, original_node: cst.CSTNode, attribute: str) -> None:
+        skipping = self._skipping
+        name = f"{type(original_node).__name__}_{attribute}"
+        for i, leave_fn in self._leave_fns.get(name, ()):
+            if i not in skipping:
+                leave_fn(original_node)
+
+
+def _dispatch_table(
+    modifiers: Sequence[cst.CSTTransformer], prefix: str
+) -> Dict[str, Tuple[Tuple[int, Callable], ...]]:
+    """Each node type (or `NodeType_attribute`) name to the modifiers' handlers for it.
+
+    Only methods a modifier overrides count, since libcst's own are no-ops.
+    """
+    table = {}  # type: Dict[str, List[Tuple[int, Callable]]]
+    for i, m in enumerate(modifiers):
+        for method_name in dir(type(m)):
+            if not method_name.startswith(prefix):
+                continue
+            method = getattr(type(m), method_name)
+            if method is getattr(cst.CSTTransformer, method_name, None):
+                continue
+            name = method_name[len(prefix) :]
+            table.setdefault(name, []).append((i, getattr(m, method_name)))
+    return {name: tuple(fns) for name, fns in table.items()}
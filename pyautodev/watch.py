@@ -0,0 +1,249 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Set
+
+from pyautodev.checkers import Message
+from pyautodev.discovery import Walker, discover
+from pyautodev.processor import Processor
+from pyautodev.profiling import Timings
+
+# how long to wait for a burst of saves (e.g., an editor's write + rename, or "save
+# all") to finish before processing the files
+DEFAULT_DEBOUNCE = 0.05
+
+# how often the polling fallback rescans the watched files
+DEFAULT_POLL_INTERVAL = 0.5
+
+# inotify(7) constants
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class Watch:
+    """Re-processes Python files as they're saved, using a long-lived `Processor`.
+
+    Changes are detected with inotify where it's available, falling back to polling.
+    Files the processor itself just rewrote are ignored, so its own write-back doesn't
+    trigger another run.
+    """
+
+    def __init__(
+        self,
+        srcs: Sequence[str],
+        processor: Processor,
+        poll: bool = False,
+        debounce: float = DEFAULT_DEBOUNCE,
+        exclude: Sequence[str] = (),
+    ):
+        self.processor = processor
+        self.debounce = debounce
+        self._watcher = None
+        if not poll:
+            try:
+                self._watcher = InotifyWatcher(srcs, exclude=exclude)
+            except OSError:
+                pass
+        if self._watcher is None:
+            self._watcher = PollingWatcher(srcs, exclude=exclude)
+
+        # (mtime, size) of each file right after we last processed it
+        self._processed_stats = {}  # type: Dict[str, tuple]
+
+    def run(self, emit: Callable[[Message], None] = print):
+        while True:
+            filepaths = self.wait_for_changes()
+            for m in self.process(filepaths):
+                emit(m)
+
+    def wait_for_changes(self, timeout: Optional[float] = None) -> List[str]:
+        """Files changed by someone other than us, once a burst of changes settles."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while not changed:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return []
+            changed = {f for f in self._watcher.wait(remaining) if self._is_external(f)}
+
+        while True:
+            more = self._watcher.wait(self.debounce)
+            if not more:
+                break
+            changed.update(f for f in more if self._is_external(f))
+
+        return sorted(changed)
+
+    def process(self, filepaths: List[str]) -> Iterator[Message]:
+        history = self.processor.history
+        timings = Timings(checks=False) if history else None
+        try:
+            with timings or nullcontext():
+                yield from self.processor.iter_process(filepaths)
+        finally:
+            for filepath in filepaths:
+                self._processed_stats[filepath] = _stat(filepath)
+        if history:
+            history.record(timings)
+
+    def _is_external(self, filepath: str) -> bool:
+        stat = _stat(filepath)
+        return stat is not None and stat != self._processed_stats.get(filepath)
+
+
+class InotifyWatcher:
+    """Reports Python files written beneath the given paths, via Linux's inotify.
+
+    Only the directories and files `discover` would find are watched and reported.
+    """
+
+    def __init__(self, srcs: Sequence[str], exclude: Sequence[str] = ()):
+        libc_path = ctypes.util.find_library("c")
+        if libc_path is None:
+            raise OSError("could not find libc")
+        self._libc = ctypes.CDLL(libc_path, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise _errno_error()
+
+        self._dirs = {}  # type: Dict[int, str]
+        self._watched = set()  # type: Set[str]
+        self._files = set()  # type: Set[str]
+        self._walkers = []  # type: List[Walker]
+        for src in srcs:
+            src = os.path.abspath(src)
+            if os.path.isdir(src):
+                walker = Walker(src, exclude)
+                walker.walk()
+                self._walkers.append(walker)
+                self._add_dirs(walker)
+            else:
+                self._files.add(src)
+                self._add_dir(os.path.dirname(src))
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        data = os.read(self._fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0").decode()
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                # we lost events, so treat everything as changed
+                changed.update(self._all_files())
+                continue
+
+            dirname = self._dirs.get(wd)
+            if dirname is None:
+                continue
+            path = os.path.join(dirname, name)
+            if mask & _IN_ISDIR:
+                if mask & (_IN_CREATE | _IN_MOVED_TO):
+                    for walker in self._walkers:
+                        if walker.includes(path, is_dir=True):
+                            changed.update(walker.walk(path))
+                            self._add_dirs(walker)
+            elif self._is_watched(path) and mask & (_IN_CLOSE_WRITE | _IN_MOVED_TO):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+    def _add_dirs(self, walker: Walker):
+        for dirpath in walker.dirs:
+            if dirpath not in self._watched:
+                self._add_dir(dirpath)
+
+    def _add_dir(self, dirpath: str):
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(dirpath), ctypes.c_uint32(_WATCH_MASK)
+        )
+        if wd < 0:
+            raise _errno_error()
+        self._dirs[wd] = dirpath
+        self._watched.add(dirpath)
+
+    def _is_watched(self, path: str) -> bool:
+        return path in self._files or any(
+            w.includes(path, is_dir=False) for w in self._walkers
+        )
+
+    def _all_files(self) -> List[str]:
+        filepaths = []
+        for walker in self._walkers:
+            filepaths.extend(walker.walk())
+            self._add_dirs(walker)
+        return filepaths + sorted(self._files)
+
+
+class PollingWatcher:
+    """Reports Python files modified beneath `srcs` by periodically rescanning them."""
+
+    def __init__(
+        self,
+        srcs: Sequence[str],
+        interval: float = DEFAULT_POLL_INTERVAL,
+        exclude: Sequence[str] = (),
+    ):
+        self._srcs = list(srcs)
+        self.interval = interval
+        self.exclude = exclude
+        self._stats = self._scan()
+        self._last_scan = time.monotonic()
+
+    def wait(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            next_scan = self._last_scan + self.interval
+            if deadline is not None and deadline < next_scan:
+                time.sleep(max(deadline - time.monotonic(), 0))
+                return set()
+            time.sleep(max(next_scan - time.monotonic(), 0))
+
+            stats = self._scan()
+            self._last_scan = time.monotonic()
+            changed = {f for f, s in stats.items() if s != self._stats.get(f)}
+            self._stats = stats
+            if changed:
+                return changed
+
+    def _scan(self) -> Dict[str, tuple]:
+        stats = {}
+        for filepath in discover(self._srcs, exclude=self.exclude):
+            stat = _stat(filepath)
+            if stat is not None:
+                stats[os.path.abspath(filepath)] = stat
+        return stats
+
+
+def _stat(filepath: str) -> Optional[tuple]:
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _errno_error() -> OSError:
+    errno = ctypes.get_errno()
+    return OSError(errno, os.strerror(errno))
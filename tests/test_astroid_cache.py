@@ -0,0 +1,80 @@
+import hashlib
+import os
+
+from astroid import MANAGER
+from astroid.builder import AstroidBuilder
+
+from pyautodev.astroid_cache import AstroidCache
+from pyautodev.checkers import PyLint
+
+HELPER = '''\
+"""Helper module."""
+
+
+def greet(name):
+    """Greet `name`."""
+    return "hello " + name
+'''
+
+MAIN = '''\
+"""Main module."""
+from helper import greet, missing
+
+print(greet(1, 2))
+'''
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def test_astroid_cache_roundtrip(tmp_path):
+    cache = AstroidCache(str(tmp_path))
+    path = str(tmp_path / "helper.py")
+    module = AstroidBuilder(MANAGER)._data_build(HELPER, "helper", path)
+
+    cache.put(path, "helper", _digest(HELPER), module)
+    cached = cache.get(path, "helper", _digest(HELPER))
+
+    assert cached.as_string() == module.as_string()
+    assert cached.body[0].args.args[0].name == "name"
+    assert cache.get(path, "helper", _digest(HELPER + "\n")) is None
+    assert cache.get(path, "other", _digest(HELPER)) is None
+
+
+def test_pylint_reuses_cached_trees(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    (tmp_path / "helper.py").write_text(HELPER)
+    main = tmp_path / "main.py"
+    main.write_text(MAIN)
+    astroid_cache = AstroidCache(str(tmp_path / "cache"))
+
+    def check():
+        MANAGER.astroid_cache.pop("helper", None)
+        return PyLint(astroid_cache=astroid_cache).check([str(main)])
+
+    expected = PyLint().check([str(main)])
+    assert {m.description for m in expected} >= {
+        "no-name-in-module",
+        "too-many-function-args",
+    }
+    assert check() == expected
+    assert os.listdir(astroid_cache.cache_dir)
+
+    # now the imported module's tree comes from the cache instead of being parsed
+    parsed = []
+    data_build = AstroidBuilder._data_build
+
+    def spy(self, data, modname, path):
+        parsed.append(modname)
+        return data_build(self, data, modname, path)
+
+    monkeypatch.setattr(AstroidBuilder, "_data_build", spy)
+    assert check() == expected
+    assert "helper" not in parsed
+
+    # but a changed module is parsed again
+    (tmp_path / "helper.py").write_text(HELPER.replace("name", "who"))
+    check()
+    assert "helper" in parsed
+    assert "ast_from_file" not in vars(MANAGER)
@@ -0,0 +1,73 @@
+import copy
+import py_compile
+
+import pytest
+from black import Changed
+
+from pyautodev import bench
+from pyautodev.checkers import PyFlakes
+from pyautodev.transformers import PyAutoDev
+
+
+def test_generate_corpus(tmp_path):
+    spec = bench.CorpusSpec(
+        files=3, lines=100, long_comment_density=0.5, violation_density=0.5
+    )
+    filepaths = bench.generate_corpus(spec, str(tmp_path))
+
+    assert len(filepaths) == 3
+    for filepath in filepaths:
+        py_compile.compile(filepath, doraise=True)
+        with open(filepath, "r") as f:
+            assert f.read().count("\n") >= 100
+
+    # the features we asked for are there for the stages to act on
+    assert PyFlakes().check(filepaths)
+    report = PyAutoDev().transform(filepaths)
+    assert Changed.YES in report.done_paths_changed.values()
+
+    # and the same spec always generates the same corpus
+    contents = [open(f).read() for f in bench.generate_corpus(spec, str(tmp_path))]
+    regenerated = [
+        open(f).read() for f in bench.generate_corpus(spec, str(tmp_path / "again"))
+    ]
+    assert regenerated == contents
+
+
+def test_run():
+    results = bench.run(bench.CorpusSpec(files=2, lines=50), repeat=1)
+
+    assert list(results["stages"]) == list(bench.STAGES)
+    assert results["corpus"]["files"] == 2
+    for stage in results["stages"].values():
+        assert stage["seconds"] > 0
+        assert len(stage["runs"]) == 1
+
+
+def test_compare():
+    baseline = {
+        "spec": {"files": 1},
+        "stages": {"black": {"seconds": 1.0}, "pylint": {"seconds": 2.0}},
+    }
+    results = copy.deepcopy(baseline)
+    results["stages"]["black"]["seconds"] = 1.05
+    results["stages"]["pylint"]["seconds"] = 3.0
+
+    regressions = bench.compare(results, baseline, tolerance=0.1)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("pylint:")
+
+    results["spec"] = {"files": 2}
+    with pytest.raises(ValueError):
+        bench.compare(results, baseline)
+
+
+def test_reflow_scaling():
+    results = bench.reflow_scaling(repeat=5)
+
+    assert set(results) == {"lines", "words"}
+    for result in results.values():
+        sizes = [t["size"] for t in result["timings"]]
+        assert sizes == list(bench.DEFAULT_REFLOW_SIZES)
+        # linear is 1, quadratic 2; leave room for timing noise
+        assert result["exponent"] < 1.6
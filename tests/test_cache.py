@@ -0,0 +1,133 @@
+import os
+import pickle
+
+from pyautodev.cache import ResultCache
+from pyautodev.checkers import (
+    Message,
+    PyCodeStyle,
+    PyFlakes,
+    PyLint,
+    evict_astroid_modules,
+)
+from pyautodev.source import SourceUnit
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TEST_FILE = os.path.join(TEST_DIR, "bad_continuation_tabs.py")
+
+
+def test_result_cache_roundtrip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    msgs = [Message("E501", "line too long", "foo.py", 1, 89)]
+
+    cache.put_many({"a": msgs, "b": []})
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": msgs, "b": []}
+
+
+def test_result_cache_evicts_least_recently_used(tmp_path):
+    msgs = [Message("E501", "line too long", "foo.py", 1, 89)]
+    cache = ResultCache(str(tmp_path))
+    cache.put_many({"a": msgs})
+    entry_size = cache._connect().execute("SELECT size FROM results").fetchone()[0]
+
+    cache.max_bytes = 2 * entry_size
+    cache.put_many({"b": msgs})
+    cache.get_many(["a"])  # now "b" is the least recently used
+    cache.put_many({"c": msgs})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+
+
+def test_result_cache_keeps_total_size(tmp_path):
+    msgs = [Message("E501", "line too long", "foo.py", 1, 89)]
+    cache = ResultCache(str(tmp_path))
+    cache.put_many({"a": msgs, "b": []})
+    conn = cache._connect()
+
+    def sizes():
+        (total,) = conn.execute("SELECT value FROM meta WHERE name = 'size'").fetchone()
+        return total, conn.execute("SELECT SUM(size) FROM results").fetchone()[0]
+
+    # replacing, evicting and clearing entries all keep the total up to date
+    cache.put_many({"a": msgs * 3})
+    assert sizes()[0] == sizes()[1]
+    cache.max_bytes = sizes()[0] - 1
+    cache.put_many({"c": []})
+    assert sizes()[0] == sizes()[1]
+    cache.clear()
+    assert sizes() == (0, None)
+
+    # a cache from before the total was kept gets one
+    cache.put_many({"a": msgs})
+    with conn:
+        conn.execute("DROP TABLE meta")
+    cache.close()
+    conn = ResultCache(str(tmp_path))._connect()
+    assert sizes()[0] == sizes()[1] > 0
+
+
+def test_result_cache_pickles_without_connection(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    cache.put_many({"a": []})
+
+    unpickled = pickle.loads(pickle.dumps(cache))
+
+    assert unpickled.get_many(["a"]) == {"a": []}
+
+
+def test_checkers_use_cache(tmp_path):
+    for checker_cls in [PyLint, PyFlakes, PyCodeStyle]:
+        cache = ResultCache(str(tmp_path))
+        expected_msgs = checker_cls().check([TEST_FILE])
+
+        checker = checker_cls(cache=cache)
+        assert checker.check([TEST_FILE]) == expected_msgs
+
+        # a hit shouldn't invoke the underlying tool
+        checker._check = None
+        assert checker.check([TEST_FILE]) == expected_msgs
+
+
+def test_checkers_cache_keyed_by_contents(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    checker = PyFlakes(cache=cache)
+    assert checker.check([SourceUnit(TEST_FILE, raw=b"import os\n")]) != []
+
+    assert checker.check([SourceUnit(TEST_FILE, raw=b"x = 1\n")]) == []
+
+
+def test_pylint_cache_keyed_by_imports(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    cache = ResultCache(str(tmp_path / "cache"))
+    module = tmp_path / "greetings.py"
+    filepath = str(tmp_path / "main.py")
+    with open(filepath, "w") as f:
+        f.write('"""Main."""\nimport greetings\n\ngreetings.helper()\n')
+
+    module.write_text('"""Helpers."""\n\n\ndef helper():\n    """Help."""\n')
+    assert PyLint(cache=cache).check([filepath]) == []
+
+    # the file itself didn't change, but the module it imports did
+    module.write_text('"""Helpers."""\n')
+    evict_astroid_modules()  # as in a new process
+    msgs = PyLint(cache=cache).check([filepath])
+    assert [m.description for m in msgs] == ["no-member"]
+
+
+def test_pylint_caches_cross_file_messages(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"))
+    filepaths = []
+    for name in ["a.py", "b.py"]:
+        filepath = str(tmp_path / name)
+        with open(TEST_FILE, "rb") as src, open(filepath, "wb") as dst:
+            dst.write(src.read())
+        filepaths.append(filepath)
+    expected_msgs = PyLint().check(filepaths)
+    assert expected_msgs[-1].description == "duplicate-code"
+
+    checker = PyLint(cache=cache)
+    assert checker.check(filepaths) == expected_msgs
+
+    # a hit shouldn't run either linter
+    checker._run_linter = None
+    assert checker.check(filepaths) == expected_msgs
@@ -0,0 +1,80 @@
+import os
+import subprocess
+
+from pyautodev.changes import RunState, git_changed_files, select_changed
+from pyautodev.discovery import discover
+
+
+def _write(filepath, contents):
+    with open(filepath, "w") as f:
+        f.write(contents)
+
+
+def test_run_state(tmp_path):
+    a_path = os.path.join(str(tmp_path), "a.py")
+    b_path = os.path.join(str(tmp_path), "b.py")
+    _write(a_path, "a = 1\n")
+    _write(b_path, "b = 1\n")
+    state_path = os.path.join(str(tmp_path), "state", "last_run.json")
+
+    assert RunState(state_path).changed([a_path, b_path]) == [a_path, b_path]
+    RunState(state_path).record([a_path, b_path])
+    assert RunState(state_path).changed([a_path, b_path]) == []
+
+    _write(b_path, "b = 10\n")
+    assert RunState(state_path).changed([a_path, b_path]) == [b_path]
+
+
+def test_run_state_default_path(tmp_path):
+    cache_dir = str(tmp_path)
+    state_path = RunState.default_path(cache_dir, cwd="/a")
+
+    assert state_path.startswith(os.path.join(cache_dir, "runs", ""))
+    assert RunState.default_path(cache_dir, cwd="/b") != state_path
+
+
+def test_git_changed_files(tmp_path):
+    repo = str(tmp_path)
+    _git(repo, "init", "-q")
+    _write(os.path.join(repo, "a.py"), "a = 1\n")
+    _write(os.path.join(repo, "b.py"), "b = 1\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "initial")
+
+    _write(os.path.join(repo, "b.py"), "b = 2\n")
+    _write(os.path.join(repo, "c.py"), "c = 1\n")
+    changed = git_changed_files("HEAD", cwd=repo)
+
+    toplevel = _git(repo, "rev-parse", "--show-toplevel").strip()
+    assert changed == {os.path.join(toplevel, "b.py"), os.path.join(toplevel, "c.py")}
+    assert select_changed(discover([toplevel]), changed) == [
+        os.path.join(toplevel, "b.py"),
+        os.path.join(toplevel, "c.py"),
+    ]
+
+
+def _git(repo, *args) -> str:
+    return subprocess.run(
+        ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+        + list(args),
+        cwd=repo,
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout
+
+
+def test_git_changed_files_symlinked(tmp_path):
+    repo = os.path.join(str(tmp_path), "repo")
+    os.makedirs(repo)
+    _git(repo, "init", "-q")
+    _write(os.path.join(repo, "a.py"), "a = 1\n")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "initial")
+    link = os.path.join(str(tmp_path), "link")
+    os.symlink(repo, link)
+
+    _write(os.path.join(repo, "a.py"), "a = 2\n")
+    changed = git_changed_files("HEAD", cwd=link)
+
+    assert select_changed(discover([link]), changed) == [os.path.join(link, "a.py")]
@@ -1,6 +1,7 @@
 import os
 
-from pyautodev.checkers import PyLint, PyCodeStyle, PyFlakes
+from pyautodev.checkers import Message, MessageBatch, PyLint, PyCodeStyle, PyFlakes
+from pyautodev.source import SourceUnit
 
 TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
 TEST_FILE = os.path.join(TEST_DIR, "bad_continuation_tabs.py")
@@ -107,3 +108,43 @@ def test_pyflakes():
     assert msg.line == 55
     assert msg.column == 20
 
+
+def test_checkers_share_unit_tokens_and_tree(tmp_path):
+    # never written to disk, so the checkers can only use what's in memory
+    unit = SourceUnit(str(tmp_path / "a.py"), raw=b"import os\nx = '''\n  \n'''\n")
+
+    assert [m.code for m in PyFlakes().check([unit])] == ["UnusedImport"]
+    tokens, tree = unit.tokens, unit.ast
+    assert [(m.code, m.line) for m in PyCodeStyle().check([unit])] == [("W293", 3)]
+    assert unit.tokens is tokens and unit.ast is tree
+
+    unit = SourceUnit(str(tmp_path / "b.py"), raw=b"x = (1,\n")
+    assert [m.code for m in PyCodeStyle().check([unit])] == ["E901"]
+    assert PyFlakes().check([unit])[0].line == 1
+
+
+def test_iter_check():
+    for checker in [PyLint(), PyCodeStyle(), PyFlakes()]:
+        assert list(checker.iter_check([TEST_FILE])) == checker.check([TEST_FILE])
+
+
+def test_message_interned():
+    filepath = "".join(["a", ".py"])  # built at runtime, so not already interned
+    m1 = Message("E501", "line too long", filepath, 1, None)
+    m2 = Message("E501", "line too long", "".join(["a", ".py"]), 2, None)
+
+    assert m1.filepath is m2.filepath
+    assert not hasattr(m1, "__dict__")
+
+
+def test_message_batch():
+    msgs = PyFlakes().check([TEST_FILE]) + [Message(None, "error", "a.py", None, None)]
+
+    batch = MessageBatch(msgs)
+
+    assert len(batch) == len(msgs)
+    assert list(batch) == msgs
+    assert batch[-1].line is None
+
+    batch = PyFlakes().check_batch([TEST_FILE])
+    assert list(batch) == msgs[:-1]
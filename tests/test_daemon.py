@@ -0,0 +1,61 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from pyautodev.client import forward
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    socket_path = os.path.join(str(tmp_path), "pyautodev.sock")
+    daemon = subprocess.Popen(
+        [sys.executable, "-m", "pyautodev.main", "serve", "--socket", socket_path],
+        cwd=ROOT_DIR,
+    )
+    try:
+        for _ in range(300):
+            if os.path.exists(socket_path) or daemon.poll() is not None:
+                break
+            time.sleep(0.1)
+        yield socket_path
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    assert not os.path.exists(socket_path)
+
+
+def test_forward_without_daemon(tmp_path):
+    assert forward([], os.path.join(str(tmp_path), "missing.sock")) is None
+
+
+def test_forward(socket_path, tmp_path, capsys):
+    filepath = os.path.join(str(tmp_path), "unused.py")
+    with open(filepath, "w") as f:
+        f.write('"""Docstring."""\nimport os\n')
+
+    for _ in range(2):
+        assert forward(["--no-cache", filepath], socket_path) == 0
+        out = capsys.readouterr().out
+        assert f"{filepath}:2:0:W0611:unused-import" in out.splitlines()
+
+    assert forward(["--bogus"], socket_path) == 2
+    assert "no such option: --bogus" in capsys.readouterr().err
+
+
+def test_forward_check(socket_path, tmp_path, capsys):
+    filepath = os.path.join(str(tmp_path), "unformatted.py")
+    with open(filepath, "w") as f:
+        f.write("x = [1,2]\n")
+
+    assert forward(["check", "--check", filepath], socket_path) == 1
+    assert "1 file(s) would be changed" in capsys.readouterr().err
+
+    with open(filepath, "w") as f:
+        f.write("x = [1, 2]\n")
+    assert forward(["check", "--check", filepath], socket_path) == 0
@@ -0,0 +1,66 @@
+import os
+
+from pyflakes import messages
+
+from pyautodev.checkers import Message, PyLint
+from pyautodev.dedup import EQUIVALENT_CODES, dedup, fingerprint, pylint_overlaps
+from pyautodev.processor import Processor
+
+from tests.test_processor import _copy_test_files
+
+
+def test_dedup():
+    abspath = os.path.abspath("a.py")
+    msgs = [
+        Message("W0611", "unused-import", abspath, 1, 0),
+        Message("C0301", "line-too-long", abspath, 2, 0),
+        Message("UnusedImport", "'os' imported but unused", "a.py", 1, 1),
+        Message("UnusedImport", "'sys' imported but unused", "a.py", 3, 1),
+        Message("E501", "line too long (90 > 88 characters)", "a.py", 2, 89),
+        Message("E501", "line too long (90 > 88 characters)", "b.py", 2, 89),
+        Message("W0612", "unused-variable", abspath, 4, 4),
+        Message("W0612", "unused-variable", abspath, 4, 8),
+    ]
+
+    assert list(dedup(msgs)) == [msgs[0], msgs[1], msgs[3], msgs[5], msgs[6], msgs[7]]
+    assert fingerprint(Message("C0111", "missing-docstring", "a.py", 1, 0)) is None
+
+
+def test_equivalent_codes_exist():
+    for _, pyflakes_codes, _ in EQUIVALENT_CODES.values():
+        for code in pyflakes_codes:
+            assert issubclass(getattr(messages, code), messages.Message)
+
+    linter = PyLint()._inner
+    for code in pylint_overlaps():
+        assert linter.msgs_store.get_message_definitions(code)
+
+
+def test_process_dedup(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    msgs = Processor().process(filepaths)
+
+    filepaths = _copy_test_files(tmp_path)
+    dedup_msgs = Processor(dedup=True).process(filepaths)
+
+    filepaths = _copy_test_files(tmp_path)
+    iter_dedup_msgs = list(Processor(dedup=True).iter_process(filepaths))
+
+    # no message left has a match from another tool
+    assert list(dedup(dedup_msgs)) == dedup_msgs
+    assert len(dedup_msgs) < len(msgs)
+    assert not {m.code for m in dedup_msgs} & set(pylint_overlaps())
+    assert sorted(map(str, iter_dedup_msgs)) == sorted(map(str, dedup_msgs))
+
+
+def test_dedup_keeps_same_tool_messages(tmp_path):
+    filepath = os.path.join(str(tmp_path), "a.py")
+    with open(filepath, "w") as f:
+        f.write('"""Docstring."""\nimport os, sys\n')
+
+    msgs = Processor(dedup=True).process([filepath])
+
+    unused = [m.description for m in msgs if m.code == "UnusedImport"]
+    assert len(unused) == 2
+    assert unused[0].endswith("'os' imported but unused")
+    assert unused[1].endswith("'sys' imported but unused")
@@ -0,0 +1,117 @@
+import os
+
+import pytest
+
+from pyautodev.discovery import GitIgnore, discover
+
+
+def _touch(root, *relpaths):
+    for relpath in relpaths:
+        filepath = os.path.join(str(root), *relpath.split("/"))
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        with open(filepath, "w") as f:
+            f.write("")
+
+
+def _relpaths(root, filepaths):
+    return [os.path.relpath(f, str(root)).replace(os.sep, "/") for f in filepaths]
+
+
+def test_discover_order_and_default_excludes(tmp_path):
+    _touch(
+        tmp_path,
+        "z.py",
+        "a/b.py",
+        "a/a.py",
+        "a/notes.txt",
+        "a/deep/c.py",
+        "b/d.py",
+        ".tox/py37/e.py",
+        "build/lib/f.py",
+        "pkg.egg-info/g.py",
+        "vendor/h.py",
+    )
+
+    filepaths = discover([str(tmp_path)], threads=4)
+
+    # the same order as a sorted os.walk
+    expected = []
+    for root, dirnames, filenames in os.walk(str(tmp_path)):
+        dirnames[:] = sorted(d for d in dirnames if d in {"a", "b", "deep"})
+        expected.extend(
+            os.path.join(root, f) for f in sorted(filenames) if f.endswith(".py")
+        )
+    assert filepaths == expected
+    assert _relpaths(tmp_path, filepaths) == [
+        "z.py",
+        "a/a.py",
+        "a/b.py",
+        "a/deep/c.py",
+        "b/d.py",
+    ]
+
+
+def test_discover_exclude_and_explicit_files(tmp_path):
+    _touch(tmp_path, "a.py", "a_pb2.py", "tests/data/b.py", "tests/c.py")
+    explicit = os.path.join(str(tmp_path), "a_pb2.py")
+
+    filepaths = discover(
+        [str(tmp_path), explicit, str(tmp_path)], exclude=["*_pb2.py", "tests/data"]
+    )
+
+    # explicitly named files are kept, and each file is listed once
+    assert _relpaths(tmp_path, filepaths) == ["a.py", "tests/c.py", "a_pb2.py"]
+
+
+def test_discover_gitignore(tmp_path):
+    _touch(
+        tmp_path,
+        "repo/keep.py",
+        "repo/gen/out.py",
+        "repo/src/gen/x.py",
+        "repo/src/skip_me.py",
+        "repo/src/skip_not_me.py",
+        "repo/src/sub/y.py",
+        "repo/src/sub/z.py",
+    )
+    repo = os.path.join(str(tmp_path), "repo")
+    os.makedirs(os.path.join(repo, ".git", "info"))
+    with open(os.path.join(repo, ".gitignore"), "w") as f:
+        f.write("# generated code\n/gen/\nskip_*.py\n!skip_not_me.py\n")
+    with open(os.path.join(repo, "src", "sub", ".gitignore"), "w") as f:
+        f.write("z.py\n")
+    with open(os.path.join(repo, ".git", "info", "exclude"), "w") as f:
+        f.write("y.py\n")
+
+    # an anchored pattern only matches relative to its .gitignore's directory
+    assert _relpaths(repo, discover([repo])) == [
+        "keep.py",
+        "src/skip_not_me.py",
+        "src/gen/x.py",
+    ]
+
+    # the repo's ignore files still apply when discovering from a subdirectory
+    src = os.path.join(repo, "src")
+    assert _relpaths(src, discover([src])) == ["skip_not_me.py", "gen/x.py"]
+
+    assert len(discover([repo], gitignore=False)) == 7
+
+
+@pytest.mark.parametrize(
+    "pattern, path, is_dir, expected",
+    [
+        ("*.py", "a/b.py", False, True),
+        ("/b.py", "a/b.py", False, None),
+        ("a/*.py", "a/b.py", False, True),
+        ("a/*.py", "a/c/b.py", False, None),
+        ("a/**/b.py", "a/c/d/b.py", False, True),
+        ("**/c", "a/c", True, True),
+        ("c/", "a/c", False, None),
+        ("b.py[cd]", "b.pyc", False, True),
+        ("b.py[!cd]", "b.pyc", False, None),
+    ],
+)
+def test_gitignore_match(tmp_path, pattern, path, is_dir, expected):
+    ignore = GitIgnore(str(tmp_path), [pattern])
+
+    assert ignore.match(os.path.join(str(tmp_path), path), is_dir) is expected
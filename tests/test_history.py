@@ -0,0 +1,89 @@
+import os
+
+from pyautodev import profiling
+from pyautodev.cache import ResultCache
+from pyautodev.history import CostHistory
+from pyautodev.processor import Processor
+from pyautodev.profiling import Timings
+
+
+def _write(filepath, contents):
+    with open(filepath, "w") as f:
+        f.write(contents)
+
+
+def _record(history, durations):
+    timings = Timings()
+    for (filepath, name), seconds in durations.items():
+        timings.add(
+            [
+                profiling.Span(
+                    name,
+                    profiling.FILE,
+                    0,
+                    int(seconds * 1e9),
+                    1,
+                    1,
+                    {"file": filepath},
+                )
+            ]
+        )
+    history.record(timings)
+
+
+def test_cost_history(tmp_path):
+    a_path = os.path.join(str(tmp_path), "a.py")
+    b_path = os.path.join(str(tmp_path), "b.py")
+    c_path = os.path.join(str(tmp_path), "c.py")
+    _write(a_path, "a = 1\n" * 10)
+    _write(b_path, "b = 1\n" * 10)
+    _write(c_path, "c = 1\n" * 40)
+    history_path = os.path.join(str(tmp_path), "history", "costs.json")
+
+    # without a history, files are ranked by size
+    estimate = CostHistory(history_path).estimator()
+    assert estimate(c_path) > estimate(a_path) == estimate(b_path)
+
+    _record(
+        CostHistory(history_path), {(a_path, "pylint"): 2.0, (a_path, "black"): 1.0}
+    )
+    _record(CostHistory(history_path), {(b_path, "pylint"): 0.5})
+    history = CostHistory(history_path)
+    assert history.stages(a_path) == {"pylint": 2.0, "black": 1.0}
+
+    # files without a history are estimated at the average seconds per byte
+    estimate = history.estimator()
+    assert estimate(a_path) == 3.0
+    assert estimate(b_path) == 0.5
+    assert estimate(c_path) == 4 * (3.0 + 0.5) / 2
+
+    # a file's latest run replaces the history of the stages it ran
+    _record(history, {(a_path, "pylint"): 1.5, (a_path, "pyflakes"): 0.25})
+    assert CostHistory(history_path).stages(a_path) == {
+        "pylint": 1.5,
+        "black": 1.0,
+        "pyflakes": 0.25,
+    }
+
+
+def test_cost_history_cached_run(tmp_path):
+    filepath = os.path.join(str(tmp_path), "a.py")
+    _write(filepath, '"""Docstring."""\nimport os\n')
+    history = CostHistory(os.path.join(str(tmp_path), "costs.json"))
+    cache = ResultCache(os.path.join(str(tmp_path), "cache"))
+
+    for _ in range(2):
+        # the second run's checker results all come from the cache
+        timings = Timings(checks=False)
+        with timings:
+            list(Processor(cache=cache).iter_process([filepath]))
+        history.record(timings)
+        stages = CostHistory(history.path).stages(filepath)
+        assert {"pylint", "pyflakes", "pycodestyle", "black"} <= set(stages)
+
+
+def test_corrupt_cost_history(tmp_path):
+    history_path = os.path.join(str(tmp_path), "costs.json")
+    _write(history_path, "{")
+
+    assert CostHistory(history_path).stages(history_path) == {}
@@ -5,6 +5,7 @@ import pytest
 from libcst import Module, MetadataWrapper
 
 from pyautodev.modifiers import CommentWrap
+from pyautodev.source import SourceUnit
 
 
 @pytest.mark.parametrize(
@@ -113,6 +114,62 @@ from pyautodev.modifiers import CommentWrap
                     return True
                 """,
         ),
+        # paragraphs
+        #   +------25 chars----------+
+        (
+                """
+                # first paragraph that is too long
+                #
+                # second
+                x = 1
+                """,
+                """
+                # first paragraph that is
+                # too long
+                #
+                # second
+                x = 1
+                """,
+        ),
+        (
+                """
+                # - a list item that is too long
+                # - another
+                x = 1
+                """,
+                """
+                # - a list item that is
+                #   too long
+                # - another
+                x = 1
+                """,
+        ),
+        (
+                """
+                # some long text that carries over
+                # into this line
+                #     indented = "code"
+                x = 1
+                """,
+                """
+                # some long text that
+                # carries over into this
+                # line
+                #     indented = "code"
+                x = 1
+                """,
+        ),
+        (
+                """
+                # see https://example.com/a/very/long/path
+                x = 1
+                """,
+                """
+                # see
+                # https://example.com/a/very/long/path
+                x = 1
+                """,
+        ),
     ],
 )
 def test_comment_wrap(orig_raw, expected_raw):
@@ -123,5 +180,22 @@ def test_comment_wrap(orig_raw, expected_raw):
     assert updated_cst.code == dedent(expected_raw)
 
 
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        #   +------25 chars----------+
+        ("x = 1  # a short comment\n", False),
+        ("x = 'a long string without a comment'\n", False),
+        ("x = 1  # a comment that runs past the end\n", True),
+        ("x = '# not a comment, just a long string'\n", False),
+        ("def foo():\n    # an indented comment too long\n", True),
+    ],
+)
+def test_comment_wrap_prefilter(raw, expected):
+    unit = SourceUnit("test.py", raw=raw.encode())
+
+    assert CommentWrap(max_line_length=25).prefilter(unit) == expected
+
+
 def _parse(code: str) -> Module:
     return cst.parse_module(dedent(code))
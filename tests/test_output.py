@@ -0,0 +1,108 @@
+import io
+import json
+
+import pytest
+
+from pyautodev.checkers import Message
+from pyautodev.output import (
+    JsonLinesWriter,
+    SarifWriter,
+    TextWriter,
+    timing_metadata,
+    tool_name,
+)
+from pyautodev.profiling import FILE, STAGE, Timings, span
+
+MSGS = [
+    Message("C0301", "line-too-long", "/src/a.py", 3, 0),
+    Message("UnusedImport", "'os' imported but unused", "/src/a.py", 1, 0),
+    Message("E501", "line too long (90 > 88 characters)", "/src/b.py", 2, 88),
+    Message(None, "invalid syntax: at 'x:'", "/src/c.py", None, None),
+]
+
+
+class _CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+
+def _timing():
+    with Timings() as timings:
+        with span("pylint", STAGE):
+            with span("pylint", FILE, file="/src/a.py"):
+                pass
+    return timing_metadata(timings, elapsed=1.0)
+
+
+def test_tool_name():
+    assert [tool_name(m.code) for m in MSGS] == [
+        "pylint",
+        "pyflakes",
+        "pycodestyle",
+        "pyflakes",
+    ]
+
+
+def test_text_writer():
+    stream = _CountingStream()
+    writer = TextWriter(stream, batch_size=256)
+    for m in MSGS[:3]:
+        writer.write(m)
+    writer.close(_timing())
+
+    assert stream.getvalue().splitlines() == [str(m) for m in MSGS[:3]]
+    # messages are written a file at a time
+    assert stream.writes == 2
+
+
+def test_text_writer_batches():
+    stream = _CountingStream()
+    writer = TextWriter(stream, batch_size=2)
+    for line in range(5):
+        writer.write(Message("E501", "line too long", "a.py", line, 0))
+    assert stream.writes == 2
+    writer.close()
+
+    assert len(stream.getvalue().splitlines()) == 5
+
+
+def test_jsonl_writer():
+    stream = io.StringIO()
+    writer = JsonLinesWriter(stream)
+    for m in MSGS:
+        writer.write(m)
+    writer.close(_timing())
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["type"] for r in records] == ["message"] * len(MSGS) + ["timing"]
+    # descriptions with colons in them survive
+    assert records[3]["description"] == MSGS[3].description
+    assert records[2]["tool"] == "pycodestyle"
+    assert records[-1]["tools"]["pylint"] >= 0
+    assert list(records[-1]["files"]["/src/a.py"]) == ["pylint"]
+
+
+@pytest.mark.parametrize("msgs", [MSGS, []])
+def test_sarif_writer(msgs):
+    stream = io.StringIO()
+    writer = SarifWriter(stream)
+    for m in msgs:
+        writer.write(m)
+    writer.close(_timing())
+
+    log = json.loads(stream.getvalue())
+    assert log["version"] == "2.1.0"
+    run = log["runs"][0]
+    assert [r["ruleId"] for r in run["results"]] == [m.code or "error" for m in msgs]
+    assert run["invocations"][0]["properties"]["timing"]["elapsed_seconds"] == 1.0
+    if msgs:
+        assert run["results"][0]["level"] == "note"
+        location = run["results"][2]["locations"][0]["physicalLocation"]
+        assert location["artifactLocation"]["uri"] == "file:///src/b.py"
+        assert location["region"] == {"startLine": 2, "startColumn": 89}
+        assert "region" not in run["results"][3]["locations"][0]["physicalLocation"]
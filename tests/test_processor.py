@@ -0,0 +1,192 @@
+import os
+import shutil
+from typing import List, Tuple
+
+import pytest
+from astroid import MANAGER
+
+from pyautodev.checkers import evict_astroid_modules
+from pyautodev.history import CostHistory
+from pyautodev.processor import Processor, _costliest_chunks
+from pyautodev.profiling import Profiler, Timings
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TEST_FILES = ["bad_continuation_tabs.py", "comment_overflow.py"]
+
+
+def _copy_test_files(dst_dir) -> list:
+    filepaths = []
+    for i in range(3):
+        for name in TEST_FILES:
+            filepath = os.path.join(str(dst_dir), f"{i}_{name}")
+            shutil.copyfile(os.path.join(TEST_DIR, name), filepath)
+            filepaths.append(filepath)
+    return filepaths
+
+
+def test_process_parallel_matches_serial(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    serial_msgs = Processor().process(filepaths)
+    with open(filepaths[0], "r") as f:
+        serial_contents = f.read()
+
+    filepaths = _copy_test_files(tmp_path)
+    parallel_msgs = Processor(jobs=2).process(filepaths)
+    with open(filepaths[0], "r") as f:
+        parallel_contents = f.read()
+
+    assert len(serial_msgs) > 0
+    assert [str(m) for m in parallel_msgs] == [str(m) for m in serial_msgs]
+    assert parallel_contents == serial_contents
+
+
+def test_iter_process_matches_process(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    msgs = Processor().process(filepaths)
+
+    filepaths = _copy_test_files(tmp_path)
+    iter_msgs = list(Processor().iter_process(filepaths))
+
+    filepaths = _copy_test_files(tmp_path)
+    parallel_iter_msgs = list(Processor(jobs=2).iter_process(filepaths))
+
+    # the same messages, but grouped by file rather than by checker
+    assert sorted(str(m) for m in iter_msgs) == sorted(str(m) for m in msgs)
+    assert [str(m) for m in parallel_iter_msgs] == [str(m) for m in iter_msgs]
+    assert iter_msgs[-1].description == "duplicate-code"
+
+
+@pytest.mark.parametrize("checker_executor", ["thread", "process"])
+def test_concurrent_checkers_match_serial(tmp_path, checker_executor):
+    filepaths = _copy_test_files(tmp_path)
+    msgs = Processor().process(filepaths)
+    filepaths = _copy_test_files(tmp_path)
+    iter_msgs = list(Processor().iter_process(filepaths))
+
+    p = Processor(checker_executor=checker_executor)
+    try:
+        filepaths = _copy_test_files(tmp_path)
+        concurrent_msgs = p.process(filepaths)
+        filepaths = _copy_test_files(tmp_path)
+        concurrent_iter_msgs = list(p.iter_process(filepaths))
+    finally:
+        p.close()
+
+    assert [str(m) for m in concurrent_msgs] == [str(m) for m in msgs]
+    assert [str(m) for m in concurrent_iter_msgs] == [str(m) for m in iter_msgs]
+
+
+def test_chunked_with_memory_limit_matches_serial(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    msgs = Processor().process(filepaths)
+
+    # a one-byte limit drops astroid's trees after every chunk
+    p = Processor(chunk_size=2, memory_limit=1)
+    filepaths = _copy_test_files(tmp_path)
+    chunked_msgs = p.process(filepaths)
+
+    assert [str(m) for m in chunked_msgs] == [str(m) for m in msgs]
+    assert p.pylint._inner.reporter.messages == []
+
+
+def _peak_trees(p: Processor, filepaths: List[str]) -> Tuple[int, int]:
+    """The most trees astroid held after any file, and how often it dropped them."""
+    evict_astroid_modules()
+    peak = 0
+    with Profiler() as profiler:
+        for _ in p._iter_files(filepaths):
+            peak = max(peak, len(MANAGER.astroid_cache))
+    evictions = [s for s in profiler.spans if s.name == "astroid.evict"]
+    return peak, len(evictions)
+
+
+def test_memory_limit_bounds_trees(tmp_path, monkeypatch):
+    filepaths = _copy_test_files(tmp_path)
+    peak, evictions = _peak_trees(Processor(chunk_size=2), filepaths)
+    assert evictions == 0
+
+    # count each tree as a megabyte, and allow for those of about one file
+    monkeypatch.setattr(
+        "pyautodev.checkers.rss", lambda: len(MANAGER.astroid_cache) * 2 ** 20
+    )
+    p = Processor(chunk_size=2, memory_limit=(peak - len(filepaths) + 1) * 2 ** 20)
+    limited_peak, evictions = _peak_trees(p, filepaths)
+
+    # dropped at most once per chunk, and before the trees of the next chunk's files
+    assert 0 < evictions <= len(filepaths) // 2
+    assert limited_peak < peak
+
+    # dropping the trees again wouldn't help if memory hasn't grown since
+    monkeypatch.setattr("pyautodev.checkers.rss", lambda: 2 ** 30)
+    _, evictions = _peak_trees(Processor(chunk_size=2, memory_limit=1), filepaths)
+    assert evictions == 1
+
+
+def test_process_batch(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    iter_msgs = list(Processor().iter_process(filepaths))
+
+    filepaths = _copy_test_files(tmp_path)
+    batch = Processor().process_batch(filepaths)
+
+    assert list(batch) == iter_msgs
+
+
+def test_iter_diffs(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    diffs = list(Processor().iter_diffs(filepaths))
+    parallel_diffs = list(Processor(jobs=2).iter_diffs(filepaths))
+
+    # nothing is written
+    for filepath in filepaths:
+        name = os.path.basename(filepath).split("_", 1)[1]
+        with open(filepath, "r") as f, open(os.path.join(TEST_DIR, name), "r") as g:
+            assert f.read() == g.read()
+
+    assert len(diffs) == len(filepaths)
+    assert diffs[0].startswith(f"--- {filepaths[0]}\t(original)\n")
+    assert parallel_diffs == diffs
+
+    Processor().process(filepaths)
+    assert list(Processor().iter_diffs(filepaths)) == []
+
+
+def test_lint_profiles(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    full_msgs = Processor(lint_profile="full").process(filepaths)
+    filepaths = _copy_test_files(tmp_path)
+    fast_msgs = Processor(lint_profile="fast").process(filepaths)
+
+    descriptions = {m.description for m in full_msgs}
+    assert "duplicate-code" in descriptions
+    assert {m.description for m in fast_msgs} < descriptions - {"duplicate-code"}
+    with pytest.raises(ValueError):
+        Processor(lint_profile="nightly")
+
+
+def test_costliest_chunks():
+    costs = {"a": 1, "b": 10, "c": 1, "d": 2, "e": 3, "f": 1}
+
+    chunks = _costliest_chunks(sorted(costs), costs.get, count=3, max_size=2)
+
+    # the costliest file gets a chunk of its own, first
+    assert chunks == [[1], [3, 4], [0, 2], [5]]
+
+
+def test_history_schedule_matches_serial(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    msgs = list(Processor().iter_process(filepaths))
+    filepaths = _copy_test_files(tmp_path)
+    diffs = list(Processor().iter_diffs(filepaths))
+
+    history = CostHistory(os.path.join(str(tmp_path), "history.json"))
+    p = Processor(jobs=2, history=history)
+    with Timings() as timings:
+        scheduled_msgs = list(p.iter_process(filepaths))
+    history.record(timings)
+    filepaths = _copy_test_files(tmp_path)
+    scheduled_diffs = list(p.iter_diffs(filepaths))
+
+    assert [str(m) for m in scheduled_msgs] == [str(m) for m in msgs]
+    assert scheduled_diffs == diffs
+    assert {"black", "pylint", "pyflakes"} <= set(history.stages(filepaths[0]))
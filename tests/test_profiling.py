@@ -0,0 +1,118 @@
+import json
+import os
+
+from pyautodev import profiling
+from pyautodev.checkers import PyCodeStyle, PyLint
+from pyautodev.processor import Processor
+from pyautodev.profiling import Profiler, Timings
+
+from tests.test_processor import _copy_test_files
+
+
+def test_span_without_profiler():
+    with profiling.span("noop"):
+        pass
+
+    assert profiling.active() is None
+
+
+def test_profiler(tmp_path):
+    with Profiler(trace_memory=True) as profiler:
+        with profiling.span("outer", profiling.STAGE):
+            with profiling.span("inner", file="a.py"):
+                _ = [0] * 100000
+
+    assert profiling.active() is None
+    assert [s.name for s in profiler.spans] == ["inner", "outer"]
+    assert profiler.spans[0].args["malloc_delta_kb"] >= 0
+    assert profiler.stage_totals()["outer"]["count"] == 1
+    assert [f for f, _ in profiler.file_totals()] == [("a.py", "inner")]
+
+    trace_path = os.path.join(str(tmp_path), "trace.json")
+    profiler.dump(trace_path)
+    with open(trace_path, "r") as f:
+        trace = json.load(f)
+    events = trace["traceEvents"]
+    assert [e["name"] for e in events] == ["outer", "inner"]
+    assert all(e["ph"] == "X" for e in events)
+    assert events[0]["ts"] == 0
+    assert events[1]["dur"] <= events[0]["dur"]
+
+
+def test_profile_process(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    with Profiler() as profiler:
+        Processor().process(filepaths)
+    serial_stages = profiler.stage_totals()
+    serial_steps = {name for (_, name), _ in profiler.file_totals()}
+
+    filepaths = _copy_test_files(tmp_path)
+    with Profiler() as profiler:
+        list(Processor(jobs=2).iter_process(filepaths))
+    parallel_stages = profiler.stage_totals()
+
+    stages = {"black", "pyautodev", "write", "pylint", "pyflakes", "pycodestyle"}
+    assert set(serial_stages) == stages
+    assert set(parallel_stages) == stages | {"pylint.cross_file"}
+    # spans recorded in the workers are sent back to the parent's profiler
+    assert parallel_stages["pylint"]["count"] == len(filepaths)
+    assert len({s.pid for s in profiler.spans}) > 1
+
+    steps = {"black.format", "libcst.parse", "pylint", "astroid.build", "pyflakes"}
+    assert steps <= serial_steps
+    assert profiler.summary().startswith("stage")
+
+
+def test_timings_in_workers(tmp_path):
+    filepaths = _copy_test_files(tmp_path)
+    with Profiler() as profiler:
+        list(Processor(jobs=2).iter_process(filepaths))
+
+    filepaths = _copy_test_files(tmp_path)
+    with Timings() as timings:
+        list(Processor(jobs=2).iter_process(filepaths))
+
+    assert timings.stage_totals().keys() == profiler.stage_totals().keys()
+    assert timings.stage_totals()["pylint"]["count"] == len(filepaths)
+    assert {f for f, _ in timings.file_totals()} == {
+        f for f, _ in profiler.file_totals(profiling.FILE)
+    }
+    assert set(timings.check_totals()) == set(profiler.check_totals())
+
+    # workers only send back their totals, rather than every span
+    with Timings().for_worker() as worker:
+        for _ in range(3):
+            with profiling.span("pylint", profiling.STAGE):
+                with profiling.span("pylint", profiling.FILE, file="a.py"):
+                    pass
+    spans = worker.take()
+    timings = Timings()
+    timings.add(spans)
+
+    assert type(worker) is Timings
+    assert len(spans) == 2
+    assert timings.stage_totals()["pylint"]["count"] == 3
+    assert [f for f, _ in timings.file_totals()] == [("a.py", "pylint")]
+    assert worker.take() == []
+
+
+def test_profile_checks(tmp_path):
+    filepaths = _copy_test_files(tmp_path)[:2]
+    msgs = PyLint().check(filepaths) + PyCodeStyle().check(filepaths)
+    with Profiler() as profiler:
+        profiled_msgs = PyLint().check(filepaths) + PyCodeStyle().check(filepaths)
+    with Timings() as timings:
+        PyLint().check(filepaths)
+
+    assert profiled_msgs == msgs
+    checks = profiler.check_totals()
+    assert {"pylint.basic", "pycodestyle.maximum_line_length"} <= set(checks)
+    assert list(checks.values()) == sorted(checks.values(), reverse=True)
+    # one span per check and file
+    basic = [s for s in profiler.spans if s.name == "pylint.basic"]
+    assert sorted(s.args["file"] for s in basic) == sorted(filepaths)
+    assert "pylint.basic" not in {name for _, name in profiler.file_totals()}
+    assert "\ncheck " in profiler.summary()
+    assert set(timings.check_totals()) == {
+        name for name in checks if name.startswith("pylint.")
+    }
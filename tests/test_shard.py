@@ -0,0 +1,70 @@
+import os
+
+import pytest
+
+from pyautodev.processor import Processor
+from pyautodev.shard import ShardResult, merge, parse_shard, partition
+
+from tests.test_processor import _copy_test_files
+
+
+def test_parse_shard():
+    assert parse_shard("1/4") == (1, 4)
+    assert parse_shard("4/4") == (4, 4)
+    for value in ["0/4", "5/4", "1", "a/b", "1/"]:
+        with pytest.raises(ValueError):
+            parse_shard(value)
+
+
+def test_partition():
+    sizes = {"a": 9, "b": 1, "c": 5, "d": 4, "e": 1, "f": 2}
+    filepaths = sorted(sizes)
+
+    shards = partition(filepaths, 3, cost=sizes.get)
+
+    assert shards == [["a"], ["b", "c", "e"], ["d", "f"]]
+    assert partition(filepaths, 3, cost=sizes.get) == shards
+    assert partition(filepaths, 8, cost=sizes.get)[-1] == []
+
+
+def _run_shards(tmp_path, count: int, **kwargs) -> list:
+    paths = []
+    for index in range(1, count + 1):
+        # each shard starts from the same files, as on separate runners
+        filepaths = _copy_test_files(tmp_path)
+        shard_filepaths = partition(filepaths, count)[index - 1]
+        p = Processor(**kwargs)
+        result = ShardResult.start(index, count, filepaths, shard_filepaths, p)
+        for m in p.iter_process(shard_filepaths, cross_file=False):
+            result.record(m)
+        result.finish(p)
+
+        path = os.path.join(str(tmp_path), f"shard-{index}.json")
+        result.dump(path)
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize("dedup", [False, True])
+def test_merge_matches_single_run(tmp_path, dedup):
+    filepaths = _copy_test_files(tmp_path)
+    msgs = list(Processor(dedup=dedup).iter_process(filepaths))
+
+    paths = _run_shards(tmp_path, 4, dedup=dedup)
+    merged_msgs = list(merge([ShardResult.load(path) for path in reversed(paths)]))
+
+    assert msgs[-1].description == "duplicate-code"
+    assert [str(m) for m in merged_msgs] == [str(m) for m in msgs]
+
+
+def test_merge_incomplete_run(tmp_path):
+    paths = _run_shards(tmp_path, 2, lint_profile="fast")
+    results = [ShardResult.load(path) for path in paths]
+
+    with pytest.raises(ValueError, match="missing shard"):
+        merge(results[:1])
+    with pytest.raises(ValueError, match="more than once"):
+        merge(results + results[:1])
+    results[1].options = {"dedup": True, "lint_profile": "fast"}
+    with pytest.raises(ValueError, match="different run"):
+        merge(results)
@@ -0,0 +1,79 @@
+import os
+
+from black import dump_to_file
+
+from pyautodev.checkers import PyCodeStyle, PyFlakes
+from pyautodev.source import SourceUnit, as_units, atomic_write
+
+TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TEST_FILE = os.path.join(TEST_DIR, "bad_continuation_tabs.py")
+
+
+def test_source_unit_lazy():
+    unit = SourceUnit("does_not_exist.py", raw=b"import os\r\nx = 1\r\n")
+
+    assert unit.text == "import os\nx = 1\n"
+    assert unit.newline == "\r\n"
+    assert unit.encoding == "utf-8"
+    assert unit.lines == ["import os\n", "x = 1\n"]
+    assert unit.tokens[0].string == "import"
+    assert unit.ast.body[0].names[0].name == "os"
+    assert unit.cst.code == unit.text
+
+
+def test_source_unit_update():
+    orig_filepath = dump_to_file("x = 1\n")
+    unit = SourceUnit(orig_filepath)
+    assert unit.ast.body[0].value.n == 1
+
+    unit.update("x = 2\n")
+    assert unit.ast.body[0].value.n == 2
+    assert unit.raw == b"x = 2\n"
+    assert unit.changed
+    assert "-x = 1\n+x = 2\n" in unit.diff()
+
+    # updates stay in memory until written
+    with open(orig_filepath, "r") as f:
+        assert f.read() == "x = 1\n"
+
+    unit.write()
+    with open(orig_filepath, "r") as f:
+        actual_contents = f.read()
+    os.remove(orig_filepath)
+
+    assert actual_contents == "x = 2\n"
+    assert not unit.changed
+    assert unit.diff() == ""
+
+
+def test_as_units():
+    unit = SourceUnit(TEST_FILE)
+    units = as_units([unit, TEST_FILE])
+
+    assert units[0] is unit
+    assert units[1].path == TEST_FILE
+
+
+def test_checkers_use_unit_contents():
+    # contents differ from what's on disk, so the checkers must not re-read the file
+    unit = SourceUnit(TEST_FILE, raw=b"import os\n")
+
+    pyflakes_msgs = PyFlakes().check([unit])
+    assert [m.code for m in pyflakes_msgs] == ["UnusedImport"]
+
+    pycodestyle_msgs = PyCodeStyle().check([unit])
+    assert pycodestyle_msgs == []
+
+
+def test_atomic_write(tmp_path):
+    filepath = os.path.join(str(tmp_path), "script.py")
+    with open(filepath, "w") as f:
+        f.write("x = 1\n")
+    os.chmod(filepath, 0o755)
+
+    atomic_write(filepath, "x = 2\n")
+
+    with open(filepath, "r") as f:
+        assert f.read() == "x = 2\n"
+    assert os.stat(filepath).st_mode & 0o777 == 0o755
+    assert os.listdir(str(tmp_path)) == ["script.py"]
@@ -1,7 +1,11 @@
 import os
+from pathlib import Path
 
-from black import dump_to_file
+import libcst as cst
+from black import dump_to_file, Changed
+from libcst.metadata import ParentNodeProvider
 
+from pyautodev.source import SourceUnit
 from pyautodev.transformers import Black, PyAutoDev
 
 TEST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
@@ -38,10 +42,93 @@ def test_pyautodev():
         expected_contents = f.read()
 
     transformer = PyAutoDev()
-    transformer.transform([orig_filepath])
+    report = transformer.transform([orig_filepath])
 
     with open(orig_filepath, "r") as f:
         actual_contents = f.read()
     os.remove(orig_filepath)
 
     assert actual_contents == expected_contents
+    assert report.done_paths_changed == {Path(orig_filepath): Changed.YES}
+
+
+def test_pyautodev_no_op():
+    orig_filepath = dump_to_file("# a short comment\nx = 1\n")
+    os.utime(orig_filepath, ns=(0, 0))
+
+    unit = SourceUnit(orig_filepath)
+    transformer = PyAutoDev()
+    report = transformer.transform([unit])
+
+    mtime_ns = os.stat(orig_filepath).st_mtime_ns
+    os.remove(orig_filepath)
+
+    assert mtime_ns == 0
+    assert unit._cst is None  # no comment is long enough to need parsing
+    assert report.done_paths_changed == {Path(orig_filepath): Changed.NO}
+
+
+class _Rename(cst.CSTTransformer):
+    def __init__(self, old: str, new: str):
+        super().__init__()
+        self.old = old
+        self.new = new
+
+    def leave_Name(self, original_node, updated_node):
+        if updated_node.value == self.old:
+            return updated_node.with_changes(value=self.new)
+        return updated_node
+
+
+class _SkipFunctions(cst.CSTTransformer):
+
+    METADATA_DEPENDENCIES = (ParentNodeProvider,)
+
+    def __init__(self):
+        super().__init__()
+        self.visited = []
+        self.left = []
+
+    def visit_FunctionDef(self, node):
+        return False
+
+    def visit_Name(self, node):
+        parent = self.get_metadata(ParentNodeProvider, node)
+        self.visited.append((node.value, type(parent).__name__))
+
+    def leave_FunctionDef(self, original_node, updated_node):
+        self.left.append(original_node.name.value)
+        return updated_node
+
+
+def test_pyautodev_fuses_modifiers():
+    orig_filepath = dump_to_file("x = 1\n\ndef f():\n    return x\n")
+    skip = _SkipFunctions()
+    # each leave_Name gets the node the previous modifier returned
+    transformer = PyAutoDev([_Rename("x", "y"), skip, _Rename("y", "z")])
+    report = transformer.transform([orig_filepath])
+
+    with open(orig_filepath, "r") as f:
+        actual_contents = f.read()
+    os.remove(orig_filepath)
+
+    assert transformer.get_inherited_dependencies() == {ParentNodeProvider}
+    assert report.done_paths_changed == {Path(orig_filepath): Changed.YES}
+    # the other modifiers still see the function body _SkipFunctions skipped
+    assert actual_contents == "z = 1\n\ndef f():\n    return z\n"
+    assert skip.visited == [("x", "AssignTarget")]
+    assert skip.left == ["f"]
+
+
+def test_pyautodev_idempotent():
+    url = "https://example.com/" + "a/very/long/path/" * 5
+    unit = SourceUnit("test.py", raw=f"# - see {url} for more\nx = 1\n".encode())
+    transformer = PyAutoDev()
+
+    first = transformer.transform([unit], write=False)
+    second = transformer.transform([unit], write=False)
+
+    assert first.done_paths_changed == {Path("test.py"): Changed.YES}
+    # the URL doesn't fit on a line even without the list item's hanging indent
+    assert unit.text == f"# - see\n# {url}\n#   for more\nx = 1\n"
+    assert second.done_paths_changed == {Path("test.py"): Changed.NO}
@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+from click.testing import CliRunner
+
+from pyautodev.history import CostHistory
+from pyautodev.main import cli
+from pyautodev.processor import Processor
+from pyautodev.watch import InotifyWatcher, PollingWatcher, Watch
+
+
+def _write(filepath, contents):
+    with open(filepath, "w") as f:
+        f.write(contents)
+
+
+@pytest.mark.parametrize("watcher_cls", [InotifyWatcher, PollingWatcher])
+def test_watcher(tmp_path, watcher_cls):
+    pkg_dir = os.path.join(str(tmp_path), "pkg")
+    os.makedirs(pkg_dir)
+    a_path = os.path.join(pkg_dir, "a.py")
+    _write(a_path, "a = 1\n")
+    watcher = watcher_cls([str(tmp_path)])
+    if watcher_cls is PollingWatcher:
+        watcher.interval = 0.01
+
+    time.sleep(0.02)  # so the modified mtime differs
+    _write(a_path, "a = 2\n")
+    _write(os.path.join(pkg_dir, "notes.txt"), "not python")
+
+    assert watcher.wait(1) == {a_path}
+    assert watcher.wait(0.05) == set()
+
+
+@pytest.mark.parametrize("watcher_cls", [InotifyWatcher, PollingWatcher])
+def test_watcher_follows_discovery(tmp_path, watcher_cls):
+    root = str(tmp_path)
+    for dirname in [".git", ".venv", "gen"]:
+        os.makedirs(os.path.join(root, dirname))
+    _write(os.path.join(root, ".gitignore"), "ignored.py\n")
+    skipped = [
+        os.path.join(root, ".venv", "site.py"),
+        os.path.join(root, "ignored.py"),
+        os.path.join(root, "gen", "g.py"),
+    ]
+    a_path = os.path.join(root, "a.py")
+    for filepath in skipped + [a_path]:
+        _write(filepath, "x = 1\n")
+    watcher = watcher_cls([root], exclude=["gen"])
+    if watcher_cls is PollingWatcher:
+        watcher.interval = 0.01
+
+    time.sleep(0.02)  # so the modified mtime differs
+    for filepath in skipped + [a_path]:
+        _write(filepath, "x = 2\n")
+    os.makedirs(os.path.join(root, "pkg"))
+    b_path = os.path.join(root, "pkg", "b.py")
+    _write(b_path, "b = 1\n")
+
+    changed = set()
+    deadline = time.monotonic() + 1
+    while b_path not in changed and time.monotonic() < deadline:
+        changed |= watcher.wait(0.2)
+    assert changed == {a_path, b_path}
+
+
+def test_watch_ignores_own_writes(tmp_path):
+    filepath = os.path.join(str(tmp_path), "a.py")
+    _write(filepath, "a=1\n")
+    w = Watch([str(tmp_path)], Processor())
+
+    _write(filepath, "a=2\n")
+    assert w.wait_for_changes(timeout=1) == [filepath]
+
+    # black rewrites the file, which shouldn't trigger another run
+    msgs = list(w.process([filepath]))
+    with open(filepath, "r") as f:
+        assert f.read() == "a = 2\n"
+    assert any(m.code == "C0114" for m in msgs)  # missing-module-docstring
+    assert w.wait_for_changes(timeout=0.2) == []
+
+
+def test_watch_records_history(tmp_path):
+    filepath = os.path.join(str(tmp_path), "a.py")
+    _write(filepath, "a = 1\n")
+    history = CostHistory(os.path.join(str(tmp_path), "history.json"))
+    w = Watch([str(tmp_path)], Processor(history=history), poll=True)
+
+    list(w.process([filepath]))
+
+    assert "pylint" in CostHistory(history.path).stages(filepath)
+
+
+def test_watch_options(tmp_path, monkeypatch):
+    processors = []
+    monkeypatch.setattr(Watch, "run", lambda w, emit: processors.append(w.processor))
+    cache_dir = os.path.join(str(tmp_path), "cache")
+
+    args = ["watch", "--poll", "-j", "2", "--dedup", "--lint-profile", "fast"]
+    args += ["--memory-limit", "64", "--cache-dir", cache_dir, str(tmp_path)]
+    result = CliRunner().invoke(cli, args)
+
+    assert result.exit_code == 0, result.output
+    (p,) = processors
+    assert p.jobs == 2
+    assert p.dedup
+    assert p.memory_limit == 64 * 2 ** 20
+    assert p.lint_profile == "fast"
+    assert p.history.path.startswith(cache_dir)